@@ -0,0 +1,234 @@
+"""
+End to end benchmark of the client applications against a local mock bridge over a loopback socket
+
+:Responsible For:
+1. Measuring the market data throughput a ClientApplication sustains (ticks handled per second)
+2. Measuring the latency from the arrival of a frame to the invocation of its handler (p50, p99, p99.9)
+3. Measuring the round trip time of IBKR_API's request_contract_data and request_historical_data
+4. Writing the results as JSON, like the parse benchmark
+
+Usage (from the repository's root):
+    python -m benchmarks.loopback_benchmark                                   # Default scenario, printed as a table
+    python -m benchmarks.loopback_benchmark --rate 50000 --subscriptions 8    # Ticks per second per subscription
+    python -m benchmarks.loopback_benchmark --json results.json --reader-thread
+"""
+
+from datetime   import datetime, timezone
+
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+
+import numpy as np
+
+from ibkr_api.api                           import IBKR_API
+from ibkr_api.base.mock_bridge              import LAST_TIMESTAMP, MockBridge
+from ibkr_api.classes.contracts.contract    import Contract
+from ibkr_api.client_application            import ClientApplication
+
+RESULTS_VERSION = 1
+PERCENTILES     = (50, 90, 99, 99.9)
+
+
+def contract(symbol):
+    stock                   = Contract()
+    stock.symbol            = symbol
+    stock.security_type     = "STK"
+    stock.exchange          = "SMART"
+    stock.currency          = "USD"
+    return stock
+
+
+def percentiles(samples, scale=1e6):
+    """
+    :param samples: Durations in seconds
+    :param scale: Unit the percentiles are returned in (1e6 -> microseconds)
+    :return: Dictionary of the count, mean, max and percentiles of the samples
+    """
+    if not len(samples):
+        return {'count': 0}
+    values = np.asarray(samples, dtype=np.float64) * scale
+    result = {'count': len(values), 'mean': round(float(values.mean()), 1), 'max': round(float(values.max()), 1)}
+    for (percentile, value) in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        result['p{0:g}'.format(percentile)] = round(float(value), 1)
+    return result
+
+
+class LoopbackApplication(ClientApplication):
+    def __init__(self, host, port, subscriptions, duration, warmup, **kwargs):
+        """
+        Subscribes to market data and records when every tick is handled
+
+        :param subscriptions: Number of market data subscriptions
+        :param duration: Seconds the application runs
+        :param warmup: Seconds at the start whose ticks are not measured
+        :param kwargs: Keyword arguments of ClientApplication (reader_thread, conflate, ...)
+        """
+        self.subscriptions  = subscriptions
+        self.duration       = duration
+        self.warmup         = warmup
+        self.received       = None      # Arrival (time.monotonic()) of the frame being handled
+        self.started        = None
+        self.measuring      = False
+        self.ticks          = 0         # Ticks handled once warmed up
+        self.dispatch_latencies = []    # Seconds from the arrival of a frame to its handler's invocation
+        self.wire_latencies     = []    # Seconds from the mock bridge sending a tick to its handler's invocation
+        super().__init__(host, port, act_interval=0.05, **kwargs)
+
+    def initialize(self):
+        for request_id in range(1, self.subscriptions + 1):
+            self.request_market_data(request_id, contract("SYM{0}".format(request_id)), "", False, False, [])
+        self.started = time.monotonic()
+
+    def act(self):
+        elapsed = time.monotonic() - self.started
+        if not self.measuring and elapsed >= self.warmup:
+            self.measuring      = True
+            self.measure_start  = time.monotonic()
+        if elapsed >= self.warmup + self.duration:
+            self.measure_end    = time.monotonic()
+            self.stop()
+
+    def _dispatch(self, message):
+        self.received = message.received
+        super()._dispatch(message)
+
+    def _tick(self):
+        if self.measuring:
+            self.ticks += 1
+            self.dispatch_latencies.append(time.monotonic() - self.received)
+
+    def tick_price(self, message_id, request_id, tick):
+        self._tick()
+
+    def tick_size(self, message_id, request_id, tick):
+        self._tick()
+
+    def tick_string(self, message_id, request_id, tick):
+        self._tick()
+        if self.measuring and tick.tick_type_id == LAST_TIMESTAMP:
+            self.wire_latencies.append(time.time() - float(tick.value))
+
+    def managed_accounts(self, message_id, request_id, account):
+        pass
+
+    def next_valid_id(self, message_id, request_id, next_id):
+        pass
+
+
+def streaming_benchmark(rate, subscriptions, duration, warmup, burst_size, burst_interval, reader_thread, conflate):
+    """
+    :return: Dictionary of the throughput and latencies of a ClientApplication streaming market data
+    """
+    with MockBridge(tick_rate=rate, burst_size=burst_size, burst_interval=burst_interval, seed=1) as bridge:
+        app = LoopbackApplication('127.0.0.1', bridge.port, subscriptions, duration, warmup,
+                                  reader_thread=reader_thread, conflate=conflate)
+        app.run()
+        sent = bridge.metrics()['messages_sent']
+        bridge.stop()       # The reader thread would otherwise never see the end of the stream
+        app.conn.disconnect()
+
+    elapsed = app.measure_end - app.measure_start
+    result  = {'offered_ticks_per_second'   : rate * subscriptions,
+               'ticks_per_second'           : round(app.ticks / elapsed, 1),
+               'ticks_handled'              : app.ticks,
+               'messages_sent'              : sent,
+               'dispatch_latency_us'        : percentiles(app.dispatch_latencies),
+               'wire_latency_us'            : percentiles(app.wire_latencies)}
+    if app.conflator is not None:
+        result['conflated'] = app.conflator.coalesced
+    return result
+
+
+def round_trip_benchmark(requests, bars):
+    """
+    :return: Dictionary of the round trip times of IBKR_API requests
+    """
+    with MockBridge(historical_bars=bars, seed=1) as bridge:
+        api = IBKR_API('127.0.0.1', bridge.port)
+        api.reference_data_cache = None     # Every request must reach the bridge
+        stock = contract("AAPL")
+
+        timings = {'request_contract_data': [], 'request_historical_data': []}
+        for _ in range(requests):
+            started = time.perf_counter()
+            api.request_contract_data(stock)
+            timings['request_contract_data'].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            api.request_historical_data(stock, "", "1 D", "1 min", "TRADES", 1)
+            timings['request_historical_data'].append(time.perf_counter() - started)
+        api.conn.disconnect()
+
+    return {name: percentiles(samples) for (name, samples) in timings.items()}
+
+
+def print_results(results, out=sys.stdout):
+    streaming = results['streaming']
+    print("Streaming ({0[subscriptions]} subscriptions, {0[rate]:,} ticks/s offered each, reader thread: "
+          "{0[reader_thread]}, conflate: {0[conflate]})".format(results['scenario']), file=out)
+    print("  Ticks handled per second: {0:,.0f}".format(streaming['ticks_per_second']), file=out)
+    if 'conflated' in streaming:
+        print("  Ticks conflated: {0:,}".format(streaming['conflated']), file=out)
+    rows = [("Frame arrival -> handler (us)", streaming['dispatch_latency_us']),
+            ("Bridge send -> handler (us)", streaming['wire_latency_us'])]
+    rows += [("{0} round trip (us)".format(name), timings) for (name, timings) in results['round_trip'].items()]
+
+    header = "{0:<45} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10} {6:>10}".format(
+        "", "count", "p50", "p90", "p99", "p99.9", "max")
+    print(header, file=out)
+    for (name, stats) in rows:
+        if not stats['count']:
+            print("{0:<45} {1:>8}".format(name, 0), file=out)
+            continue
+        print("{0:<45} {1:>8,} {2:>10,.1f} {3:>10,.1f} {4:>10,.1f} {5:>10,.1f} {6:>10,.1f}".format(
+            name, stats['count'], stats['p50'], stats['p90'], stats['p99'], stats['p99.9'], stats['max']), file=out)
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description="End to end benchmark against a local mock bridge")
+    arguments.add_argument('--rate', type=float, default=20000, help="Ticks per second sent per subscription")
+    arguments.add_argument('--subscriptions', type=int, default=4, help="Market data subscriptions")
+    arguments.add_argument('--duration', type=float, default=5.0, help="Seconds measured")
+    arguments.add_argument('--warmup', type=float, default=1.0, help="Seconds streamed before measuring")
+    arguments.add_argument('--burst-size', type=int, default=0, help="Extra ticks sent back to back per burst")
+    arguments.add_argument('--burst-interval', type=float, default=1.0, help="Seconds between bursts")
+    arguments.add_argument('--reader-thread', action='store_true', help="Drain the socket on a dedicated thread")
+    arguments.add_argument('--conflate', action='store_true', help="Conflate the ticks the handlers lag behind")
+    arguments.add_argument('--requests', type=int, default=200, help="Round trips timed per request type")
+    arguments.add_argument('--bars', type=int, default=500, help="Bars returned per historical data request")
+    arguments.add_argument('--json', help="Write the results to this file as JSON ('-' -> stdout)")
+    options = arguments.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    scenario = {'rate': options.rate, 'subscriptions': options.subscriptions, 'duration': options.duration,
+                'warmup': options.warmup, 'burst_size': options.burst_size, 'burst_interval': options.burst_interval,
+                'reader_thread': options.reader_thread, 'conflate': options.conflate,
+                'requests': options.requests, 'bars': options.bars}
+    results  = {'version'       : RESULTS_VERSION,
+                'created'       : datetime.now(timezone.utc).isoformat(),
+                'python'        : platform.python_version(),
+                'platform'      : platform.platform(),
+                'scenario'      : scenario,
+                'streaming'     : streaming_benchmark(options.rate, options.subscriptions, options.duration,
+                                                      options.warmup, options.burst_size, options.burst_interval,
+                                                      options.reader_thread, options.conflate),
+                'round_trip'    : round_trip_benchmark(options.requests, options.bars)}
+
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return 0
+
+    print_results(results)
+    if options.json:
+        with open(options.json, 'w') as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
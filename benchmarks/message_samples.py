@@ -0,0 +1,257 @@
+"""
+Synthetic inbound messages for the benchmarks
+
+:Responsible For:
+1. Providing the fields of a realistic message for every id in Messages.inbound (as sent by a recent bridge)
+2. Sizing the messages that carry repeated data (bars, ticks, scan results, option chains) like production responses
+3. Deriving the messages described by a schema (see message_schema) from the schema itself
+"""
+
+from datetime import datetime, timedelta
+
+from ibkr_api.base.message_encoder  import encode_payload
+from ibkr_api.base.message_schema   import SCHEMAS, SERVER_VERSION, REQUEST_ID, Group
+from ibkr_api.base.messages         import Messages
+
+REQUEST         = 7         # Request id used by every sample
+BARS            = 2000      # Bars of historical_data
+SCAN_RESULTS    = 50        # Rows of scanner_data (the bridge's maximum)
+
+# Repetitions of the groups of the schema messages
+GROUP_SIZES     = {'historical_ticks'           : 1000,
+                   'historical_ticks_bid_ask'   : 1000,
+                   'historical_ticks_last'      : 1000,
+                   'histogram_data'             : 200,
+                   'mkt_depth_exchanges'        : 40,
+                   'news_providers'             : 10,
+                   'market_rule'                : 4}
+
+# Contract block (id, symbol, security type, last trade date, strike, right, multiplier, exchange, currency,
+# local symbol, trading class) shared by the order, position and execution messages
+CONTRACT        = [265598, "AAPL", "STK", "", 0.0, "", "", "SMART", "USD", "AAPL", "NMS"]
+
+
+def historical_data(bars=BARS):
+    fields  = [Messages.inbound['historical_data'], REQUEST, "20240102  09:30:00", "20240301  16:00:00", bars]
+    start   = datetime(2024, 1, 2, 9, 30)
+    for index in range(bars):
+        close = 180.0 + (index % 37) * 0.25
+        fields += [(start + timedelta(minutes=index)).strftime("%Y%m%d  %H:%M:%S"), close - 0.1, close + 0.3,
+                   close - 0.4, close, 1200 + index, close + 0.02, 35 + index % 20]
+    return fields
+
+
+def scanner_data(rows=SCAN_RESULTS):
+    fields = [Messages.inbound['scanner_data'], 3, REQUEST, rows]
+    for rank in range(rows):
+        fields += [rank, 265598 + rank, "SYM%d" % rank, "STK", "", 0, "", "SMART", "USD", "SYM%d" % rank, "NMS",
+                   "SYM%d" % rank, "", "", "", ""]
+    return fields
+
+
+def open_orders():
+    """ Open order of a limit order with algo and smart combo routing parameters """
+    return [Messages.inbound['open_orders'], 42] + CONTRACT + [
+        "BUY", 100.0, "LMT", 187.25, "", "DAY", "", "DU1234567", "O",              # Action ... open/close
+        0, "", 0, 1234567890, 0, 0, 0.0,                                            # Origin ... discretionary amount
+        "", "", "", "", "", "", "", "", "", "",                                     # Good after time ... percent offset
+        "", 0, "", -1, "", "", "", "", "", "",                                      # Settling firm ... stock range upper
+        "", 0, 0, 0, "", 3, 0, 0, "", 0,                                            # Display size ... parent id
+        0, "", 0, "", "",                                                           # Trigger method ... delta neutral
+        0, 0, "", "", "", "", "", 0,                                                # Continuous update ... combo legs
+        0,                                                                          # Order combo legs
+        2, "NonGuaranteed", "1", "LeginPrio", "0",                                  # Smart combo routing parameters
+        "", "", "",                                                                 # Scale orders
+        "",                                                                         # Hedge type
+        0, "", "", 0, 0,                                                            # Opt out smart ... delta neutral
+        "Adaptive", 1, "adaptivePriority", "Normal",                                # Algo strategy and parameters
+        0, 0, "Submitted",                                                          # Solicited, what if, status
+        "1.7976931348623157E308", "1.7976931348623157E308", "1.7976931348623157E308",
+        "1.7976931348623157E308", "1.7976931348623157E308", "1.7976931348623157E308",
+        "1.7976931348623157E308", "1.7976931348623157E308", "1.7976931348623157E308",
+        "1.7976931348623157E308", "1.7976931348623157E308", "1.7976931348623157E308", "", "",
+        0, 0,                                                                       # Randomize size, price
+        0, "", "None", "", 1.7976931348623157e308, 1.7976931348623157e308,         # Conditions ... trail stop price
+        1.7976931348623157e308, 1.7976931348623157e308, 1.7976931348623157e308, 0,
+        "", "", "",                                                                 # Soft dollar tier
+        1.7976931348623157e308, 0]                                                  # Cash quantity, auto price hedge
+
+
+def security_definition_option_parameter(expirations=20, strikes=200):
+    fields = [Messages.inbound['security_definition_option_parameter'], REQUEST, "SMART", 265598, "AAPL", "100",
+              expirations]
+    fields += ["2024%02d%02d" % (1 + index // 4, 1 + 7 * (index % 4)) for index in range(expirations)]
+    fields += [strikes] + [50.0 + 2.5 * index for index in range(strikes)]
+    return fields
+
+
+def scanner_parameters(instruments=200):
+    """ Scanner parameters XML (several MB from a real bridge, trimmed to instrument entries) """
+    body = "".join("<Instrument><name>Instrument {0}</name><type>TYPE{0}</type><filters>PRICE,VOLUME</filters>"
+                   "</Instrument>".format(index) for index in range(instruments))
+    return [Messages.inbound['scanner_parameters'], 1,
+            "<?xml version=\"1.0\"?><ScanParameterResponse><InstrumentList>{0}</InstrumentList>"
+            "</ScanParameterResponse>".format(body)]
+
+
+def repeated(message_name, header, item, count):
+    """
+    :return: Fields of a message made of a header, a count and count repetitions of item
+    """
+    fields = [Messages.inbound[message_name]] + header + [count]
+    for index in range(count):
+        fields += item(index)
+    return fields
+
+
+# Messages without a schema: inbound message name -> function returning the message's fields
+SAMPLES = {
+    'order_status'              : lambda: [3, 42, "Filled", 100.0, 0.0, 187.25, 1234567890, 0, 187.25, 0, "", 0.0],
+    'info_message'              : lambda: [4, 2, -1, 2104, "Market data farm connection is OK:usfarm.nj"],
+    'open_orders'               : open_orders,
+    'account_value'             : lambda: [6, 2, "NetLiquidation", "1000000.00", "USD", "DU1234567"],
+    'portfolio_value'           : lambda: [7, 8] + CONTRACT + [100.0, 187.25, 180.12, 713.0, 0.0, "DU1234567"],
+    'account_update_time'       : lambda: [8, 1, "15:59"],
+    'next_valid_id'             : lambda: [9, 1, 1000],
+    'contract_data'             : lambda: [10, 8, REQUEST, "AAPL", "STK", "", 0.0, "", "SMART", "USD", "AAPL", "NMS",
+                                           "NMS", 265598, 0.01, 100, "", "ACTIVETIM,AD,ADJUST,ALERT,ALGO,ALLOC,AON,"
+                                           "AVGCOST,BASKET,COND,CONDORDER,DAY,DEACT,DEACTDIS,GAT,GTC,GTD,LIT,LMT,MIT,"
+                                           "MKT,MTL,NGCOMB,NONALGO,OCA,PEGBENCH,REL,SCALE,STP,STPLMT,TRAIL,WHATIF",
+                                           "SMART,AMEX,NYSE,CBOE,PHLX,ISE,CHX,ARCA,ISLAND,DRCTEDGE,BEX,BATS,EDGEA,"
+                                           "CSFBALGO,JEFFALGO,BYX,IEX,EDGX,FOXRIVER,PEARL,NYSENAT,LTSE,MEMX,PSX",
+                                           1, 0, "APPLE INC", "NASDAQ", "", "Technology", "Computers", "Computers",
+                                           "US/Eastern",
+                                           ";".join("2024010%d:0400-2024010%d:2000" % (day, day)
+                                                    for day in range(1, 8)),
+                                           ";".join("2024010%d:0930-2024010%d:1600" % (day, day)
+                                                    for day in range(1, 8)),
+                                           "", "", 1, "ISIN", "US0378331005", 1, "", "", "26,26,26", ""],
+    'execution_data'            : lambda: [11, REQUEST, 42] + CONTRACT[:4] + [0.0] + CONTRACT[5:] + [
+                                           "0000e0d5.65a0b2c1.01.01", "20240102  10:15:30", "DU1234567", "ISLAND",
+                                           "BOT", 100.0, 187.25, 1234567890, 0, 0, 100.0, 187.25, "", "", "", "", 1],
+    'news_bulletins'            : lambda: [14, 1, 12, 1, "Trading halted in XYZ pending news", "NYSE"],
+    'managed_accounts'          : lambda: [15, 1, "DU1234567,DU1234568"],
+    'receive_fa'                : lambda: [16, 1, 1, "<?xml version=\"1.0\"?><ListOfGroups></ListOfGroups>"],
+    'historical_data'           : historical_data,
+    'bond_contract_data'        : lambda: [18, 6, REQUEST, "IBM", "BOND", "459200HU8", 3, "20301115", "20101115",
+                                           "A", "FIXED", "FIXED", "0", "0", "0", "", "SMART", "USD", "IBM",
+                                           "IBM", 12345678, 0.001, 1, "LMT", "SMART", "", "", "", "",
+                                           "IBM 3 11/15/30", "", 1, 0, 1, "32", ""],
+    'scanner_parameters'        : scanner_parameters,
+    'scanner_data'              : scanner_data,
+    'tick_generic'              : lambda: [45, 6, REQUEST, 49, 0.0],
+    'tick_efp'                  : lambda: [47, 6, REQUEST, 38, 0.5, "0.50", 187.25, 30, "20240315", 0.25, 0.25],
+    'current_time'              : lambda: [49, 1, 1704205800],
+    'real_time_bars'            : lambda: [50, 3, REQUEST, 1704205800, 187.1, 187.3, 187.0, 187.25, 1200, 187.2, 35],
+    'fundamental_data'          : lambda: [51, 1, REQUEST, "<?xml version=\"1.0\"?><ReportSnapshot>" +
+                                           "<Text>Company description</Text>" * 100 + "</ReportSnapshot>"],
+    'contract_data_end'         : lambda: [52, 1, REQUEST],
+    'open_orders_end'           : lambda: [53, 1],
+    'account_download_end'      : lambda: [54, 1, "DU1234567"],
+    'execution_data_end'        : lambda: [55, 1, REQUEST],
+    'delta_neutral_validation'  : lambda: [56, 1, REQUEST, 265598, 0.5, 187.25],
+    'tick_snapshot_end'         : lambda: [57, 1, REQUEST],
+    'market_data_type'          : lambda: [58, 1, REQUEST, 1],
+    'commission_report'         : lambda: [59, 1, "0000e0d5.65a0b2c1.01.01", 1.0, "USD", 1.7976931348623157e308,
+                                           1.7976931348623157e308, ""],
+    'position_data'             : lambda: [61, 3, "DU1234567", 265598, "AAPL", "STK", "", 0.0, "", "", "SMART",
+                                           "USD", "AAPL", "NMS", 100.0, 180.12],
+    'position_end'              : lambda: [62, 1],
+    'account_summary'           : lambda: [63, 1, REQUEST, "DU1234567", "NetLiquidation", "1000000.00", "USD"],
+    'account_summary_end'       : lambda: [64, 1, REQUEST],
+    'verify_message_api'        : lambda: [65, 1, "api data"],
+    'verify_request'            : lambda: [66, 1, 1, ""],
+    'display_group_list'        : lambda: [67, 1, REQUEST, "1|2|3|4|5|6|7"],
+    'display_group_updated'     : lambda: [68, 1, REQUEST, "265598@SMART"],
+    'verify_and_auth_message_api': lambda: [69, 1, "api data", "challenge"],
+    'verify_and_auth_completed' : lambda: [70, 1, 1, ""],
+    'position_multi'            : lambda: [71, 1, REQUEST, "DU1234567", 265598, "AAPL", "STK", "", 0.0, "", "",
+                                           "SMART", "USD", "AAPL", "NMS", 100.0, 180.12, ""],
+    'position_multi_end'        : lambda: [72, 1, REQUEST],
+    'account_update_multi'      : lambda: [73, 1, REQUEST, "DU1234567", "", "NetLiquidation", "1000000.00", "USD"],
+    'account_update_multi_end'  : lambda: [74, 1, REQUEST],
+    'security_definition_option_parameter'      : security_definition_option_parameter,
+    'security_definition_option_parameter_end'  : lambda: [76, REQUEST],
+    'soft_dollar_tiers'         : lambda: repeated('soft_dollar_tiers', [REQUEST], lambda index: [
+                                           "Tier%d" % index, "%d" % index, "Tier %d" % index], 5),
+    'family_codes'              : lambda: [78, 2, "DU1234567", "F1234567", "DU1234568", "F1234567"],
+    'symbol_samples'            : lambda: repeated('symbol_samples', [REQUEST], lambda index: [
+                                           265598 + index, "AAP%d" % index, "STK", "NASDAQ", "USD", 4, "CFD", "OPT",
+                                           "IOPT", "WAR"], 16),
+    'smart_components'          : lambda: repeated('smart_components', [REQUEST], lambda index: [
+                                           index, "EXCH%d" % index, chr(65 + index % 26)], 30),
+    'historical_news_end'       : lambda: [87, REQUEST, 1],
+    'head_time_stamp'           : lambda: [88, REQUEST, "19801212  14:30:00"],
+    'historical_data_update'    : lambda: [90, REQUEST, 35, "20240102  10:15:00", 187.1, 187.25, 187.3, 187.0,
+                                           187.2, 1200],
+    'reroute_market_data_req'   : lambda: [91, REQUEST, 265598, "SMART"],
+    'reroute_market_depth_req'  : lambda: [92, REQUEST, 265598, "ISLAND"],
+    'order_bound'               : lambda: [100, 1234567890, 0, 42],
+}
+
+
+def field_sample(field, selected=None):
+    """
+    :param field: Field of a schema
+    :param selected: Value to use (the selector of a schema with variants)
+    :return: Encoded value of a realistic field
+    """
+    if selected is not None:
+        return selected
+    if field.name is None:
+        return 1                                    # Version or unused
+    if field.name == REQUEST_ID:
+        return REQUEST
+    if field.convert is int:
+        return 1704205800 if field.name in ('time', 'time_stamp') else 3
+    if field.convert is float:
+        return 187.25
+    if field.convert is bool:
+        return 1
+    return field.name.upper()
+
+
+def schema_sample(schema, group_size=None, variant=0):
+    """
+    Fields of a message described by a schema
+
+    :param schema: Schema of the message
+    :param group_size: Repetitions of its groups (None -> GROUP_SIZES, 10 if the message is not listed)
+    :param variant: Index of the variant used by messages with variants (e.g. tick_by_tick)
+    :return: list of fields (message id first)
+    """
+    if group_size is None:
+        group_size = GROUP_SIZES.get(schema.message_name, 10)
+
+    def add(fields, values):
+        for field in fields:
+            if isinstance(field, Group):
+                values.append(group_size)
+                for _ in range(group_size):
+                    add(field.fields, values)
+            elif field.present(SERVER_VERSION):
+                selected = None
+                if schema.selector is not None and field.name == schema.selector:
+                    selected = schema.variants[variant][0][0]
+                values.append(field_sample(field, selected))
+
+    values = [schema.message_id]
+    add(schema.fields, values)
+    if schema.variants:
+        add(schema.variants[variant][2], values)
+    return values
+
+
+def samples():
+    """
+    :return: dict of inbound message name -> encoded payload (fields separated by NUL characters), in id order
+    """
+    schemas = {schema.message_name: schema for schema in SCHEMAS}
+    result  = {}
+    for (name, message_id) in sorted(Messages.inbound.items(), key=lambda item: item[1]):
+        if name in schemas:
+            fields = schema_sample(schemas[name])
+        else:
+            fields = SAMPLES[name]()
+        result[name] = encode_payload(fields)
+    return result
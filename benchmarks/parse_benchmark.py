@@ -0,0 +1,210 @@
+"""
+Benchmark of the parsing of every inbound message type
+
+:Responsible For:
+1. Timing Messages.parse_message and the MessageParser function of every message in Messages.inbound
+2. Measuring the memory each step allocates (peak and retained, with tracemalloc)
+3. Writing the results as JSON, and comparing them with the results of an earlier run to flag regressions
+
+Usage (from the repository's root):
+    python -m benchmarks.parse_benchmark                          # Table of the results, slowest messages first
+    python -m benchmarks.parse_benchmark --json results.json      # Also write the results as JSON ('-' -> stdout)
+    python -m benchmarks.parse_benchmark --baseline results.json  # Flag the messages slower than in results.json
+"""
+
+from datetime   import datetime, timezone
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from ibkr_api.base.message_parser   import MessageParser
+from ibkr_api.base.message_schema   import PARSERS
+from ibkr_api.base.messages         import Messages
+
+from benchmarks.message_samples     import samples
+
+RESULTS_VERSION = 1
+
+
+def time_call(func, arg, min_time, repeat):
+    """
+    Time func(arg), calling it in loops lasting at least min_time seconds
+
+    :param func: Function to time
+    :param arg: Its argument
+    :param min_time: Minimum duration of a loop
+    :param repeat: Number of loops (the fastest one is kept, the others were disturbed by something else)
+    :return: Seconds per call
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func(arg)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func(arg)
+        best = min(best, time.perf_counter() - started)
+    return best / number
+
+
+def allocations(func, arg):
+    """
+    :return: (bytes allocated at the peak of func(arg), bytes still allocated when it returned, including its result)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(arg)
+        (current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak, current
+
+
+def measure(func, arg, min_time, repeat):
+    """
+    :return: Dictionary of the speed and allocations of func(arg)
+    """
+    func(arg)   # Warm up caches (dates, time zones, etc.) so the steady state is measured
+    seconds         = time_call(func, arg, min_time, repeat)
+    (peak, current) = allocations(func, arg)
+    return {'ns_per_message'        : round(seconds * 1e9, 1),
+            'messages_per_second'   : round(1.0 / seconds, 1),
+            'peak_bytes'            : peak,
+            'retained_bytes'        : current}
+
+
+def run(names=None, min_time=0.05, repeat=3):
+    """
+    Benchmark the parsing of the sample messages (see message_samples)
+
+    :param names: Names of the messages to benchmark (None -> all of Messages.inbound)
+    :param min_time: Minimum duration of a timing loop
+    :param repeat: Number of timing loops per measurement
+    :return: Dictionary of the results (see RESULTS_VERSION)
+    """
+    results = []
+    for (name, payload) in samples().items():
+        if names and name not in names:
+            continue
+
+        fields  = Messages.parse_message(payload)
+        parser  = getattr(MessageParser, name, None)
+        result  = {'message'        : name,
+                   'id'             : Messages.inbound[name],
+                   'fields'         : len(fields),
+                   'bytes'          : len(payload),
+                   'parser_kind'    : 'schema' if name in PARSERS else ('hand written' if parser else None),
+                   'parse_message'  : measure(Messages.parse_message, payload, min_time, repeat),
+                   'parser'         : None,
+                   'error'          : None}
+
+        if parser is not None:
+            try:
+                parser(fields)
+            except Exception as e:
+                result['error'] = "{0}: {1}".format(type(e).__name__, e)
+            else:
+                result['parser'] = measure(parser, fields, min_time, repeat)
+
+        total_ns = result['parse_message']['ns_per_message']
+        if result['parser'] is not None:
+            total_ns += result['parser']['ns_per_message']
+        result['total'] = {'ns_per_message'         : round(total_ns, 1),
+                           'messages_per_second'    : round(1e9 / total_ns, 1)}
+        results.append(result)
+
+    return {'version'   : RESULTS_VERSION,
+            'created'   : datetime.now(timezone.utc).isoformat(),
+            'python'    : platform.python_version(),
+            'platform'  : platform.platform(),
+            'min_time'  : min_time,
+            'repeat'    : repeat,
+            'results'   : results}
+
+
+def compare(results, baseline, threshold):
+    """
+    :param results: Results of this run
+    :param baseline: Results of an earlier run
+    :param threshold: Relative slowdown flagged as a regression (0.2 -> 20% slower)
+    :return: list of (message name, baseline ns, current ns, ratio) of the regressions
+    """
+    before      = {result['message']: result['total']['ns_per_message'] for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        previous = before.get(result['message'])
+        current  = result['total']['ns_per_message']
+        if previous and current > previous * (1 + threshold):
+            regressions.append((result['message'], previous, current, current / previous))
+    return regressions
+
+
+def print_table(results, out=sys.stdout):
+    header = "{0:<42} {1:>6} {2:>8} {3:>12} {4:>12} {5:>12} {6:>12}  {7}".format(
+        "message", "fields", "bytes", "split ns", "parser ns", "msgs/s", "peak bytes", "parser")
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for result in sorted(results['results'], key=lambda result: -result['total']['ns_per_message']):
+        parser = result['parser']
+        print("{0:<42} {1:>6} {2:>8} {3:>12,.0f} {4:>12} {5:>12,.0f} {6:>12}  {7}".format(
+            result['message'], result['fields'], result['bytes'], result['parse_message']['ns_per_message'],
+            "{0:,.0f}".format(parser['ns_per_message']) if parser else "-",
+            result['total']['messages_per_second'],
+            "{0:,}".format(parser['peak_bytes'] if parser else result['parse_message']['peak_bytes']),
+            result['error'] or result['parser_kind'] or "none"), file=out)
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description="Benchmark of the parsing of every inbound message type")
+    arguments.add_argument('--json', help="Write the results to this file as JSON ('-' -> stdout)")
+    arguments.add_argument('--baseline', help="Results (JSON) of an earlier run to compare with")
+    arguments.add_argument('--threshold', type=float, default=0.2,
+                           help="Slowdown compared with the baseline reported as a regression (default 0.2)")
+    arguments.add_argument('--min-time', type=float, default=0.05, help="Minimum seconds per timing loop")
+    arguments.add_argument('--repeat', type=int, default=3, help="Timing loops per measurement")
+    arguments.add_argument('messages', nargs='*', help="Names of the messages to benchmark (default: all)")
+    options = arguments.parse_args(argv)
+
+    unknown = [name for name in options.messages if name not in Messages.inbound]
+    if unknown:
+        arguments.error("Unknown inbound messages: {0}".format(", ".join(unknown)))
+
+    results = run(options.messages, options.min_time, options.repeat)
+
+    if options.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(results)
+        if options.json:
+            with open(options.json, 'w') as output:
+                json.dump(results, output, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), options.threshold)
+        out = sys.stderr if options.json == '-' else sys.stdout
+        for (name, previous, current, ratio) in regressions:
+            print("REGRESSION {0}: {1:,.0f} ns -> {2:,.0f} ns ({3:.0%} slower)".format(
+                name, previous, current, ratio - 1), file=out)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,12 +1,18 @@
+from collections import deque
+from concurrent.futures import Future
 from functools import wraps
 
-import datetime
 import logging
+import threading
 import time
 
 from ibkr_api.base.api_calls                import ApiCalls
 from ibkr_api.base.messages                 import Messages
 from ibkr_api.base.message_parser           import MessageParser
+from ibkr_api.base.reference_data_cache     import ReferenceDataCache, cached_reference_data
+from ibkr_api.base.response_router          import INFO_MESSAGE_ID, PendingRequest, ResponseRouter, Subscription
+from ibkr_api.base.response_router          import routing_request_id
+from ibkr_api.base.single_flight            import SingleFlight, coalesced
 
 from ibkr_api.classes.contracts.contract    import Contract
 from ibkr_api.classes.orders.order import Order
@@ -14,6 +20,9 @@ from ibkr_api.classes.scanner               import Scanner
 
 logger = logging.getLogger(__name__)
 
+UNPROCESSED_MESSAGE_LIMIT = 10000  # Oldest messages no request consumed are dropped past this
+RECEIVE_LOCK_WAIT = 0.05           # Seconds a thread waits for another thread reading the connection
+
 def drop_message_id_and_request_id(func):
     """
     Drops the message id and request id values and only returns the 'actual' data a user expects
@@ -58,7 +67,8 @@ class IBKR_API(ApiCalls):
     - executing api requests
     - gathering various api responses and returns the logically expected data
     """
-    def __init__(self, host, port, client_id:int=0, message_timeout:int=2):
+    def __init__(self, host, port, client_id:int=0, message_timeout:int=2, reader_thread:bool=False,
+                 pacing:bool=False, cache_path:str=None, journal_path:str=None, connection=None):
         # Each application connected to the bridge must have a unique identifier
         self.client_id              = client_id
 
@@ -66,10 +76,22 @@ class IBKR_API(ApiCalls):
         self.message_timeout        = message_timeout
 
         # Stores any message that was skipped during processing (which is a byproduct of hiding the asynchronous design)
-        self.unprocessed_messages   = []
+        self.unprocessed_messages   = deque(maxlen=UNPROCESSED_MESSAGE_LIMIT)
+        self.unprocessed_lock       = threading.Lock()
+
+        # Reference data (contract details, market rules, etc.) is served from here while fresh, set to None to disable
+        # If a cache_path is given the cache is persisted in that sqlite database
+        self.reference_data_cache   = ReferenceDataCache(path=cache_path)
+
+        # Identical requests made at the same time (from several threads) share a single request to the bridge
+        self.single_flight          = SingleFlight()
 
         super().__init__()
-        super().connect(host, port, client_id)
+
+        # Matches the bridge's responses to the requests waiting on them
+        self.router                 = ResponseRouter(self.message_parser)
+        # A journal_path records the traffic, a connection (e.g. a ReplayConnection) stands in for the bridge
+        super().connect(host, port, client_id, reader_thread, pacing, journal_path, connection)
 
         #TODO: Better process the initial market data farm type messages
         #Get the initial info messages and display them
@@ -80,71 +102,192 @@ class IBKR_API(ApiCalls):
 
 
 
-    def _process_response(self, inbound_message_name, end_on_codes=[]):
+    def _process_response(self, inbound_message_name, end_on_codes=[], request_id=None):
         """
+        Wait for the response to a request (see ResponseRouter)
 
         :param inbound_message_name: String or list of strings.
                The last element of the list is considered the flag to trigger the end of receiving data.
         :param end_on_codes: Informational Codes that should be used to flag the end of receiving data
-        :return:
+        :param request_id: Request ID of the request, used to match the response when all its messages carry one
+        :return: None if nothing was received, the data of a single message, otherwise a list of message data
         """
         # Create a list of Inbound Messages we need to process
         if isinstance(inbound_message_name,str):
             inbound_messages = [inbound_message_name]
-        elif isinstance(inbound_message_name,list):
-            inbound_messages = inbound_message_name
-
-
-        # Generate a list of message ids
-        inbound_message_ids = []
-        for name in inbound_messages:
-            inbound_message_ids.append(Messages.inbound[name])
-
-        message_parser    = MessageParser()
-        info_message_id   = Messages.inbound['info_message']
-        data_received     = False
-        all_data          = []
-
-        request_start = datetime.datetime.now()
-        while not data_received:
-            new_messages        = self.conn.receive_messages()
-            #print(type(new_messages))
-            messages_to_process = new_messages + self.unprocessed_messages
-            for msg in messages_to_process:
-                if msg['id'] in inbound_message_ids:
-                    func            = getattr(message_parser, msg['action'])
-                    data            = func(msg['fields'])
-                    all_data.append(data)
-                    if msg['id'] == inbound_message_ids[-1]:
-                        data_received   = True
-                elif msg['id'] == info_message_id:
-                    func    = getattr(message_parser, msg['action'])
-                    data    = func(msg['fields'])
-                    info    = data[2]
-
-                    # Log any message received
-                    logger.info("{0}:{1}".format(info['code'],info['text']))
-
-                    # See if we need to consider this code end of processing
-                    if info['code'] in end_on_codes:
-                        data_received = True
-                else:
-                    logger.debug("Message #{0} - '{1}' added to unprocessed messages".format(msg['id'], msg['action']))
+        else:
+            inbound_messages = list(inbound_message_name)
+
+        # Requests without a response (or a known response message) have nothing to wait for
+        inbound_messages = [name for name in inbound_messages if name in Messages.inbound]
+        if len(inbound_messages) == 0:
+            return None
+
+        pending = self._register_request(inbound_messages, inbound_messages[-1], request_id, end_on_codes)
+        return self._wait_for(pending)
+
+    def _await_response(self, request, request_id=None, end_on_codes=()):
+        """
+        Wait for the response to a request listed in Messages.responses (its data messages and terminator)
+
+        :param request: Name of the request (ApiCalls method)
+        :param request_id: Request ID of the request, used to match the response when all its messages carry one
+        :param end_on_codes: Informational Codes that should be used to flag the end of receiving data
+        :return: None if nothing was received, the data of a single message, otherwise a list of message data
+        """
+        (data_messages, end_message) = Messages.responses[request]
+        return self._wait_for(self._register_request(data_messages, end_message, request_id, end_on_codes))
+
+    def _wait_for(self, pending):
+        """
+        Receive and route messages until the pending request is complete or message_timeout has passed
+
+        :param pending: PendingRequest registered with the router (removed from it before returning)
+        :return: pending.result()
+        """
+        try:
+            self._offer_unprocessed_messages()
+
+            deadline = time.monotonic() + self.message_timeout
+            while not pending.future.done() and time.monotonic() < deadline and self.conn.is_connected():
+                self._receive(pending.future.done)
+        finally:
+            self.router.remove(pending)
+
+        return pending.result()
+
+    def _register_request(self, data_messages, end_message, request_id, end_on_codes=()):
+        """
+        Start routing the response of a request to a new PendingRequest
+
+        :param data_messages: Names of the inbound messages carrying the response's data
+        :param end_message: Name of the message terminating the response (None -> the first data message does)
+        :param request_id: Request ID of the request, only used if every message of the response carries it
+        :param end_on_codes: Informational Codes that should be used to flag the end of receiving data
+        :return: PendingRequest
+        """
+        request_id = routing_request_id(data_messages, end_message, request_id)
+        return self.router.register(PendingRequest(Future(), data_messages, end_message, request_id, end_on_codes))
+
+    def _offer_unprocessed_messages(self):
+        """
+        Offer the messages skipped by previous calls to the pending requests once, those still not consumed are kept
+        """
+        with self.unprocessed_lock:
+            backlog = list(self.unprocessed_messages)
+            self.unprocessed_messages.clear()
+
+        for msg in backlog:
+            if not self.router.dispatch(msg):
+                with self.unprocessed_lock:
                     self.unprocessed_messages.append(msg)
 
-            # We may not be connected to the bridge, if no data received after the message timeout threshold break
-            current_time = datetime.datetime.now()
-            if (current_time - request_start).total_seconds() > self.message_timeout:
-                break
+    def _receive(self, done):
+        """
+        Receive the available messages and route them to the requests waiting on them.
+        receive_messages() waits for data (socket timeout) so loops calling this do not spin.
+        Only one thread reads the connection at a time, the others wait briefly for it to route their responses.
 
-        # If there is no data return None instead
-        # If there is only one result, send it back without the unnecessary list
-        if len(all_data) == 0:
-            all_data = None
-        elif len(all_data) == 1:
-            all_data = all_data[0]
+        :param done: Returns True once the caller has what it waits for (another thread may have routed it)
+        """
+        if not self.conn.receive_lock.acquire(timeout=RECEIVE_LOCK_WAIT):
+            return
+
+        try:
+            if done():
+                return
+            for msg in self.conn.receive_messages():
+                self._route_message(msg)
+        finally:
+            self.conn.receive_lock.release()
+
+    def _route_message(self, msg):
+        """
+        Hand a message to the request waiting on it, log info messages and keep any other message
+
+        :param msg: MessageView from BridgeConnection.receive_messages()
+        """
+        if self.router.dispatch(msg):
+            return
 
-        return all_data
+        if msg['id'] == INFO_MESSAGE_ID:
+            info = self.message_parser.info_message(msg['fields'])[2]
+            logger.info("{0}:{1}".format(info['code'],info['text']))
+        else:
+            logger.debug("Message #{0} - '{1}' added to unprocessed messages".format(msg['id'], msg['action']))
+            with self.unprocessed_lock:
+                self.unprocessed_messages.append(msg)
+
+    def gather(self, request, inputs, max_in_flight=50, **kwargs):
+        """
+        Make the same request for many inputs at once, e.g. request_contract_data for a whole universe.
+        Up to max_in_flight requests wait on the bridge at the same time and the outbound messages are paced
+        (see OutboundScheduler) so the bridge's limits are respected.
+        A request's message_timeout starts once its message is sent, not while pacing holds it back.
+
+        :param request: Name of the request, an ApiCalls method with a response listed in Messages.responses
+        :param inputs: Iterable of the first argument of each request (tuples are used as all positional arguments)
+        :param max_in_flight: Maximum number of requests waiting on a response at the same time
+        :param kwargs: Keyword arguments passed to every request
+        :return: dict of input -> parsed response (see MessageParser, None if nothing was received in time)
+        """
+        if request not in Messages.responses:
+            logger.error("'{0}' has no response to gather.".format(request))
+            return {}
+
+        (data_messages, end_message) = Messages.responses[request]
+        results             = {}
+        queued              = deque(inputs)
+        in_flight           = {}    # PendingRequest -> [input, scheduler ticket, deadline (None until sent)]
+        started_scheduler   = self.conn.scheduler is None
+        if started_scheduler:
+            self.conn.start_scheduler()
+        scheduler           = self.conn.scheduler
+
+        try:
+            self._offer_unprocessed_messages()
+            while queued or in_flight:
+                # Keep the window of requests in flight full
+                while queued and len(in_flight) < max_in_flight:
+                    item                = queued.popleft()
+                    args                = item if isinstance(item, tuple) else (item,)
+                    arguments, request_id = self._bind_request(request, args, kwargs)
+                    pending             = self._register_request(data_messages, end_message, request_id)
+                    scheduler.take_ticket()
+                    getattr(ApiCalls, request)(**arguments)
+
+                    # The ticket of the request's message, if this thread queued one
+                    ticket              = scheduler.take_ticket()
+                    in_flight[pending]  = [item, ticket, None]
+
+                if not self.conn.is_connected():
+                    break
+
+                self._receive(lambda: any(pending.future.done() for pending in in_flight))
+
+                now = time.monotonic()
+                for pending, state in list(in_flight.items()):
+                    (item, ticket, deadline) = state
+                    if deadline is None and (ticket is None or scheduler.is_sent(ticket)):
+                        deadline = state[2] = now + self.message_timeout
+                    if pending.future.done() or (deadline is not None and now >= deadline):
+                        self.router.remove(pending)
+                        results[item] = pending.result()
+                        del in_flight[pending]
+        finally:
+            for pending, (item, ticket, deadline) in in_flight.items():
+                self.router.remove(pending)
+                results[item] = pending.result()
+            for item in queued:
+                results[item] = None
+            if in_flight or queued:
+                logger.warning("gather('{0}') stopped with {1} requests unanswered and {2} not made".format(
+                    request, len(in_flight), len(queued)))
+            if started_scheduler:
+                # Messages queued by other callers meanwhile are still sent
+                self.conn.stop_scheduler(self.message_timeout)
+
+        return results
 
     #################
     ### API Calls ###
@@ -170,7 +313,7 @@ class IBKR_API(ApiCalls):
         super().calculate_implied_volatility(request_id, contract, option_price, underlying_price, implied_vol_options)
 
         # Process the response from the bridge
-        data = self._process_response('tick_option_computation')
+        data = self._process_response('tick_option_computation', request_id=request_id)
         return data
 
     def calculate_option_price(self,
@@ -455,17 +598,66 @@ class IBKR_API(ApiCalls):
         # Process the response from the bridge
         request_id = self.get_local_request_id()
         super().request_market_data(request_id, contract, generic_tick_list, snapshot, regulatory_snapshot, market_data_options)
-        messages = ['tick_price','tick_size']
-        data = self._process_response('tick_option_computation')
+        (messages, end_message) = Messages.responses['request_market_data']
+        data = self._process_response(messages + [end_message], request_id=request_id)
         return data
 
+    def stream_market_data(self,
+                           contract             : Contract  ,
+                           generic_tick_list    : str=""    ,
+                           snapshot             : bool=False,
+                           regulatory_snapshot  : bool=False):
+        """
+        Stream market data. Nothing is requested before the first tick is asked for (a generator never iterated
+        leaves no subscription behind), the subscription is cancelled once the iterator is closed (or garbage collected)
+
+        Example:
+            for (message_id, request_id, tick) in api.stream_market_data(contract):
+                ...
+
+        :param contract: Contract for which market data is being requested
+        :param generic_tick_list: A comma separated string of ticks (see request_market_data)
+        :param snapshot: If true, the stream ends once the snapshot is complete
+        :param regulatory_snapshot: With the US Value Snapshot Bundle for stocks, regulatory snapshots are available for 0.01 USD each.
+        :return: Iterator of parsed tick_price, tick_size, tick_string, etc. messages (see MessageParser)
+        """
+        request_id = self.get_local_request_id()
+        (messages, end_message) = Messages.responses['request_market_data']
+        subscription = self.router.register(Subscription(messages, request_id, end_message))
+        ApiCalls.request_market_data(self, request_id, contract, generic_tick_list, snapshot, regulatory_snapshot, [])
+        yield from self._stream(subscription, ApiCalls.cancel_market_data)
+
+    def _stream(self, subscription, cancel):
+        """
+        Yield the events of a subscription as they arrive
+
+        :param subscription: Subscription registered with the router
+        :param cancel: ApiCalls function cancelling the subscription, called with its request id
+        """
+        try:
+            self._offer_unprocessed_messages()
+            while True:
+                while subscription.events:
+                    yield subscription.events.popleft()
+
+                if subscription.done or not self.conn.is_connected():
+                    return
+
+                self._receive(lambda: subscription.events or subscription.done)
+        finally:
+            self.router.remove(subscription)
+            if not subscription.done and self.conn.is_connected():
+                cancel(self, subscription.request_id)
+
+    @cached_reference_data('matching_symbols')
+    @coalesced('matching_symbols')
     def request_matching_symbols(self, pattern: str):
         # Make the underlying API call
         request_id = self.get_local_request_id()
         super().request_matching_symbols(request_id,pattern)
 
         # Process the response from the bridge
-        data = self._process_response('symbol_samples')
+        data = self._process_response('symbol_samples', request_id=request_id)
         return data
 
 
@@ -498,10 +690,11 @@ class IBKR_API(ApiCalls):
         super().request_security_definition_option_parameters(request_id, underlying.symbol, exchange,
                                                               underlying.security_type, underlying.id)
         messages_to_process = ['security_definition_option_parameter','security_definition_option_parameter_end']
-        data = self._process_response(messages_to_process)
+        data = self._process_response(messages_to_process, request_id=request_id)
 
         return data
 
+    @cached_reference_data('security_definition_option_parameters')
     def request_security_definition_option_parameters(self,
                                                       underlying_symbol     : str,
                                                       exchange              : str,
@@ -512,7 +705,7 @@ class IBKR_API(ApiCalls):
         request_id = self.get_local_request_id()
         super().request_security_definition_option_parameters(request_id, underlying_symbol, exchange,
                                                               underlying_sec_type, underlying_contract_id)
-        data = self._process_response('security_definition_option_parameter')
+        data = self._process_response('security_definition_option_parameter', request_id=request_id)
         return data
 
     def request_positions(self):
@@ -533,6 +726,7 @@ class IBKR_API(ApiCalls):
                 position_data.append(raw_data[2])
         return position_data
 
+    @cached_reference_data('smart_components')
     @drop_message_id_and_request_id
     def request_smart_components(self,
                                  bbo_exchange: str):
@@ -547,10 +741,11 @@ class IBKR_API(ApiCalls):
         super().request_smart_components(request_id, bbo_exchange)
 
         # Process the response from the bridge
-        data = self._process_response('smart_components')
+        data = self._process_response('smart_components', request_id=request_id)
 
         return data
 
+    @cached_reference_data('scanner_parameters')
     @drop_message_id_and_request_id
     def request_scanner_parameters(self):
         """
@@ -587,7 +782,7 @@ class IBKR_API(ApiCalls):
         scanner_filter_options = "" # I believe this is an attribute internal to IB, for now it is not exposed
         super().request_scanner_subscription(request_id, scanner, scanner_options, scanner_filter_options)
         # Process the response from the bridge
-        data = self._process_response('scanner_data')
+        data = self._process_response('scanner_data', request_id=request_id)
         return data
 
     def request_soft_dollar_tiers(self, request_id: int):
@@ -595,7 +790,7 @@ class IBKR_API(ApiCalls):
         registered professional advisors and hedge and mutual funds who have
         configured Soft Dollar Tiers in Account Management."""
         # Process the response from the bridge
-        data = self._process_response('soft_dollar_tiers')
+        data = self._process_response('soft_dollar_tiers', request_id=request_id)
         return data
 
     # Not alphabetic
@@ -632,7 +827,7 @@ class IBKR_API(ApiCalls):
         request_id = self.get_local_request_id()
         super().request_account_updates_multi(request_id, account, model_code, ledger_and_nlv)
         # Process the response from the bridge
-        data = self._process_response('account_updates_multi')
+        data = self._await_response('request_account_updates_multi', request_id=request_id)
         return data
 
     def request_account_summary(self, request_id: int, group_name: str, tags: str):
@@ -768,12 +963,11 @@ class IBKR_API(ApiCalls):
         super().request_current_time()
 
         # Receive the response
-        message = self.conn.receive_messages()[0]
-
-        # Call the message parser to get extract the data
-        action_func = getattr(self.message_parser, message['action'])
-        (request_id, timestamp) = action_func(message)
+        data = self._process_response('current_time')
+        if data is None:
+            return None
 
+        (message_id, request_id, timestamp) = data
         return timestamp
 
     def request_executions(self, 
@@ -806,7 +1000,7 @@ class IBKR_API(ApiCalls):
 
         # Process the response from the bridge
         messages_to_process = ['execution_data','execution_data_end']
-        full_execution_data = self._process_response(messages_to_process)
+        full_execution_data = self._process_response(messages_to_process, request_id=request_id)
 
         # Strip out the message_ids and request_order_ids
         execution_data = []
@@ -847,7 +1041,7 @@ class IBKR_API(ApiCalls):
         request_id = self.get_local_request_id()
         super().request_head_time_stamp(request_id, contract, what_to_show, only_use_rth, format_date)
         # Process the response from the bridge
-        data = self._process_response('head_time_stamp')
+        data = self._process_response('head_time_stamp', request_id=request_id)
         return data
 
     def request_historical_news(self,
@@ -866,7 +1060,7 @@ class IBKR_API(ApiCalls):
                                         end_date_time, total_results, historical_news_options)
 
         # Process the response from the bridge
-        data = self._process_response('request_historical_news')
+        data = self._await_response('request_historical_news', request_id=request_id)
         return data
 
     def request_historical_ticks(self, request_id: int, contract: Contract, start_date_time: str,
@@ -893,7 +1087,7 @@ class IBKR_API(ApiCalls):
                                          what_to_show, only_use_rth, ignore_size, miscOptions)
 
         # Process the response from the bridge
-        data = self._process_response('request_historical_ticks')
+        data = self._await_response('request_historical_ticks', request_id=request_id)
         return data
 
     def request_managed_accounts(self):
@@ -923,6 +1117,8 @@ class IBKR_API(ApiCalls):
         data = self._process_response('market_data_type')
         return data
 
+    @cached_reference_data('market_depth_exchanges')
+    @drop_message_id_and_request_id
     def request_market_depth_exchanges(self):
         """
 
@@ -931,9 +1127,10 @@ class IBKR_API(ApiCalls):
         super().request_market_depth_exchanges()
 
         # Process the response from the bridge
-        data = self._process_response('request_market_depth_exchanges')
+        data = self._process_response('mkt_depth_exchanges')
         return data
 
+    @cached_reference_data('market_rule')
     @drop_message_id_and_request_id
     def request_market_rule(self, market_rule_id: int):
         """
@@ -949,6 +1146,7 @@ class IBKR_API(ApiCalls):
         data = self._process_response('market_rule')
         return data
 
+    @drop_message_id_and_request_id
     def request_news_providers(self):
         """
         Request a list of news providers.
@@ -959,7 +1157,7 @@ class IBKR_API(ApiCalls):
         super().request_news_providers()
 
         # Process the response from the bridge
-        data = self._process_response('request_news_providers')
+        data = self._process_response('news_providers')
         return data
 
     def request_open_orders(self):
@@ -982,8 +1180,10 @@ class IBKR_API(ApiCalls):
         """Requests positions for account and/or model.
         Results are delivered via EWrapper.positionMulti() and
         EWrapper.positionMultiEnd() """
+        super().request_positions_multi(request_id, account, model_code)
+
         # Process the response from the bridge
-        data = self._process_response('request_positions_multi')
+        data = self._await_response('request_positions_multi', request_id=request_id)
         return data
 
     def set_server_log_level(self, log_level: int):
@@ -1004,9 +1204,11 @@ class IBKR_API(ApiCalls):
 
         # Process the response from the bridge
         super().subscribe_to_group_events(request_id,group_id)
-        data = self._process_response('subscribe_to_group_events')
+        data = self._await_response('subscribe_to_group_events', request_id=request_id)
         return data
 
+    @cached_reference_data('contract_data')
+    @coalesced('contract_data')
     @drop_message_id_and_request_id
     def request_contract_data(self,
                               contract: Contract):
@@ -1024,7 +1226,7 @@ class IBKR_API(ApiCalls):
 
         # Process contract_data and contract_data_end response messages
         messages_to_process = ['contract_data','contract_data_end']
-        data = self._process_response(messages_to_process)
+        data = self._process_response(messages_to_process, request_id=request_id)
 
         return data
 
@@ -1060,7 +1262,7 @@ class IBKR_API(ApiCalls):
 
         super().request_historical_data(request_id, contract,end_date_time,duration, bar_size_setting, what_to_show,
                                         only_use_rth, format_date, keep_up_to_date, chart_options)
-        data = self._process_response('historical_data')
+        data = self._process_response('historical_data', request_id=request_id)
         return data
 
     def request_news_bulletins(self, all_messages: bool):
@@ -1091,13 +1293,13 @@ class IBKR_API(ApiCalls):
         super().request_pnl(request_id, account, model_code)
 
         # Process the response from the bridge
-        data = self._process_response('pnl')
+        data = self._process_response('pnl', request_id=request_id)
         return data
 
     def request_pnl_single(self, request_id: int, account: str, model_code: str, contract_id: int):
         super().request_pnl_single(request_id,account,model_code, contract_id)
         # Process the response from the bridge
-        data = self._process_response('pnl_single')
+        data = self._process_response('pnl_single', request_id=request_id)
         return data
 
     def request_tick_by_tick_data(self,
@@ -1121,7 +1323,7 @@ class IBKR_API(ApiCalls):
         super().request_tick_by_tick_data(request_id, contract, tick_type, number_of_ticks, ignore_size)
 
         # Process the response from the bridge
-        data = self._process_response('tick_by_tick_data')
+        data = self._process_response('tick_by_tick', request_id=request_id)
         return data
 
     def tws_connection_time(self):
@@ -1186,7 +1388,7 @@ class IBKR_API(ApiCalls):
         request_id = self.get_local_request_id()
         super().request_market_depth(request_id, contract, num_rows, is_smart_depth, market_depth_options)
         # Process the response from the bridge
-        data = self._process_response('market_depth')
+        data = self._process_response('market_depth', request_id=request_id)
         return data
 
     def cancel_news_bulletins(self):
@@ -1295,7 +1497,7 @@ class IBKR_API(ApiCalls):
         request_id = self.get_local_request_id()
         super().request_fundamental_data(request_id, contract, report_type, request_options)
         end_on_codes = [430]
-        message_id, request_id, data = self._process_response('fundamental_data', end_on_codes)
+        message_id, request_id, data = self._process_response('fundamental_data', end_on_codes, request_id=request_id)
         return data
 
 
@@ -1308,7 +1510,7 @@ class IBKR_API(ApiCalls):
         super().request_news_article(request_id,provider_code, article_id, news_article_options)
 
         # Process the response from the bridge
-        data = self._process_response('news_article')
+        data = self._process_response('news_article', request_id=request_id)
         return data
 
     def query_display_groups(self):
@@ -1326,7 +1528,7 @@ class IBKR_API(ApiCalls):
         super().query_display_groups(request_id)
 
         # Process the response from the bridge
-        data = self._process_response('display_group_list')
+        data = self._process_response('display_group_list', request_id=request_id)
         return data
 
     def update_display_group(self, request_id: int, contract_info: str):
@@ -5,6 +5,8 @@ from ibkr_api.base.bridge_connection    import BridgeConnection
 from ibkr_api.base.constants            import *
 from ibkr_api.base.errors               import NOT_CONNECTED, Errors, BAD_MESSAGE
 from ibkr_api.base.messages             import Messages
+from ibkr_api.base.message_encoder      import CONTRACT_DATA_CONTRACT_FIELDS, CONTRACT_DATA_FIELD_DEFAULTS, \
+                                               MARKET_DEPTH_CONTRACT_FIELDS, ORDER_CONTRACT_FIELDS
 from ibkr_api.base.message_parser       import MessageParser
 
 from ibkr_api.classes.contracts.contract import Contract
@@ -13,10 +15,15 @@ from ibkr_api.classes.scanner import Scanner
 
 from enum import Enum
 from functools import wraps
+import inspect
 import socket
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Parameters identifying a request in the bridge's responses (the first two are generated when not supplied)
+REQUEST_ID_PARAMETERS = ('request_id', 'ticker_id', 'order_id', 'market_rule_id')
+
 
 def check_connection(func):
     @wraps(func)
@@ -47,6 +54,7 @@ class ApiCalls(object):
         self.optional_capabilities  = ""                   # Hell if I know, IBKR's documentation has nothing...
         self.port                   = None                 # Bridge's Port
         self.request_id             = 0                    # Unique Identifier for the request
+        self.request_id_lock        = threading.Lock()     # Request IDs may be generated from several threads
         self.server_version_        = None
 
         self.connection_time  = None
@@ -105,10 +113,39 @@ class ApiCalls(object):
     # Public Functions #
     ####################
     def get_local_request_id(self):
-        request_id = self.request_id
-        self.request_id += 1
+        with self.request_id_lock:
+            request_id = self.request_id
+            self.request_id += 1
         return request_id
 
+    def _bind_request(self, name, args, kwargs):
+        """
+        Bind the arguments of a request, generating a request id if the request takes one that was not supplied
+        (only requests producing a response get one, cancellations refer to the id of an earlier request)
+
+        :param name: Name of the request (ApiCalls method)
+        :param args: Positional arguments, excluding the request id
+        :param kwargs: Keyword arguments
+        :return: (keyword arguments for the ApiCalls method, value identifying the request in the responses)
+        """
+        signature   = inspect.signature(getattr(ApiCalls, name))
+        generated   = [p for p in REQUEST_ID_PARAMETERS[:2] if p in signature.parameters]
+
+        if generated and generated[0] not in kwargs and name in Messages.responses:
+            parameters  = [p for p in signature.parameters.values() if p.name != generated[0]]
+            arguments   = signature.replace(parameters=parameters).bind(self, *args, **kwargs).arguments
+            arguments[generated[0]] = self.get_local_request_id()
+        else:
+            arguments   = signature.bind(self, *args, **kwargs).arguments
+
+        request_id = None
+        for parameter in REQUEST_ID_PARAMETERS:
+            if parameter in arguments:
+                request_id = arguments[parameter]
+                break
+
+        return dict(arguments), request_id
+
     @check_connection
     def calculate_implied_volatility(self,
                                      request_id             : int,
@@ -246,7 +283,7 @@ class ApiCalls(object):
         # send req market data msg
         message_version = 2
         message_id = Messages.outbound['cancel_market_data']
-        fields = [message_id, message_version, request_id]
+        fields = [self.conn.encoder.header(message_id, message_version), request_id]
         self.conn.send_message(fields)
 
     @check_connection
@@ -277,7 +314,7 @@ class ApiCalls(object):
 
         message_version = 1
         message_id = Messages.outbound['cancel_order']
-        fields = [message_id, message_version, order_id]
+        fields = [self.conn.encoder.header(message_id, message_version), order_id]
         self.conn.send_message(fields)
 
     @check_connection
@@ -395,10 +432,6 @@ class ApiCalls(object):
         # Gather the fields needed for the message
         message_id                          = Messages.outbound['place_order']
         message_version                     = 45
-        last_trade_date_or_contract_month   = getattr(contract ,'last_trade_date_or_contract_month' , '')
-        strike                              = getattr(contract ,'strike'                            , 0.0)
-        right                               = getattr(contract ,'right'                             , '')
-        multiplier                          = getattr(contract ,'multiplier'                        , '')
 
         aux_price                           = getattr(order ,   'aux_price'                 ,   '')
         volatility                          = getattr(order ,   'volatility'                ,   '')
@@ -414,21 +447,10 @@ class ApiCalls(object):
         scale_price_increment               = getattr(order ,   'scale_price_increment'     ,   0.0)
         scale_table                         = getattr(order ,   'scale_table'               ,   '')
 
-        fields      = [message_id, order_id, contract.id]
+        # Contract fields: id, symbol, security type, ..., trading class, security id type, security id
+        fields      = [self.conn.encoder.header(message_id), order_id,
+                       self.conn.encoder.contract(contract, ORDER_CONTRACT_FIELDS)]
         fields +=   [
-                    contract.symbol                     ,
-                    contract.security_type              ,
-                    last_trade_date_or_contract_month   ,
-                    strike                              ,
-                    right                               ,
-                    multiplier                          ,
-                    contract.exchange                   ,
-                    contract.primary_exchange           ,
-                    contract.currency                   ,
-                    contract.local_symbol               ,
-                    contract.trading_class              ,
-                    contract.security_id_type           ,
-                    contract.security_id                ,
                     order.action                        ,
                     order.total_quantity                ,
                     order.order_type                    ,
@@ -755,27 +777,10 @@ class ApiCalls(object):
         # send req market data msg
         message_version = 8
 
-        # Handle the Fields that may not exist in a contract
-        last_trade_date_or_contract_month = ''
-        if hasattr(contract, 'last_trade_date_or_contract_month'):
-            last_trade_date_or_contract_month = contract.last_trade_date_or_contract_month
-
-        multiplier = ''
-        if hasattr(contract,'multiplier'):
-            multiplier = contract.multiplier
-        right = ''
-        if hasattr(contract, 'right'):
-            right = contract.right
-
-        strike = ''
-        if hasattr(contract, 'strike'):
-            strike = contract.strike
-
+        # Fields that may not exist in a contract (expiry, strike, right, multiplier) are sent empty
         message_id = Messages.outbound['request_contract_data']
-        fields = [message_id, message_version, request_id, contract.id, contract.symbol,
-                  contract.security_type, last_trade_date_or_contract_month,strike, right,
-                  multiplier,contract.exchange, contract.primary_exchange,contract.currency, contract.local_symbol,
-                  contract.trading_class,contract.include_expired,  contract.security_id_type, contract.security_id]
+        fields = [self.conn.encoder.header(message_id, message_version), request_id,
+                  self.conn.encoder.contract(contract, CONTRACT_DATA_CONTRACT_FIELDS, CONTRACT_DATA_FIELD_DEFAULTS)]
 
         self._send_message(fields)
         return request_id
@@ -1044,7 +1049,8 @@ class ApiCalls(object):
         fields = [message_id, message_version, request_id, group_id]
         self.conn.send_message(fields)
 
-    def connect(self, host, port, client_id):
+    def connect(self, host, port, client_id, reader_thread=False, pacing=False, journal_path=None,
+                connection=None):
         """
         This function must be called before any other. There is no
         feedback for a successful connection, but a subsequent attempt to
@@ -1058,18 +1064,28 @@ class ApiCalls(object):
             orders placed/modified from this client will be associated with
             this client identifier.
 
-            Note: Each client MUST connect with a unique client_id."""
+            Note: Each client MUST connect with a unique client_id.
+        reader_thread:bool - If True, a dedicated thread drains the socket and queues the
+            inbound messages (see BridgeConnection.start_reader).
+        pacing:bool - If True, outbound messages are paced and prioritized to stay within the
+            bridge's limits (see BridgeConnection.start_scheduler).
+        journal_path:str - If given, every frame sent and received is recorded to this file
+            (see BridgeConnection.start_recording).
+        connection:BridgeConnection - Used instead of a connection to host:port, e.g. a
+            ReplayConnection playing back a journal."""
 
         # Establish connection to the bridge (TWS/IBGW)
         self.api_state = "Establishing Connection to the Bridge Application(TWS/IB Gateway)"
         self.host = host
         self.port = port
         self.client_id = client_id
-        logger.info("Connecting to %s:%d w/ id:%d", self.host, self.port, self.client_id)
-        self.conn = BridgeConnection(self.host, self.port)
+        logger.info("Connecting to %s:%s w/ id:%d", self.host, self.port, self.client_id)
+        self.conn = connection if connection is not None else BridgeConnection(self.host, self.port)
 
         try:
             self.conn.connect()
+            if journal_path:
+                self.conn.start_recording(journal_path)
 
             # Send a message to connect to the Bridge (No response is given)
             v100prefix = "API\0"
@@ -1078,17 +1094,30 @@ class ApiCalls(object):
             msg = str.encode(v100prefix, 'ascii') + msg
             self.conn.send_message(msg)
 
-            message = self.conn.receive_messages(False)[0]
-            (server_version, conn_time) = message
+            # The bridge answers with its version and the connection time (it closes the socket if it rejects us)
+            messages = self.conn.receive_messages(False)
+            if not messages or len(messages[0]) < 2:
+                logger.error("No version handshake received from %s:%s", self.host, self.port)
+                self.conn.disconnect()
+                self.api_state  = "Disconnected from the Bridge Application(TWS/IB Gateway)."
+                return
+
+            (server_version, conn_time) = messages[0][:2]
 
             self.connection_time = conn_time
             logger.info("Connection Time: {0}".format(self.connection_time))
 
             self.server_version_ = int(server_version)
             logger.info("Server Version: {0}".format(self.server_version_))
+            self.message_parser.use_server_version(self.server_version_)
 
             self.start_api()
-            logger.info("Connected to %s:%d w/ id:%d", self.host, self.port, self.client_id)
+            logger.info("Connected to %s:%s w/ id:%d", self.host, self.port, self.client_id)
+
+            if reader_thread:
+                self.conn.start_reader()
+            if pacing:
+                self.conn.start_scheduler()
 
         except socket.error:
             logging.error(socket.error)
@@ -1317,11 +1346,7 @@ class ApiCalls(object):
 
         # send req market data msg
         message_id = Messages.outbound['request_market_data']
-        fields = [message_id, message_version, request_id, contract.id, contract.symbol, contract.security_type,
-                          contract.last_trade_date_or_contract_month,
-                          contract.strike, contract.right, contract.multiplier, contract.exchange,
-                          contract.primary_exchange,
-                          contract.currency, contract.local_symbol, contract.trading_class]
+        fields = [self.conn.encoder.header(message_id, message_version), request_id, self.conn.encoder.contract(contract)]
 
 
         # Send Combo Legs for BAG Requests
@@ -1348,8 +1373,7 @@ class ApiCalls(object):
         market_data_options = ""
         fields.extend([generic_tick_list, snapshot, regulatory_snapshot, market_data_options])
 
-        message = self.conn.make_message(fields)
-        self.conn.send_message(message)
+        self.conn.send_message(fields)
 
     def tws_connection_time(self):
         """Returns the time the API application made a connection to TWS."""
@@ -1411,14 +1435,11 @@ class ApiCalls(object):
         message_version = 5
         message_id = Messages.outbound['request_market_depth']
         # send req market depth msg
-        fields = [  message_id                                  ,   message_version         ,
-                    request_id                                  ,   contract.id             ,
-                    contract.symbol                             ,   contract.security_type  ,
-                    contract.last_trade_date_or_contract_month  ,   contract.strike         ,
-                    contract.right                              ,   contract.multiplier     ,
-                    contract.exchange                           ,   contract.currency       ,
-                    contract.local_symbol                       ,   contract.trading_class  ,
-                    num_rows                                    ,   is_smart_depth          ,
+        fields = [  self.conn.encoder.header(message_id, message_version)               ,
+                    request_id                                                          ,
+                    self.conn.encoder.contract(contract, MARKET_DEPTH_CONTRACT_FIELDS)  ,
+                    num_rows                                                            ,
+                    is_smart_depth                                                      ,
                 ]
 
         # send market_depth_options parameter
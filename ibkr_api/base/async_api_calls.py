@@ -0,0 +1,167 @@
+import asyncio
+import logging
+
+from ibkr_api.base.api_calls                import ApiCalls
+from ibkr_api.base.async_bridge_connection  import AsyncBridgeConnection
+from ibkr_api.base.messages                 import Messages
+from ibkr_api.base.response_router          import PendingRequest, ResponseRouter, Subscription, INFO_MESSAGE_ID
+from ibkr_api.base.response_router          import routing_request_id
+
+logger = logging.getLogger(__name__)
+
+# ApiCalls methods that are not requests to the bridge
+NOT_REQUESTS = ('connect', 'get_local_request_id', 'server_version', 'start_api', 'tws_connection_time')
+
+
+class AsyncApiCalls(ApiCalls):
+    """
+    asyncio version of ApiCalls
+
+    ## Responsibilities
+    Expose every request in ApiCalls as a coroutine returning the parsed response (see MessageParser)
+    Allow any number of requests to be in flight at the same time over a single connection
+    """
+    def __init__(self, message_timeout=10):
+        """
+        :param message_timeout: Seconds to wait for a request to complete before returning what has been received
+        """
+        super().__init__()
+        self.message_timeout    = message_timeout
+        self.router             = ResponseRouter(self.message_parser)
+
+    async def connect(self, host, port, client_id):
+        """
+        Connect to the bridge (TWS/IBGW), perform the handshake and start the API
+
+        :param host: Host of the Bridge
+        :param port: Port of the Bridge
+        :param client_id: Unique identifier of this client
+        """
+        self.api_state  = "Establishing Connection to the Bridge Application(TWS/IB Gateway)"
+        self.host       = host
+        self.port       = port
+        self.client_id  = client_id
+        logger.info("Connecting to %s:%s w/ id:%d", self.host, self.port, self.client_id)
+        self.conn       = AsyncBridgeConnection(self.host, self.port, self._dispatch_message)
+
+        handshake = await self.conn.connect()
+        if handshake is None:
+            self.api_state = "Disconnected from the Bridge Application(TWS/IB Gateway)."
+            return
+
+        (server_version, conn_time) = handshake
+        self.connection_time = conn_time
+        self.server_version_ = int(server_version)
+        logger.info("Server Version: {0}".format(self.server_version_))
+        self.message_parser.use_server_version(self.server_version_)
+
+        ApiCalls.start_api(self)
+        logger.info("Connected to %s:%s w/ id:%d", self.host, self.port, self.client_id)
+
+    def disconnect(self):
+        self.conn.disconnect()
+
+    async def stream_market_data(self, contract, generic_tick_list="", snapshot=False, regulatory_snapshot=False):
+        """
+        Stream market data, the subscription is cancelled once the async iterator is closed
+
+        Example:
+            async for (message_id, request_id, tick) in api.stream_market_data(contract):
+                ...
+
+        :param contract: Contract for which market data is being requested
+        :param generic_tick_list: A comma separated string of ticks (see request_market_data)
+        :param snapshot: If true, the stream ends once the snapshot is complete
+        :param regulatory_snapshot: With the US Value Snapshot Bundle for stocks, regulatory snapshots are available for 0.01 USD each.
+        :return: Async iterator of parsed tick_price, tick_size, tick_string, etc. messages (see MessageParser)
+        """
+        if self.conn is None or not self.conn.is_connected():
+            logger.warning("Not connected to the Bridge Application (TWS/IB Gateway).")
+            return
+
+        request_id = self.get_local_request_id()
+        (messages, end_message) = Messages.responses['request_market_data']
+        subscription = self.router.register(Subscription(messages, request_id, end_message))
+        ApiCalls.request_market_data(self, request_id, contract, generic_tick_list, snapshot, regulatory_snapshot, [])
+
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while subscription.events:
+                    yield subscription.events.popleft()
+
+                if subscription.done or not self.conn.is_connected():
+                    return
+
+                # The timeout only lets a lost connection be noticed
+                subscription.waiter = loop.create_future()
+                try:
+                    await asyncio.wait_for(subscription.waiter, self.message_timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.router.remove(subscription)
+            if not subscription.done and self.conn.is_connected():
+                ApiCalls.cancel_market_data(self, request_id)
+
+    def _dispatch_message(self, message):
+        if not self.router.dispatch(message):
+            self.unhandled_message(message)
+
+    def unhandled_message(self, message):
+        """
+        Called for every message no request is waiting on.
+        This function is meant to be overridden
+
+        :param message: MessageView
+        """
+        if message['id'] == INFO_MESSAGE_ID:
+            info = self.message_parser.info_message(message['fields'])[2]
+            logger.info("{0}:{1}".format(info['code'], info['text']))
+        else:
+            logger.debug("Message #{0} - '{1}' not awaited by any request".format(message['id'], message['action']))
+
+    async def _request(self, name, args, kwargs):
+        """
+        Send a request and wait for its response
+
+        :param name: Name of the request (ApiCalls method)
+        :return: Parsed response (None if nothing was received before the message timeout)
+        """
+        if self.conn is None or not self.conn.is_connected():
+            logger.warning("Not connected to the Bridge Application (TWS/IB Gateway).")
+            return None
+
+        arguments, request_id = self._bind_request(name, args, kwargs)
+        response = Messages.responses.get(name)
+        if response is None:
+            getattr(ApiCalls, name)(**arguments)
+            return None
+
+        (data_messages, end_message) = response
+        request_id  = routing_request_id(data_messages, end_message, request_id)
+        future      = asyncio.get_running_loop().create_future()
+        pending     = self.router.register(PendingRequest(future, data_messages, end_message, request_id))
+        try:
+            getattr(ApiCalls, name)(**arguments)
+            return await asyncio.wait_for(asyncio.shield(future), self.message_timeout)
+        except asyncio.TimeoutError:
+            logger.debug("'{0}' timed out, returning the data received so far".format(name))
+            return pending.result()
+        finally:
+            self.router.remove(pending)
+
+
+def _request_coroutine(name):
+    async def request(self, *args, **kwargs):
+        return await self._request(name, args, kwargs)
+
+    request.__name__        = name
+    request.__qualname__    = "AsyncApiCalls.{0}".format(name)
+    request.__doc__         = getattr(ApiCalls, name).__doc__
+    return request
+
+
+for _name, _func in list(vars(ApiCalls).items()):
+    if callable(_func) and not _name.startswith('_') and _name not in NOT_REQUESTS:
+        setattr(AsyncApiCalls, _name, _request_coroutine(_name))
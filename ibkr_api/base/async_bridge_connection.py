@@ -0,0 +1,112 @@
+"""
+asyncio based Bridge Connection between a client application and the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Managing the asyncio transport between the app and the bridge
+2. Properly creating low level messages for the bridge (shared with BridgeConnection)
+3. Framing the bridge's responses as they arrive and handing each message to the message handler
+"""
+
+import asyncio
+import logging
+import time
+
+from ibkr_api.base.bridge_connection    import BridgeConnection
+from ibkr_api.base.constants            import CONNECTED, DISCONNECTED, MAX_CLIENT_VER, MIN_CLIENT_VER
+from ibkr_api.base.errors               import Errors
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBridgeConnection(BridgeConnection, asyncio.Protocol):
+    def __init__(self, host, port, message_handler=None):
+        """
+        :param host: Host of the Bridge
+        :param port: Port of the Bridge
+        :param message_handler: Called with every message dictionary received after the handshake
+        """
+        super().__init__(host, port)
+        self.transport          = None
+        self.handshake          = None      # Future completed with the fields of the bridge's first message
+        self.message_handler    = message_handler
+
+    async def connect(self):
+        """
+        Open the connection and perform the v100+ handshake
+
+        :return: Fields of the handshake response (server_version, connection_time) or None if it failed
+        """
+        loop = asyncio.get_running_loop()
+        self.handshake = loop.create_future()
+
+        try:
+            await loop.create_connection(lambda: self, self.host, self.port)
+        except OSError:
+            logger.error(Errors.connect_fail()['message'])
+            self.status = DISCONNECTED
+            return None
+
+        # Send a message to connect to the Bridge (the response carries the server version)
+        v100version = "v%d..%d" % (MIN_CLIENT_VER, MAX_CLIENT_VER)
+        self.send_message(str.encode("API\0", 'ascii') + self.make_msg(v100version))
+
+        return await self.handshake
+
+    def disconnect(self):
+        logger.debug("Closing connection to the api bridge (TWS/IB Gateway)")
+        if self.transport is not None:
+            self.transport.close()
+        self.transport  = None
+        self.status     = DISCONNECTED
+        self.decoder.reset()
+
+    def is_connected(self):
+        return (self.transport is not None) and (self.status == CONNECTED)
+
+    def send_message(self, msg, make_msg=False):
+        """
+        Queue a message on the transport (never blocks)
+
+        :param msg: List of fields or an already encoded message
+        :return: Number of bytes queued
+        """
+        if isinstance(msg, list):
+            msg = self.make_message(msg)
+        if make_msg:
+            msg = self.make_msg(msg)
+
+        self.transport.write(msg)
+        self.bytes_sent += len(msg)
+        logger.debug("Message Sent: {0}".format(msg))
+        return len(msg)
+
+    ##############################
+    # asyncio.Protocol Callbacks #
+    ##############################
+    def connection_made(self, transport):
+        self.transport  = transport
+        self.status     = CONNECTED
+
+    def connection_lost(self, exc):
+        logger.warning("Connection to the bridge lost: {0}".format(exc))
+        self.transport  = None
+        self.status     = DISCONNECTED
+        if self.handshake is not None and not self.handshake.done():
+            self.handshake.set_result(None)
+
+    def data_received(self, data):
+        self.bytes_received += len(data)
+        self.decoder.feed(data)
+
+        messages = []
+        self._decode_frames(messages, True, time.monotonic())
+        if self.decoder.out_of_sync and self.transport is not None:
+            self.transport.close()
+        for message in messages:
+            if not self.handshake.done():
+                self.handshake.set_result(message['fields'])
+            elif self.message_handler is not None:
+                try:
+                    self.message_handler(message)
+                except Exception:
+                    logger.exception("Failed to process '{0}' message".format(message['action']))
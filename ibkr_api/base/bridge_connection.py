@@ -15,15 +15,24 @@ Bridge Connection between a client application and the bridge (TWS/IBGW)
 
 
 import logging
+import queue
+import selectors
 import socket
-import struct
+import threading
+import time
 
-from ibkr_api.base.constants    import DISCONNECTED, UNKNOWN, CONNECTED
-from ibkr_api.base.errors       import FAIL_CREATE_SOCK, Errors
-from ibkr_api.base.messages     import Messages
+from ibkr_api.base.constants    import DISCONNECTED, UNKNOWN, CONNECTED, INBOUND_QUEUE_SIZE
+from ibkr_api.base.errors       import FAIL_CREATE_SOCK, SOCKET_EXCEPTION, Errors
+from ibkr_api.base.frame_decoder import FRAME_HEADER, FrameDecoder
+from ibkr_api.base.message_encoder import MessageEncoder, encode_message
+from ibkr_api.base.message_view import MessageView
+from ibkr_api.base.outbound_scheduler import OutboundScheduler
+from ibkr_api.base.recorder import INBOUND, Recorder
 
 logger = logging.getLogger(__name__)
 
+MAX_READS = 16      # Reads of a single _read_socket call, so a bridge that never lets the socket drain can't starve its caller
+
 class BridgeConnection:
     def __init__(self, host, port):
         self.host = host
@@ -31,6 +40,22 @@ class BridgeConnection:
         self.socket = None
         self.status = UNKNOWN
         self.request_id = -1
+        self.decoder = FrameDecoder()     # Holds partial messages between reads
+        self.encoder = MessageEncoder()   # Caches encoded message headers and contracts
+        self.inbound = None               # Messages framed by the reader thread (if it is running)
+        self.reader = None                # Optional thread that continuously drains the socket
+        self.reader_running = False
+        self.scheduler = None             # Optional pacing of the outbound messages
+        self.receive_lock = threading.Lock()  # Held by the thread reading the socket when several threads share it
+        self.send_lock = threading.Lock()     # Keeps messages sent by several threads from interleaving
+        self.selector = None              # Waits for the socket to become readable (see poll)
+        self.recorder = None              # Optional journal of the frames sent and received
+
+        # Metrics (see metrics(), Metrics derives rates and serves them)
+        self.bytes_received = 0
+        self.frames_received = 0
+        self.bytes_sent = 0
+        self.queue_full_waits = 0         # Times the reader thread waited for the consumers to make room
 
     def connect(self):
         self.status = CONNECTED
@@ -54,9 +79,16 @@ class BridgeConnection:
 
     def disconnect(self):
         logger.debug("Closing socket connection to the api bridge (TWS/IB Gateway)")
+        self.stop_reader()
+        self.stop_scheduler()
+        self.stop_recording()
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
         self.socket.close()
         self.socket = None
         self.status = DISCONNECTED
+        self.decoder.reset()
 
 
     def is_connected(self):
@@ -67,20 +99,129 @@ class BridgeConnection:
         return self.request_id
 
 
+    ######################################
+    # Outbound Pacing (opt-in)           #
+    ######################################
+    def start_scheduler(self, **limits):
+        """
+        Start pacing the outbound messages (see OutboundScheduler).
+        Once started, send_message() queues messages instead of writing them to the socket.
+
+        :param limits: Keyword arguments of OutboundScheduler (rate, burst, historical_limit, historical_period)
+        """
+        if self.scheduler is not None:
+            return
+
+        self.scheduler = OutboundScheduler(self._write, **limits)
+        self.scheduler.start()
+
+    def stop_scheduler(self, drain_timeout=None):
+        """
+        Stop pacing the outbound messages, messages still queued are discarded
+
+        :param drain_timeout: If given, first wait up to this many seconds for the queued messages to be sent
+        """
+        if self.scheduler is None:
+            return
+
+        self.scheduler.stop(drain_timeout)
+        self.scheduler = None
+
+    ######################################
+    # Wire Recording (opt-in)            #
+    ######################################
+    def start_recording(self, path):
+        """
+        Start journaling every frame sent and received (see Recorder, ReplayConnection plays a journal back)
+
+        :param path: Journal file (truncated if it exists)
+        """
+        if self.recorder is not None:
+            return
+
+        self.recorder = Recorder(path)
+        logger.info("Recording the bridge traffic to {0}".format(path))
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+
+        self.recorder.close()
+        self.recorder = None
+
+    ######################################
+    # Reader Thread (opt-in)             #
+    ######################################
+    def start_reader(self, queue_size=INBOUND_QUEUE_SIZE):
+        """
+        Start a thread that continuously drains the socket and frames the messages received.
+        Once started, receive_messages() returns messages from the reader's queue instead of reading the socket.
+
+        :param queue_size: Maximum number of messages held before the reader stops draining the socket
+        """
+        if self.reader is not None:
+            return
+
+        self.inbound        = queue.Queue(maxsize=queue_size)
+        self.reader_running = True
+        self.reader         = threading.Thread(target=self._reader_loop, name="BridgeReader", daemon=True)
+        self.reader.start()
+        logger.debug("Reader thread started")
+
+    def stop_reader(self):
+        """
+        Stop the reader thread (if it is running). Messages already queued remain available.
+        """
+        if self.reader is None:
+            return
+
+        self.reader_running = False
+        if self.reader is not threading.current_thread():
+            self.reader.join()
+        self.reader = None
+        logger.debug("Reader thread stopped")
+
+    def _reader_loop(self):
+        """
+        Reader thread body: read, frame and queue messages until stopped or disconnected
+        """
+        while self.reader_running and self.is_connected():
+            for message in self._read_socket():
+                # Block while the queue is full, but keep honoring stop requests
+                while self.reader_running:
+                    try:
+                        self.inbound.put(message, timeout=1)
+                        break
+                    except queue.Full:
+                        self.queue_full_waits += 1
+                        logger.warning("Inbound queue is full, consumers are lagging the bridge.")
+
+        self.reader_running = False
+
+    def metrics(self):
+        """
+        :return: Dictionary of the bytes and frames received, the bytes sent and the reader thread's queue
+        """
+        return {'bytes_received'    : self.bytes_received,
+                'frames_received'   : self.frames_received,
+                'bytes_sent'        : self.bytes_sent,
+                'queued'            : self.inbound.qsize() if self.inbound is not None else 0,
+                'queue_full_waits'  : self.queue_full_waits}
+
     ###########################
     # Message Level Functions #
     ###########################
     @staticmethod
     def make_msg(text) -> bytes:
         """ adds the length prefix """
-        msg = struct.pack("!I%ds" % len(text), len(text), str.encode(text))
-        return msg
+        data = str.encode(text) if isinstance(text, str) else text
+        return FRAME_HEADER.pack(len(data)) + data
 
     def receive_messages(self, parse_message=True):
         """
-        Read all data from the socket
+        Read all data from the socket (or the reader thread's queue if it is running)
         Parse the socket data into messages
-        :param parse_message: False -> returns un-formatted data True -> returns msg dictionaries
+        :param parse_message: False -> returns un-formatted data True -> returns MessageViews
         :return: messages:list All messages in the socket
         """
         """
@@ -89,43 +230,126 @@ class BridgeConnection:
 
         :return: messages:list
         """
-        messages = []
+        if self.inbound is not None and (self.reader is not None or not self.inbound.empty()):
+            messages = self._drain_inbound()
+            if not parse_message:
+                messages = [message['fields'] for message in messages]
+            return messages
+
         # Check that we are connected
         if not self.is_connected():
             logger.debug("receive_message attempted while not connected.")
-            return messages
+            return []
+
+        return self._read_socket(parse_message)
+
+    def poll(self, timeout):
+        """
+        Wait up to timeout seconds for messages, returning as soon as any are received
+        (unlike receive_messages(), which waits for the socket timeout when nothing arrives)
+
+        :param timeout: Maximum number of seconds to wait
+        :return: messages:list of MessageViews (empty if none arrived in time)
+        """
+        if self.inbound is not None and (self.reader is not None or not self.inbound.empty()):
+            return self._drain_inbound(timeout)
+
+        if not self.is_connected():
+            logger.debug("poll attempted while not connected.")
+            time.sleep(timeout)
+            return []
+
+        if self.selector is None:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.socket, selectors.EVENT_READ)
 
+        if not self.selector.select(timeout):
+            return []
+        return self._read_socket()
 
-        # Read data from the socket
-        socket_data = b""
-        cont = True
+    def _drain_inbound(self, timeout=None):
+        """
+        Take every message queued by the reader thread, waiting for the first one
 
+        :param timeout: Seconds to wait for the first message (None -> the socket timeout)
+        :return: messages:list
+        """
+        if timeout is None:
+            timeout = self.socket.gettimeout() if self.socket else 0
+
+        messages = []
         try:
-            while cont and self.socket is not None:
-                buffer = self.socket.recv(4096)
-                socket_data += buffer
-                logger.debug("Message Length: %d, Message:||%s||", len(buffer), buffer)
-
-                if len(buffer) < 4096:
-                    cont = False
-        except Exception:
+            messages.append(self.inbound.get(timeout=timeout))
+            while True:
+                messages.append(self.inbound.get_nowait())
+        except queue.Empty:
             pass
+        return messages
 
+    def _read_socket(self, parse_message=True):
+        """
+        Read whatever is available on the socket and split it into messages
 
-        # Split the socket data into messages that can be passed back
-        while socket_data != b"":
-            (size, message, remaining_data) = self.read_message(socket_data)
-            fields = Messages.parse_message(message)
-            if not parse_message:
-                messages.append(fields)
-            else:
-                function_name = Messages.get_inbound_action(fields[0])
-                msg = {'size':size, 'text':message, 'fields':fields, 'id':fields[0], 'action':function_name}
-                messages.append(msg)
-            socket_data = remaining_data
+        :param parse_message: False -> returns un-formatted data True -> returns MessageViews
+        :return: messages:list
+        """
+        messages = []
+
+        # Read data from the socket straight into the decoder's buffer
+        try:
+            for _ in range(MAX_READS):
+                if self.socket is None:
+                    break
+                received = self.decoder.recv_from(self.socket)
+                received_time = time.monotonic()
+                logger.debug("Received %d bytes", received)
+                self.bytes_received += received
+
+                if received == 0:
+                    logger.warning("The bridge closed the connection.")
+                    self.status = DISCONNECTED
+                    break
+
+                # Frames must be consumed before the next read reuses the buffer
+                self._decode_frames(messages, parse_message, received_time)
+                if self.status == DISCONNECTED:
+                    break
+
+                # A read that did not fill the buffer means the socket has been drained
+                if self.decoder.free_space() > 0:
+                    break
+        except socket.timeout:
+            pass
+        except socket.error as e:
+            if self.socket is not None:
+                logger.error(SOCKET_EXCEPTION.msg(extra=str(e)))
 
         return messages
 
+    def _decode_frames(self, messages, parse_message=True, received_time=None):
+        """
+        Split the complete frames out of the receive buffer (partial frames stay in the decoder)
+
+        :param messages: List the decoded messages are appended to
+        :param parse_message: False -> un-formatted data True -> MessageViews
+        :param received_time: time.monotonic() value of the read that completed these frames
+        """
+        recorder = self.recorder
+        count    = len(messages)
+        for frame in self.decoder.frames():
+            if recorder is not None:
+                recorder.record(INBOUND, frame)
+
+            # Copied out of the receive buffer, fields are only decoded when a consumer reads them
+            message = MessageView(frame.tobytes(), received_time)
+            messages.append(message if parse_message else message.fields)
+        self.frames_received += len(messages) - count
+
+        if self.decoder.out_of_sync:
+            # Whatever follows a bad frame length would be decoded as garbage, the connection is dropped
+            logger.error("The stream from the bridge is out of sync, disconnecting.")
+            self.status = DISCONNECTED
+
     def send_message(self, msg, make_msg=False):
         """
         Sends a message to the bridge
@@ -141,10 +365,23 @@ class BridgeConnection:
         #try:
         if make_msg:
             msg = self.make_msg(msg)
-        nSent = self.socket.send(msg)
+
+        if self.scheduler is not None:
+            self.scheduler.submit(msg)
+            return len(msg)
+
+        return self._write(msg)
+
+    def _write(self, msg):
+        with self.send_lock:
+            self.socket.sendall(msg)
+            self.bytes_sent += len(msg)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record_outbound(msg)
         logger.debug("Message Sent: {0}".format(msg))
 
-        return nSent
+        return len(msg)
 
     #############################################################################
     # Functions related to low level message creation between our application   #
@@ -154,25 +391,10 @@ class BridgeConnection:
         """
         Generate the null terminated message string expected by the bridge
 
-        :param values:i List of message fields to be encoded
+        :param values: List of message fields to be encoded (bytes are inserted as is, see MessageEncoder)
         :return:
         """
-        message = ""
-        for val in values:
-            # Convert None to an empty string
-            if val is None:
-                val = ""
-
-            # Convert boolean data to an integer
-            if type(val) is bool:
-                val = int(val)
-
-            # Append to any previously created fields
-            field = str(val) + '\0'
-            message += field
-
-        message = struct.pack("!I%ds" % len(message), len(message), str.encode(message))
-        return message
+        return encode_message(values)
 
     def read_message(self, buf: bytes) -> tuple:
         """ first the size prefix and then the corresponding msg payload """
@@ -180,10 +402,10 @@ class BridgeConnection:
         if len(buf) < 4:
             return 0, "", buf
 
-        size = struct.unpack("!I", buf[0:4])[0]
+        size = FRAME_HEADER.unpack_from(buf)[0]
 
         if len(buf) - 4 >= size:
-            text = struct.unpack("!%ds" % size, buf[4:4 + size])[0]
+            text = bytes(buf[4:4 + size])
             return size, text, buf[4 + size:]
         else:
             return size, "", buf
@@ -0,0 +1,83 @@
+"""
+Conflation of market data received faster than an application handles it
+
+:Responsible For:
+1. Keeping only the latest update per (request id, tick type) among the messages received while handlers were busy
+2. Leaving every other message (orders, executions, errors, depth, etc.) untouched and in order
+   (with worker threads, the workers' queues keep the latest update instead, see ShardedExecutor.submit_latest)
+3. Counting the updates coalesced, in total and per (request id, tick type)
+"""
+
+from collections import defaultdict
+
+import logging
+
+from ibkr_api.base.messages import Messages
+
+logger = logging.getLogger(__name__)
+
+# Messages carrying the latest value of a tick type (version, request id and tick type are fields 1, 2 and 3)
+CONFLATED_MESSAGES = ('tick_price', 'tick_size', 'tick_string', 'tick_generic', 'tick_option_computation')
+
+
+class Conflator(object):
+    def __init__(self, message_names=CONFLATED_MESSAGES):
+        """
+        :param message_names: Names of the inbound messages that may be conflated
+        """
+        self.message_ids    = frozenset(Messages.inbound[name] for name in message_names)
+        self.received       = 0                 # Messages seen
+        self.coalesced      = 0                 # Messages dropped because a later one replaced them
+        self.coalesced_by   = defaultdict(int)  # (request id, tick type) -> messages dropped
+
+    def conflate(self, messages):
+        """
+        Drop the market data messages superseded by a later one of the same request id and tick type.
+        The latest message of each key keeps its position so it is still handled after the messages preceding it.
+
+        :param messages: Batch of MessageViews, as returned by BridgeConnection.poll()
+        :return: list of the messages to handle
+        """
+        self.received += len(messages)
+        if len(messages) < 2:
+            return messages
+
+        kept        = []
+        seen        = set()
+        message_ids = self.message_ids
+        for message in reversed(messages):
+            if message.id in message_ids:
+                key = self.key(message)
+                if key is not None:
+                    if key in seen:
+                        self.count_coalesced(key)
+                        continue
+                    seen.add(key)
+            kept.append(message)
+
+        kept.reverse()
+        return kept
+
+    def key(self, message):
+        """
+        :param message: MessageView
+        :return: (request id, tick type) of a market data message that may be conflated, None for other messages
+        """
+        if message.id not in self.message_ids:
+            return None
+        try:
+            return int(message.field(2)), int(message.field(3))
+        except (IndexError, ValueError):
+            return None
+
+    def count_coalesced(self, key):
+        self.coalesced          += 1
+        self.coalesced_by[key]  += 1
+
+    def metrics(self):
+        """
+        :return: Dictionary of the number of messages received and coalesced
+        """
+        return {'received'      : self.received,
+                'coalesced'     : self.coalesced,
+                'coalesced_by'  : dict(self.coalesced_by)}
@@ -16,6 +16,11 @@ EXCHANGE_UNAVAIL_MSG  = 3    # control message specifying that an exchange is un
 NO_VALID_ID = -1
 
 MAX_MSG_LEN = 0xFFFFFF # 16Mb - 1byte
+RECEIVE_BUFFER_SIZE = 0x100000 # 1Mb, grows as needed for larger messages
+INBOUND_QUEUE_SIZE = 100000    # Messages the reader thread may hold before it stops draining the socket
+MAX_MESSAGES_PER_SECOND = 45   # The bridge disconnects clients sending more than 50 messages per second
+HISTORICAL_REQUEST_LIMIT = 60   # Historical data requests allowed ...
+HISTORICAL_REQUEST_PERIOD = 600 # ... within this many seconds
 
 UNSET_INTEGER = 2 ** 31 - 1
 UNSET_DOUBLE = sys.float_info.max
@@ -113,6 +118,7 @@ MIN_SERVER_VER_ORDER_CONTAINER          = 145
 MIN_SERVER_VER_SMART_DEPTH              = 146
 MIN_SERVER_VER_REMOVE_NULL_ALL_CASTING  = 147
 MIN_SERVER_VER_D_PEG_ORDERS             = 148
+MIN_SERVER_VER_PRICE_BASED_VOLATILITY   = 156
 # 100+ messaging */
 # 100 = enhanced handshake, msg length prefixes
 
@@ -0,0 +1,183 @@
+"""
+Event processing loop shared by the client applications (MinimalClientApplication, MultipleClientApplication)
+
+:Responsible For:
+1. Waiting on the bridge connection and the task scheduler, then handling the messages received and the tasks due
+2. Calling the application's act() every act_interval seconds, when the application defines it
+3. Sharding the handling of messages over worker threads, keeping those of a request and those of the orders in order
+4. Conflating market data updates, per poll batch or in the workers' queues
+5. Parsing messages and invoking the application's handlers, timed per message type when metrics are enabled
+"""
+
+from ibkr_api.base.conflation       import Conflator
+from ibkr_api.base.messages         import Messages
+from ibkr_api.base.metrics          import Metrics, RATE_INTERVAL
+from ibkr_api.base.sharded_executor import ShardedExecutor
+from ibkr_api.base.task_scheduler   import TaskScheduler
+
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+IDLE_POLL_INTERVAL = 1.0        # Longest wait for messages, still_running is checked at least this often
+ORDER_SHARD_KEY    = 'orders'   # Shard of every order life cycle message, so an order's events are handled in order
+ORDER_MESSAGE_IDS  = frozenset(Messages.inbound[name] for name in Messages.order_messages)
+
+
+class EventLoop(object):
+    """
+    Mixed into an ApiCalls subclass: call init_event_loop() before connecting and init_handlers() once connected
+    """
+    def init_event_loop(self, act_interval=1.0, conflate=False, workers=0, metrics_port=None):
+        """
+        :param act_interval: Seconds between calls of act(), messages are handled as soon as they arrive in between
+        :param conflate: If True, only the latest market data update per request and tick type is handled
+        :param workers: Number of worker threads running the handlers (0 -> handlers run on the event loop's thread)
+        :param metrics_port: If given, the metrics are served on http://127.0.0.1:metrics_port/metrics by run()
+        """
+        self.still_running      = True  # Controls when the event loop stops
+        self.act_interval       = act_interval
+        self.task_scheduler     = TaskScheduler()   # Timers and scheduled tasks run by the event loop
+        self.conflator          = Conflator() if conflate else None
+        self.executor           = ShardedExecutor(workers) if workers else None
+        self.metrics            = None
+        self.metrics_port       = metrics_port
+
+    def init_handlers(self, metrics=False):
+        """
+        Bind the handlers, once the parsers for the negotiated server version are selected
+
+        :param metrics: If True, the messages are counted and timed per message type (see Metrics)
+        """
+        self.dispatch_table     = Messages.dispatch_table(self.message_parser, self)  # Message ID -> (parser, handler)
+        if metrics or self.metrics_port is not None:
+            self.metrics        = Metrics(self.conn, self.conflator, self.executor)
+
+    def act(self):
+        """
+        Actions your application should do every act_interval seconds.
+        This is expected to be overridden in your application class, it is not scheduled otherwise.
+        :return:
+        """
+        raise NotImplementedError
+
+    def run(self):
+        """
+        Primary event loop of the application
+        :return:
+        """
+        self.initialize()
+
+        act_task    = None
+        sample_task = None
+        if type(self).act is not EventLoop.act:
+            act_task = self.task_scheduler.call_every(self.act_interval, self.act, name='act')
+        try:
+            if self.executor is not None:
+                self.executor.start()
+            if self.metrics is not None:
+                sample_task = self.task_scheduler.call_every(RATE_INTERVAL, self.metrics.sample, name='metrics')
+                if self.metrics_port is not None:
+                    self.metrics.serve(self.metrics_port)
+            while self.still_running:
+                # Wakes up as soon as the bridge sends something, or when the next task is due
+                messages = self.conn.poll(self.task_scheduler.next_delay(IDLE_POLL_INTERVAL))
+                if self.metrics is not None:
+                    self.metrics.count(messages)
+                if self.conflator is not None and self.executor is None:
+                    messages = self.conflator.conflate(messages)
+                for message in messages:
+                    if self.executor is None:
+                        self._dispatch(message)
+                    elif self.conflator is None:
+                        self.executor.submit(self.shard_key(message), self._dispatch, message)
+                    else:
+                        self._submit_conflated(message)
+
+                self.task_scheduler.run_due()
+        finally:
+            # Also torn down when a handler or the connection raises, so no worker thread or port is left behind
+            if act_task is not None:
+                act_task.cancel()
+            if sample_task is not None:
+                sample_task.cancel()
+            if self.executor is not None:
+                self.executor.stop()
+            if self.metrics is not None:
+                self.metrics.stop_serving()
+
+        logger.info("Application has been shut down.")
+        return 0
+
+    def stop(self):
+        """
+        Stops the primary event loop once the messages and tasks at hand are handled
+        :return:
+        """
+        logger.info("Shutdown requested")
+        self.still_running = False
+
+    def shard_key(self, message):
+        """
+        Key the handling of a message is sharded by when handlers run on worker threads (see workers).
+        Defaults to the request id, except for the order life cycle messages (Messages.order_messages) which share
+        ORDER_SHARD_KEY, because their first field is the order id for some and a request id for others.
+        Override to shard by contract id, symbol, etc.
+
+        :param message: MessageView
+        :return: Hashable (messages without a request id share the key None, they are handled in order)
+        """
+        if message.id in ORDER_MESSAGE_IDS:
+            return ORDER_SHARD_KEY
+        return message.request_id
+
+    def _submit_conflated(self, message):
+        """
+        Queue a message on its worker, replacing the update of the same request and tick type still queued there
+        (the backlog builds up in the workers' queues, not in the batches the event loop reads)
+
+        :param message: MessageView
+        """
+        self.conflator.received += 1
+        key = self.conflator.key(message)
+        if key is None:
+            self.executor.submit(self.shard_key(message), self._dispatch, message)
+        elif self.executor.submit_latest(self.shard_key(message), key, self._dispatch, message):
+            self.conflator.count_coalesced(key)
+
+    def _dispatch(self, message):
+        """
+        Parse a message and hand the data to the application's handler (see Messages.dispatch_table)
+
+        :param message: MessageView from BridgeConnection.receive_messages()
+        """
+        message_id  = message['id']
+        entry       = self.dispatch_table[message_id] if 0 <= message_id < len(self.dispatch_table) else None
+        if entry is None:
+            logger.warning("Unknown message id {0} received".format(message_id))
+            return
+
+        (parser, handler) = entry
+        if handler is None:
+            # If we are in development also send a warning that a handler doesnt exist
+            if self.debug_mode:
+                logger.warning("The function '{0}' does not exist.".format(message['action']))
+            return
+
+        if parser is None:
+            logger.warning("No parser available for '{0}'".format(message['action']))
+            return
+
+        # Parse the message and call the response handler
+        metrics = self.metrics
+        if metrics is None:
+            handler(*parser(message['fields']))
+            return
+
+        started = time.perf_counter()
+        age     = time.monotonic() - message['received'] if message['received'] is not None else 0.0
+        data    = parser(message['fields'])
+        parsed  = time.perf_counter()
+        handler(*data)
+        metrics.record(message_id, age, parsed - started, time.perf_counter() - parsed)
@@ -0,0 +1,129 @@
+"""
+Incremental decoder for the length prefixed frames sent by the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Owning a single receive buffer that is reused for the lifetime of the connection
+2. Reading socket data directly into that buffer (recv_into, no intermediate bytes objects)
+3. Splitting the buffered data into frames, carrying any partial frame over to the next read
+4. Detecting a bad frame length (the stream is out of sync), after which no frame is decoded until reset
+"""
+
+import logging
+import struct
+
+from ibkr_api.base.constants    import MAX_MSG_LEN, RECEIVE_BUFFER_SIZE
+from ibkr_api.base.errors       import BAD_LENGTH
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")     # Every frame starts with the payload size as a 4 byte big endian integer
+
+
+class FrameDecoder(object):
+    def __init__(self, buffer_size=RECEIVE_BUFFER_SIZE, min_read_size=4096):
+        """
+        :param buffer_size: Initial size of the receive buffer (it grows if a single frame does not fit)
+        :param min_read_size: Minimum free space made available before each read
+        """
+        self.buffer         = bytearray(buffer_size)
+        self.min_read_size  = min_read_size
+        self.start          = 0     # Offset of the first byte not yet handed out as a frame
+        self.end            = 0     # Offset one past the last byte received
+        self.out_of_sync    = False     # True once a bad frame length was read, the connection must be dropped
+
+    def free_space(self):
+        return len(self.buffer) - self.end
+
+    def pending(self):
+        """ Number of buffered bytes belonging to frames that are not complete yet """
+        return self.end - self.start
+
+    def _make_room(self, needed):
+        """
+        Ensure at least `needed` bytes are free at the end of the buffer.
+        The buffer is never resized in place so memoryviews handed out earlier stay valid objects,
+        compaction only happens once those frames have been consumed.
+
+        :param needed: Number of free bytes required
+        """
+        if self.start == self.end:
+            self.start = self.end = 0
+
+        if self.free_space() >= needed:
+            return
+
+        pending = self.end - self.start
+        if len(self.buffer) - pending >= needed:
+            # Move the partial frame to the front of the buffer
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        else:
+            # A single frame is larger than the buffer, switch to a larger one
+            buffer = bytearray(max(2 * len(self.buffer), pending + needed))
+            buffer[:pending] = self.buffer[self.start:self.end]
+            self.buffer = buffer
+
+        self.start = 0
+        self.end   = pending
+
+    def recv_from(self, sock):
+        """
+        Read whatever is available from the socket straight into the receive buffer
+
+        :param sock: Connected socket
+        :return: Number of bytes read (0 means the peer closed the connection)
+        """
+        self._make_room(self.min_read_size)
+        with memoryview(self.buffer) as view:
+            received = sock.recv_into(view[self.end:])
+        self.end += received
+        return received
+
+    def feed(self, data):
+        """
+        Append data received by other means (asyncio transports, journals, etc.)
+
+        :param data: bytes like object
+        """
+        size = len(data)
+        self._make_room(size)
+        self.buffer[self.end:self.end + size] = data
+        self.end += size
+
+    def frames(self):
+        """
+        Split all complete frames out of the buffer.
+        The returned memoryviews point into the receive buffer and are only valid until the next read.
+        A length above MAX_MSG_LEN means the frame boundaries are lost: the frames before it are returned and
+        out_of_sync is set, so the caller can disconnect like the IB client does (nothing is decoded until reset).
+
+        :return: list of memoryview payloads (size prefix removed)
+        """
+        frames  = []
+        if self.out_of_sync:
+            return frames
+        buffer  = self.buffer
+        view    = memoryview(buffer)
+        start   = self.start
+        end     = self.end
+
+        while end - start >= 4:
+            size = FRAME_HEADER.unpack_from(buffer, start)[0]
+            if size > MAX_MSG_LEN:
+                logger.error(BAD_LENGTH.msg(extra=": {0}".format(size)))
+                self.out_of_sync = True
+                start = end
+                break
+
+            frame_end = start + 4 + size
+            if frame_end > end:
+                break
+
+            frames.append(view[start + 4:frame_end])
+            start = frame_end
+
+        self.start = start
+        return frames
+
+    def reset(self):
+        self.start = self.end = 0
+        self.out_of_sync = False
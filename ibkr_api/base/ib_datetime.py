@@ -0,0 +1,115 @@
+"""
+Parser for the date/time formats used by the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Parsing 'yyyymmdd', 'yyyymm', 'yyyymmdd hh:mm:ss' (one or two spaces or a dash) and epoch seconds
+2. Attaching the time zone when the bridge appends one ('yyyymmdd hh:mm:ss US/Eastern')
+3. Memoizing the date prefixes and time zones, which repeat across the messages of a response
+4. Parsing a whole column of dates in one vectorized pass (historical bars)
+"""
+
+from datetime   import datetime, timedelta
+
+import logging
+
+import numpy as np
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:     # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+EPOCH           = datetime(1970, 1, 1)
+MEMO_SIZE       = 4096
+
+_dates          = {}    # 'yyyymmdd' -> (year, month, day)
+_time_zones     = {}    # Time zone name -> tzinfo (None if unknown)
+
+
+def _date(prefix):
+    ymd = _dates.get(prefix)
+    if ymd is None:
+        if len(_dates) >= MEMO_SIZE:
+            _dates.clear()
+        ymd = _dates[prefix] = (int(prefix[0:4]), int(prefix[4:6]), int(prefix[6:8]) if len(prefix) > 6 else 1)
+    return ymd
+
+
+def _time_zone(name):
+    if name in _time_zones:
+        return _time_zones[name]
+
+    tz = None
+    if ZoneInfo is not None:
+        try:
+            tz = ZoneInfo(name)
+        except (KeyError, ValueError, OSError):
+            logger.warning("Unknown time zone '{0}', times in it are left naive".format(name))
+    _time_zones[name] = tz
+    return tz
+
+
+def parse_ib_datetime(value):
+    """
+    Parse a date/time sent by the bridge
+
+    :param value: Date/time string, e.g. '20190104', '201901', '20190104  09:30:00', '20190104 09:30:00 US/Eastern',
+                  '20190104-09:30:00' or '1546612200' (epoch seconds, returned as naive UTC)
+    :return: datetime (None if the value is empty or not in a known format)
+    """
+    if not value:
+        return None
+
+    try:
+        if value.isdigit():
+            if len(value) > 8:
+                return EPOCH + timedelta(seconds=int(value))
+            return datetime(*_date(value))
+
+        (year, month, day) = _date(value[:8])
+        rest    = value[8:].lstrip(" -")
+        tz      = _time_zone(rest[9:]) if len(rest) > 9 else None
+        return datetime(year, month, day, int(rest[0:2]), int(rest[3:5]), int(rest[6:8]), tzinfo=tz)
+    except ValueError:
+        logger.warning("Unknown date/time format: '{0}'".format(value))
+        return None
+
+
+def parse_ib_datetimes(values):
+    """
+    Parse a list of date/times sharing the same format in one vectorized pass.
+    Time zone suffixes are dropped, times are left in the time zone the bridge sent them in.
+
+    :param values: List of date/time strings (see parse_ib_datetime)
+    :return: numpy datetime64[D] array for dates without a time, datetime64[s] otherwise (epoch seconds in UTC)
+    """
+    if len(values) == 0:
+        return np.array([], dtype='datetime64[s]')
+
+    first = values[0]
+    if first.isdigit() and len(first) > 8:
+        return np.array(values, dtype=np.int64).astype('datetime64[s]')
+
+    # Fixed width layout, work on the digits as a matrix of bytes
+    width   = max(len(first), 8)
+    chars   = np.frombuffer(np.array(values, dtype='S%d' % width).tobytes(), dtype=np.uint8).reshape(-1, width)
+    digits  = chars.astype(np.int64) - ord('0')
+
+    def number(start, length):
+        value = digits[:, start]
+        for offset in range(1, length):
+            value = value * 10 + digits[:, start + offset]
+        return value
+
+    days = ((number(0, 4) - 1970).astype('datetime64[Y]')
+            + (number(4, 2) - 1).astype('timedelta64[M]')).astype('datetime64[D]') \
+        + (number(6, 2) - 1).astype('timedelta64[D]')
+
+    colon = first.find(':')
+    if colon < 0:
+        return days
+
+    seconds = number(colon - 2, 2) * 3600 + number(colon + 1, 2) * 60 + number(colon + 4, 2)
+    return days.astype('datetime64[s]') + seconds.astype('timedelta64[s]')
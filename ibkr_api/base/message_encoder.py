@@ -0,0 +1,148 @@
+"""
+Encoder for the messages sent to the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Encoding field values the way the bridge expects them (None -> empty field, bool -> 0/1)
+2. Joining pre-encoded fields into a payload and adding the length prefix
+3. Caching the encoded header (message id, version) of every outbound message type
+4. Caching the encoded contract blocks sent repeatedly by market data, order and contract data requests
+"""
+
+from operator import attrgetter
+
+import logging
+
+from ibkr_api.base.frame_decoder    import FRAME_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Contract fields as sent by request_market_data and request_market_depth (the latter skips primary_exchange)
+MARKET_DATA_CONTRACT_FIELDS     = ('id', 'symbol', 'security_type', 'last_trade_date_or_contract_month', 'strike',
+                                   'right', 'multiplier', 'exchange', 'primary_exchange', 'currency', 'local_symbol',
+                                   'trading_class')
+MARKET_DEPTH_CONTRACT_FIELDS    = ('id', 'symbol', 'security_type', 'last_trade_date_or_contract_month', 'strike',
+                                   'right', 'multiplier', 'exchange', 'currency', 'local_symbol', 'trading_class')
+CONTRACT_DATA_CONTRACT_FIELDS   = MARKET_DATA_CONTRACT_FIELDS + ('include_expired', 'security_id_type', 'security_id')
+ORDER_CONTRACT_FIELDS           = MARKET_DATA_CONTRACT_FIELDS + ('security_id_type', 'security_id')
+
+# Values sent for the attributes some contracts don't have (e.g. Stock removes them)
+CONTRACT_FIELD_DEFAULTS         = {'last_trade_date_or_contract_month': '', 'strike': 0.0, 'right': '', 'multiplier': ''}
+CONTRACT_DATA_FIELD_DEFAULTS    = dict(CONTRACT_FIELD_DEFAULTS, strike='')
+
+
+def encode_field(value):
+    """
+    Encode a single field
+
+    :param value: Field value, bytes are considered already encoded and are used as is
+    :return: bytes
+    """
+    value_type = type(value)
+    if value_type is str:
+        return value.encode()
+    if value_type is int:
+        return b"%d" % value
+    if value is None:
+        return b""
+    if value_type is bool:
+        return b"1" if value else b"0"
+    if value_type is bytes:
+        return value
+    return str(value).encode()
+
+
+def encode_payload(values):
+    """
+    Generate the null terminated payload expected by the bridge (without the length prefix)
+
+    :param values: Field values (see encode_field)
+    :return: bytes
+    """
+    # encode_field inlined, this runs for every field of every outbound message
+    parts = []
+    for value in values:
+        value_type = type(value)
+        if value_type is bytes:
+            parts.append(value)
+        elif value_type is str:
+            parts.append(value.encode())
+        elif value_type is int:
+            parts.append(b"%d" % value)
+        elif value is None:
+            parts.append(b"")
+        elif value_type is bool:
+            parts.append(b"1" if value else b"0")
+        else:
+            parts.append(str(value).encode())
+    parts.append(b"")
+    return b"\0".join(parts)
+
+
+def encode_message(values):
+    """
+    Generate the framed message expected by the bridge
+
+    :param values: Field values (see encode_field)
+    :return: bytes
+    """
+    payload = encode_payload(values)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class MessageEncoder(object):
+    def __init__(self, contract_cache_size=1024):
+        """
+        :param contract_cache_size: Number of encoded contract blocks kept (oldest are dropped first)
+        """
+        self.headers                = {}            # (message id, version) -> encoded fields
+        self.getters                = {}            # Contract field names -> attrgetter
+        self.contracts              = {}            # (field names, field values) -> encoded fields
+        self.contract_cache_size    = contract_cache_size
+
+    def header(self, message_id, version=None):
+        """
+        Encoded message id and version, to be used as the first element of a list of fields
+
+        :param message_id: Outbound message id (see Messages.outbound)
+        :param version: Message version (None for messages without one)
+        :return: bytes
+        """
+        key     = (message_id, version)
+        header  = self.headers.get(key)
+        if header is None:
+            fields = [message_id] if version is None else [message_id, version]
+            header = self.headers[key] = b"\0".join(map(encode_field, fields))
+        return header
+
+    def contract(self, contract, field_names=MARKET_DATA_CONTRACT_FIELDS, defaults=CONTRACT_FIELD_DEFAULTS):
+        """
+        Encoded contract fields, to be used as an element of a list of fields.
+        The cache is keyed by the field values so changes made to a contract are always picked up.
+
+        :param contract: Contract
+        :param field_names: Names of the contract's attributes to encode (in order)
+        :param defaults: Attribute name -> value sent when the contract doesn't have the attribute
+        :return: bytes
+        :raise AttributeError: The contract lacks an attribute that has no default
+        """
+        getter = self.getters.get(field_names)
+        if getter is None:
+            getter = self.getters[field_names] = attrgetter(*field_names)
+
+        try:
+            values = getter(contract)
+        except AttributeError:
+            values = tuple(getattr(contract, name, defaults[name]) if name in defaults else getattr(contract, name)
+                           for name in field_names)
+        key     = (field_names, values)
+        try:
+            block = self.contracts.get(key)
+        except TypeError:
+            # An unhashable value, encode without caching
+            return b"\0".join(map(encode_field, values))
+
+        if block is None:
+            if len(self.contracts) >= self.contract_cache_size:
+                del self.contracts[next(iter(self.contracts))]
+            block = self.contracts[key] = b"\0".join(map(encode_field, values))
+        return block
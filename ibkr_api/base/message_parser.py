@@ -6,20 +6,20 @@ data is usually a dictionary on a given object
 """
 from ibkr_api.base.constants                        import UNSET_DOUBLE
 from ibkr_api.base.constants                        import UNSET_INTEGER
+from ibkr_api.base.ib_datetime                      import parse_ib_datetime
+from ibkr_api.base.message_schema                   import PARSERS, SERVER_VERSION, parsers_for
 from ibkr_api.classes.bar                           import Bar
 from ibkr_api.classes.contracts.contract            import Contract
 from ibkr_api.classes.contracts.stock               import Stock
 from ibkr_api.classes.contracts.contract_details    import ContractDetails
-from ibkr_api.classes.enum.tick_type                import TickType
 from ibkr_api.classes.execution                     import Execution
+from ibkr_api.classes.historical_data               import HistoricalData
 from ibkr_api.classes.option_chain                  import OptionChain
 from ibkr_api.classes.orders.order                  import Order
 from ibkr_api.classes.order_state                   import OrderState
 
-from dateutil   import parser as date_parser
-from datetime   import date, datetime
+from datetime   import datetime
 from    math    import  ceil
-import pandas   as pd
 import logging
 import xmltodict
 import time
@@ -27,9 +27,28 @@ import time
 logger = logging.getLogger(__name__)
 
 
+# Former names of generated parsers (they now return (message_id, request_id, data) like the others)
+PARSER_ALIASES = {'market_depth_exchanges': 'mkt_depth_exchanges', 'news_articles': 'news_article',
+                  'tick_req': 'tick_request_params'}
+
+
 class MessageParser(object):
     def __init__(self):
-        self.server_version = 147
+        self.server_version = SERVER_VERSION  # Version PARSERS are generated for, until use_server_version
+
+    def use_server_version(self, server_version):
+        """
+        Parse the messages described by message_schema the way the given server version sends them
+        (called once the version handshake is done, the parsers default to message_schema.SERVER_VERSION)
+
+        :param server_version: Server version negotiated with the bridge
+        """
+        self.server_version = server_version
+        parsers             = parsers_for(server_version)
+        for message_name, parser in parsers.items():
+            setattr(self, message_name, parser)
+        for alias, message_name in PARSER_ALIASES.items():
+            setattr(self, alias, parsers[message_name])
 
     @staticmethod
     def _optional_field(value, conversion_type):
@@ -54,14 +73,6 @@ class MessageParser(object):
             value = int(value) == 1
         return value
 
-    @staticmethod
-    def _parse_ib_date(date_val):
-        if date_val:
-            print(date_val[:-3])
-            print(date_val[-3:])
-            date_val = date_parser.parse(date_val)
-        return date_val
-
     #TODO: Remove this function? not sure, probably (can remove after function above handles timezones)
     @staticmethod
     def _parse_last_trade_or_contract_month(fields, contract: ContractDetails, is_bond: bool):
@@ -109,7 +120,7 @@ class MessageParser(object):
         request_id                                  = int(fields[2])
         contract.symbol                             = fields[3]
         contract.security_type                      = fields[4]
-        contract.last_trade_date_or_contract_month  = MessageParser._parse_ib_date(fields[5])
+        contract.last_trade_date_or_contract_month  = parse_ib_datetime(fields[5])
         contract.strike                             = float(fields[6])
         contract.right                              = fields[7]
         contract.exchange                           = fields[8]
@@ -206,7 +217,7 @@ class MessageParser(object):
         contract.security_type                      = fields[4]
         contract.cusip                              = fields[5]
         contract.coupon                             = int(fields[6])
-        contract.last_trade_date_or_contract_month  = MessageParser._parse_ib_date(fields[7])
+        contract.last_trade_date_or_contract_month  = parse_ib_datetime(fields[7])
         contract.issue_date                         = fields[8]
         contract.ratings                            = fields[9]
         contract.bond_type                          = fields[10]
@@ -294,11 +305,14 @@ class MessageParser(object):
 
         message_id          = int(fields[0])
         request_id          = int(fields[1])
-        head_time_stamp     = MessageParser._parse_ib_date(fields[2])
         data            = {
-            'time_stamp'   :   MessageParser._parse_ib_date(fields[2])
+            'time_stamp'   :   parse_ib_datetime(fields[2])
         }
-        current_time    = datetime.now()
+        if data['time_stamp'] is None:
+            return message_id, request_id, data
+
+        # Aware if the bridge appended a time zone
+        current_time    = datetime.now(data['time_stamp'].tzinfo)
         time_diff       = current_time - data['time_stamp']
         if time_diff.days < 365:
             data['duration_string'] = "{0} D".format(time_diff.days)
@@ -312,50 +326,14 @@ class MessageParser(object):
     def historical_data(fields):
         """
         :param fields: The previously parsed message fields
-        :return: Message ID, Request ID, Data
+        :return: Message ID, Request ID, HistoricalData (bars as NumPy columns, see HistoricalData)
         """
-        bars = []
         message_id = int(fields[0])
         request_id = int(fields[1])
-        data       = {
-            'start_date' : fields[2],
-            'end_date'   : fields[3],
-            'bar_count'  : int(fields[4])
-        }
-        df_data     = {'date':[],'open':[],'high':[],'low':[],'close':[]}
-        current_bar = 1
-        bar_index   = 5
-
-        #TODO: Fix the date code here (it is losing info)
-        while current_bar <= data['bar_count']:
-            # Create the Bar class and append it to the list of Bars
-            bar                 = Bar()
-            bar_date            = fields[bar_index]
-            year, month, day    = int(bar_date[0:4]), int(bar_date[4:6]), int(bar_date[6:8])
-            bar.date            = date(year, month, day)
-            bar.open            = float(fields[bar_index+1])
-            bar.high            = float(fields[bar_index+2])
-            bar.low             = float(fields[bar_index+3])
-            bar.close           = float(fields[bar_index+4])
-            bar.volume          = int(fields[bar_index+5])
-            bar.average         = float(fields[bar_index+6])
-            bar.bar_count       = int(fields[bar_index+7])
-            bars.append(bar)
-
-            # Prepare the data for the data frame
-            df_data['date'].append(bar.date)
-            df_data['open'].append(bar.open)
-            df_data['high'].append(bar.high)
-            df_data['low'].append(bar.low)
-            df_data['close'].append(bar.close)
-
-            # Update indexes
-            bar_index          += 8
-            current_bar        += 1
-
-
-        data['data_frame'] = pd.DataFrame(data=df_data)
-        data['bars'] = bars
+        bar_count  = int(fields[4])
+
+        # Every bar is 8 fields (date, open, high, low, close, volume, average, count), converted a column at a time
+        data = HistoricalData.from_fields(fields[5:], fields[2], fields[3], bar_count)
         return message_id, request_id, data
 
     @staticmethod
@@ -401,28 +379,6 @@ class MessageParser(object):
         return data
 
 
-    @staticmethod
-    def market_depth_l2(fields):
-        """
-        Parses the market_depth_l2 message from the Bridge
-        :param fields:
-        :return:
-        """
-
-        data = {
-            'message_id'        : int(fields[0]),
-            'request_id'        : int(fields[1]),
-            'position'          : int(fields[2]),
-            'market_maker'      : fields[3],
-            'operation'         : int(fields[4]),
-            'side'              : int(fields[5]),
-            'price'             : float(fields[6]),
-            'size'              : int(fields[7]),
-            'is_smart_depth'    : bool(fields[8])
-            }
-
-        return data
-
     @staticmethod
     def next_valid_id(fields):
         """
@@ -573,74 +529,6 @@ class MessageParser(object):
 
         return request_id, contracts
 
-    @staticmethod
-    def tick_price(fields):
-        """
-        Process tick_price messages received from the Bridge (TWS/IB Gateway)
-
-        :param fields:
-        :return:
-        """
-        message_id      = int(fields[0])
-        request_id      = int(fields[2])
-        tick_type_id    = int(fields[3])
-        price           = float(fields[4])
-        size            = int(fields[5])
-        attr_mask       = int(fields[6])
-        tick_type       = TickType(tick_type_id)
-
-        tick_data =    {
-            'tick_type_id'      : tick_type_id          ,
-            'size'              : size                  ,
-            'price'             : price                 ,
-            'can_auto_execute'  : attr_mask & 1 != 0    ,
-            'past_limit'        : attr_mask & 2 != 0    ,
-            'pre_open'          : attr_mask & 4 != 0    ,
-            'tick_type'         : tick_type
-        }
-
-        return message_id, request_id, tick_data
-
-    @staticmethod
-    def tick_request_params(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        data = {
-            'min_tick'              : float(fields[2])      ,
-            'bbo_exchange'          : fields[3]             ,
-            'snapshot_permisions'   : fields[4]
-        }
-        return message_id, request_id, data
-
-    @staticmethod
-    def tick_size(fields):
-        message_id = int(fields[0])
-        #TODO: Figure out what fields[1] is
-
-        request_id = int(fields[2])
-        tick_type_id = int(fields[3])
-        tick_type    = TickType(tick_type_id)
-        data = {
-            'tick_type_id'  :   tick_type_id    ,
-            'size'          :   int(fields[4])  ,
-            'tick_type'     :   tick_type
-
-        }
-
-        return message_id, request_id, data
-
-    @staticmethod
-    def tick_string(fields):
-        message_id = int(fields[0])
-        #TODO: Figure out what fields[1] is
-        request_id = int(fields[2])
-        data = {
-            'tick_type_id': int(fields[3])  ,
-            'value'       : fields[4]
-        }
-
-        return message_id, request_id, data
-
     @staticmethod
     def order_status(fields):
         info = {
@@ -652,7 +540,7 @@ class MessageParser(object):
             'average_fill_price'    : float(fields[5]),
             'perm_id'               : int(fields[6]),
             'parent_id'             : int(fields[7]),
-            'last_fill_price'       : int(fields[8]),
+            'last_fill_price'       : float(fields[8]),
             'client_id'             : int(fields[9]),
             'why_held'              : fields[10],
             'market_cap_price'      : float(fields[11]),
@@ -992,7 +880,7 @@ class MessageParser(object):
         execution                                   = Execution()
         execution.order_id                          = order_id
         execution.id                                = fields[14]
-        execution.datetime                          = MessageParser._parse_ib_date(fields[15])
+        execution.datetime                          = parse_ib_datetime(fields[15])
         execution.account_number                    = fields[16]
         execution.exchange                          = fields[17]
         execution.side                              = fields[18]
@@ -1028,7 +916,7 @@ class MessageParser(object):
 
         bar           = Bar()
         bar.bar_count = int(fields[2])
-        bar.date      = fields[3]
+        bar.date      = parse_ib_datetime(fields[3])
         bar.open      = float(fields[4])
         bar.close     = float(fields[5])
         bar.high      = float(fields[6])
@@ -1054,56 +942,6 @@ class MessageParser(object):
         bar.count   = int(fields[9])
         return message_id, request_id, bar
 
-    @staticmethod
-    def tick_option_computation(fields):
-        option_price = None
-        pv_dividend = None
-        gamma = None
-        vega = None
-        theta = None
-        underlying_price = None
-
-        message_id = int(fields[0])
-        version    = int(fields[1])
-        request_id = int(fields[2])
-        tick_type  = int(fields[3])
-
-        implied_vol = float(fields[4])
-        delta      = float(fields[5])
-
-        if implied_vol < 0:  # -1 is the "not computed" indicator
-            implied_vol = None
-
-        if delta == -2:  # -2 is the "not computed" indicator
-            delta = None
-
-        field_index = 6
-        if  tick_type in [TickType.MODEL_OPTION,TickType.DELAYED_MODEL_OPTION]:
-            option_price = float(fields[field_index])
-            pv_dividend = float(fields[field_index+1])
-            field_index += 2
-
-            if option_price == -1:  # -1 is the "not computed" indicator
-                option_price = None
-            if pv_dividend == -1:  # -1 is the "not computed" indicator
-                pv_dividend = None
-
-
-        gamma = float(fields[field_index])
-        vega = float(fields[field_index+1])
-        theta = float(fields[field_index+2])
-        underlying_price = float(fields[field_index+3])
-
-        if gamma == -2:  # -2 is the "not yet computed" indicator
-            gamma = None
-        if vega == -2:  # -2 is the "not yet computed" indicator
-            vega = None
-        if theta == -2:  # -2 is the "not yet computed" indicator
-            theta = None
-        if underlying_price == -1:  # -1 is the "not computed" indicator
-            underlying_price = None
-
-
     @staticmethod
     def delta_neutral_validation(fields):
         message_id = int(fields[0])
@@ -1258,84 +1096,6 @@ class MessageParser(object):
             smart_components.append(smart_component)
         return message_id, request_id, smart_components
 
-    @staticmethod
-    def tick_req(fields):
-        message_id           = int(fields[0])
-        ticker_id            = int(fields[1])
-        min_tick             = float(fields[2])
-        bbo_exchange         = fields[3]
-        snapshot_permissions = int(fields[4])
-        return
-
-    @staticmethod
-    def market_depth_exchanges(fields):
-        message_id = int(fields[0])
-        depth_mkt_data_descriptions = []
-        num_exchanges = int(fields[1])
-        field_index = 2
-        for _ in range(num_exchanges):
-            desc = {
-                'exchange'          : fields[field_index],
-                'security_type'     : fields[field_index+1],
-                'listing_exchange'  : fields[field_index+2],
-                'service_data_type' : fields[field_index+3],
-                'aggregate_group'         : int(fields[field_index+4])
-            }
-            field_index += 5
-            depth_mkt_data_descriptions.append(desc)
-        return message_id, depth_mkt_data_descriptions
-
-    @staticmethod
-    def tick_news(fields):
-        message_id   = int(fields[0])
-        ticker_id    = int(fields[1])
-        time_stamp    = int(fields[2])
-        provider_code = fields[3]
-        article_id    = fields[4]
-        headline     = fields[5]
-        extra_data    = fields[6]
-
-
-    @staticmethod
-    def news_providers(fields):
-        message_id = int(fields[0])
-        news_providers = []
-        num_news_providers = int(fields[1])
-        field_index = 2
-        for _ in range(num_news_providers):
-            provider = {
-                'code' : fields[field_index],
-                'name' : fields[field_index+1]
-            }
-            field_index += 2
-            news_providers.append(provider)
-
-
-    @staticmethod
-    def news_articles(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        article = {
-        'type' : int(fields[2]),
-        'text' : fields[3]
-        }
-        return message_id, request_id, article
-
-    @staticmethod
-    def historical_news(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-
-        news = {
-            'time'          : fields[2],
-            'provider_code' : fields[3],
-            'article_id'    : fields[4],
-            'headline'      : fields[5]
-        }
-        return message_id, request_id, news
-
-
-
     @staticmethod
     def historical_news_end(fields):
         """
@@ -1350,201 +1110,16 @@ class MessageParser(object):
         has_more = int(fields[2]) == 1
         return message_id, request_id, has_more
 
-    @staticmethod
-    def histogram_data(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        num_points = int(fields[2])
-        field_index = 3
-        histogram = []
-        for index in range(num_points):
-            data_point = {
-                'price': float(fields[field_index]),
-                'count': int(fields[field_index + 1])
-            }
-            field_index += 2
-            histogram.append(data_point)
-        return message_id, request_id, histogram
-
-
-    @staticmethod
-    def market_rule(fields):
-        """
-        Parse the 'market_rule' message and return well formatted data
-
-        :param fields:
-        :return:
-        """
-
-        message_id      = int(fields[0])
-        market_rule_id  = int(fields[1])
-
-        n_price_increments  = int(fields[2])
-        field_index         = 3
-        price_increments    = []
-
-        if n_price_increments > 0:
-            for _ in range(n_price_increments):
-                price_increment = {
-                'low_edge'  : float(fields[field_index]),
-                'increment' : float(fields[field_index + 1])
-                }
-                field_index += 2
-                price_increments.append(price_increment)
-        return message_id, market_rule_id, price_increments
-
-    @staticmethod
-    def pnl(fields):
-        """
-
-        :param fields: Message Fields
-        :returns: message_id, request_id, pnl
-        """
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        pnl = {
-            'daily'      : float(fields[2]),
-            'unrealized' : float(fields[3]),
-            'realized'   : float(fields[4])
-        }
-        return message_id, request_id, pnl
-
 
+def _add_generated_parsers():
+    """
+    Add the parsers generated from the message schemas (tick_price, tick_by_tick, pnl, ...) to MessageParser,
+    see message_schema
+    """
+    for message_name, parser in PARSERS.items():
+        setattr(MessageParser, message_name, staticmethod(parser))
+    for alias, message_name in PARSER_ALIASES.items():
+        setattr(MessageParser, alias, staticmethod(PARSERS[message_name]))
 
-    @staticmethod
-    def pnl_single(fields):
-        """
-        Gets the profit and loss for a single position
-        :param fields:
-        :return:
-        """
-
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        pnl = {
-            'position'      :   int(fields[2])      ,
-            'daily'         :   float(fields[3])    ,
-            'unrealized'    :   float(fields[4])    ,
-            'realized'      :   float(fields[5])    ,
-            'value'         :   float(fields[6])
-        }
-        return message_id, request_id, pnl
-
-    @staticmethod
-    def historical_ticks(self, fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        tick_count = int(fields[2])
-        field_index = 3
 
-        ticks = []
-
-        for _ in range(tick_count):
-            historical_tick = {
-                'message_id'    :   int(fields[0])                  ,
-                'time'          :   int(fields[field_index])        ,
-                'price'         :   float(fields[field_index+1])    ,
-                'size'          :   int(fields[field_index+2])
-            }
-            field_index += 3
-            ticks.append(historical_tick)
-
-        done = int(fields[field_index]) == 1
-
-
-    @staticmethod
-    def historical_ticks_bid_ask(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        tick_count = int(fields[2])
-        field_index = 3
-
-        ticks = []
-
-        for _ in range(tick_count):
-            mask = int(fields[field_index + 1])
-            historical_tick_bid_ask = {
-                'time'              : int(fields[field_index]),
-                'mask'              : int(fields[field_index+1]),
-                'ask_past_high'     : mask & 1 != 0,
-                'bid_past_low'      : mask & 2 != 0,
-                'price_bid'         : fields[field_index+2],
-                'price_ask'         : float(fields[field_index+3]),
-                'size_bid'          : int(fields[field_index+4]),
-                'size_ask'          : int(fields[field_index+5])
-            }
-            ticks.append(historical_tick_bid_ask)
-
-        done = int(fields[field_index]) == 1
-        return message_id, request_id, ticks
-
-    @staticmethod
-    def historical_ticks_last(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        tick_count = int(fields[2])
-
-        ticks = []
-
-        field_index = 3
-        for _ in range(tick_count):
-            mask = int(field_index+1)
-            historicalTickLast = {
-                'time' : int(fields[field_index]),
-                'mask' : int(fields[field_index+1]),
-                'price' : float(fields[field_index+2]),
-                'size' : int(fields[field_index+3]),
-                'exchange' : fields[field_index+4],
-                'specialConditions': fields[field_index+5]
-            }
-            field_index += 6
-            ticks.append(historicalTickLast)
-
-            #TODO: Add back in this logic
-            #tickAttribLast = TickAttribLast()
-            #tickAttribLast.pastLimit = mask & 1 != 0
-            #tickAttribLast.unreported = mask & 2 != 0
-            #'tickAttribLast' : tickAttribLast
-
-        done = int(fields[field_index]) == 1
-        return message_id, request_id, ticks
-
-
-    @staticmethod
-    def tick_by_tick(fields):
-        message_id = int(fields[0])
-        request_id = int(fields[1])
-        tick_type  = int(fields[2])
-        time       = int(fields[3])
-
-        #TODO: Change comparisons to use TickType
-        if tick_type == 0:
-            # None
-            pass
-        elif tick_type == 1 or tick_type == 2:
-            # Last or AllLast
-            price = float(fields[4])
-            size = int(fields[5])
-            mask = int(fields[6])
-
-            #tickAttribLast = TickAttribLast()
-            #tickAttribLast.pastLimit = mask & 1 != 0
-            #tickAttribLast.unreported = mask & 2 != 0
-            exchange = fields[7]
-            special_conditions = fields[8]
-        elif tick_type == 3:
-            # BidAsk
-            bid_price = float(fields[4])#float(fields[])
-            ask_price = float(fields[5])#float(fields[])
-            bid_size = float(fields[6])#int(fields[])
-            ask_size = int(fields[7])#int(fields[])
-            mask = int(fields[8])#int(fields[])
-            #tickAttribBidAsk = TickAttribBidAsk()
-            #tickAttribBidAsk.bidPastLow = mask & 1 != 0
-            #tickAttribBidAsk.askPastHigh = mask & 2 != 0
-        elif tick_type == 4:
-            # MidPoint
-            mid_point = float(fields[4])
-
-
-        return message_id, request_id
\ No newline at end of file
+_add_generated_parsers()
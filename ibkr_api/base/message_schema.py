@@ -0,0 +1,439 @@
+"""
+Declarative layout of inbound messages and the parsers generated from it
+
+:Responsible For:
+1. Describing the fields of inbound messages, including repeated groups and fields added/removed by server versions
+2. Generating a specialized parser function per message and server version (no per field branching when parsing)
+3. Generating the slotted record classes the parsers return
+"""
+
+import logging
+
+from ibkr_api.base.constants        import MAX_CLIENT_VER, MIN_SERVER_VER_AGG_GROUP
+from ibkr_api.base.constants        import MIN_SERVER_VER_PRICE_BASED_VOLATILITY, MIN_SERVER_VER_REALIZED_PNL
+from ibkr_api.base.constants        import MIN_SERVER_VER_SERVICE_DATA_TYPE, MIN_SERVER_VER_SMART_DEPTH
+from ibkr_api.base.constants        import MIN_SERVER_VER_UNREALIZED_PNL, UNSET_INTEGER
+from ibkr_api.base.messages         import Messages
+from ibkr_api.classes.tick          import Record, TickPrice, TickSize, TickString
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID      = 'request_id'      # Name of the field holding the request id (returned apart from the record)
+SERVER_VERSION  = MAX_CLIENT_VER    # Server version of PARSERS (the highest the client negotiates), see parsers_for
+
+
+class Field(object):
+    def __init__(self, name, convert=str, none_if=None, empty=None, flags=(), since=None, until=None):
+        """
+        :param name: Attribute name (None -> the field is skipped, REQUEST_ID -> the field holds the request id)
+        :param convert: str, int, float, bool (the bridge sends '1' for True) or any function taking the string
+        :param none_if: Value the bridge uses for 'not computed', converted to None
+        :param empty: Value of the field when the bridge sends it empty (None -> it is always converted)
+        :param flags: Names of boolean attributes holding the field's bits (first name is bit 0)
+        :param since: Server version the field was added in
+        :param until: Server version the field was removed in
+        """
+        self.name       = name
+        self.convert    = convert
+        self.none_if    = none_if
+        self.empty      = empty
+        self.flags      = flags
+        self.since      = since
+        self.until      = until
+
+    def present(self, server_version):
+        return (self.since is None or server_version >= self.since) and \
+               (self.until is None or server_version < self.until)
+
+
+class Group(object):
+    def __init__(self, name, record_name, fields):
+        """
+        A group of fields repeated as many times as the count field preceding it says
+
+        :param name: Attribute name of the list of records
+        :param record_name: Name of the record class generated for each repetition
+        :param fields: Fields of each repetition
+        """
+        self.name           = name
+        self.record_name    = record_name
+        self.fields         = fields
+
+
+class Schema(object):
+    def __init__(self, message_name, record, fields, selector=None, variants=()):
+        """
+        :param message_name: Name of the inbound message (see Messages.inbound)
+        :param record: Name of the record class to generate, an existing class taking the fields positionally,
+                       or None to return the only non request id field as is (usually a group's list)
+        :param fields: Fields following the message id
+        :param selector: Name of the field choosing among the variants
+        :param variants: Layouts of the fields following the common ones: ((selector values), record name, fields)
+        """
+        self.message_name   = message_name
+        self.message_id     = Messages.inbound[message_name]
+        self.record         = record
+        self.fields         = fields
+        self.selector       = selector
+        self.variants       = variants
+
+
+def make_record(name, slots):
+    """
+    Generate a slotted record class
+
+    :param name: Class name
+    :param slots: Attribute names, in the order __init__ takes them
+    :return: Record subclass
+    """
+    body        = "".join("\n    self.{0} = {0}".format(slot) for slot in slots) or "\n    pass"
+    namespace   = {}
+    exec("def __init__(self, {0}):{1}".format(", ".join(slots), body), namespace)
+    return type(name, (Record,), {'__slots__': tuple(slots), '__init__': namespace['__init__'], '__module__': __name__})
+
+
+class ParserGenerator(object):
+    def __init__(self, server_version=SERVER_VERSION, records=None):
+        """
+        :param server_version: Server version the generated parsers handle
+        :param records: Record classes to reuse (their attributes do not depend on the server version)
+        """
+        self.server_version = server_version
+        self.records        = dict(records or {})   # Name -> record class generated
+
+    def record(self, name, fields):
+        """
+        :return: Record class named name with the attributes of fields (generated on first use)
+        """
+        cls = self.records.get(name)
+        if cls is None:
+            slots = []
+            for field in fields:
+                if isinstance(field, Group):
+                    slots.append(field.name)
+                elif field.name is not None and field.name != REQUEST_ID:
+                    slots.append(field.name)
+                    slots.extend(field.flags)
+            cls = self.records[name] = make_record(name, slots)
+        return cls
+
+    def _fields(self, fields, namespace, lines, indent, base, offset):
+        """
+        Emit the code converting fields
+
+        :param namespace: Globals of the generated function (receives the converters and record classes)
+        :param lines: Lines of code emitted so far
+        :param indent: Indentation of the emitted lines
+        :param base: Name of the variable holding the index fields are relative to (None -> absolute)
+        :param offset: Index of the first field relative to base
+        :return: (expressions of the values in order, request id expression, base, offset after the fields)
+        """
+        values      = []
+        request_id  = None
+        for field in fields:
+            index = ("{0} + {1}".format(base, offset) if offset else base) if base else str(offset)
+
+            if isinstance(field, Group):
+                cls     = self.record(field.record_name, field.fields)
+                items   = "v{0}".format(len(lines))
+                namespace[cls.__name__] = cls
+                lines.append("{0}{1} = []".format(indent, items))
+                lines.append("{0}i = {1}".format(indent, "{0} + {1}".format(base, offset + 1) if base else offset + 1))
+                lines.append("{0}for _ in range(int(f[{1}])):".format(indent, index))
+                (group_values, _, _, width) = self._fields(field.fields, namespace, lines, indent + "    ", 'i', 0)
+                lines.append("{0}    {1}.append({2}({3}))".format(indent, items, cls.__name__, ", ".join(group_values)))
+                lines.append("{0}    i += {1}".format(indent, width))
+                values.append(items)
+                (base, offset) = ('i', 0)
+                continue
+
+            if not field.present(self.server_version):
+                if field.name is not None and field.name != REQUEST_ID:
+                    values.append(repr(None) if field.empty is None else repr(field.empty))
+                    values.extend(repr(False) for _ in field.flags)
+                continue
+
+            offset += 1
+            if field.name is None:
+                continue
+
+            value = "f[{0}]".format(index)
+            if field.convert is bool:
+                value = "{0} == '1'".format(value)
+            elif field.convert is not str:
+                converter = field.convert.__name__ if field.convert in (int, float) else "convert{0}".format(len(namespace))
+                namespace[converter] = field.convert
+                value = "{0}({1})".format(converter, value)
+            if field.empty is not None:
+                value = "{0} if f[{1}] else {2!r}".format(value, index, field.empty)
+
+            if field.name == REQUEST_ID:
+                request_id = value
+                continue
+
+            if field.none_if is None and not field.flags:
+                values.append(value)
+                continue
+
+            variable = "v{0}".format(len(lines))
+            lines.append("{0}{1} = {2}".format(indent, variable, value))
+            if field.none_if is not None:
+                lines.append("{0}if {1} == {2!r}: {1} = None".format(indent, variable, field.none_if))
+            values.append(variable)
+            values.extend("{0} & {1} != 0".format(variable, 1 << bit) for bit in range(len(field.flags)))
+
+        return values, request_id, base, offset
+
+    def _return(self, schema, record, record_name, fields, values, request_id, namespace, indent):
+        if record is None:
+            data = values[0]
+        else:
+            if not isinstance(record, type):
+                record = self.record(record_name, fields)
+            namespace[record.__name__] = record
+            data = "{0}({1})".format(record.__name__, ", ".join(values))
+        return "{0}return {1}, {2}, {3}".format(indent, schema.message_id, request_id or None, data)
+
+    def generate(self, schema):
+        """
+        :param schema: Schema of an inbound message
+        :return: Parser function taking the message's fields and returning (message_id, request_id, data)
+        """
+        namespace   = {}
+        lines       = []
+        (values, request_id, base, offset) = self._fields(schema.fields, namespace, lines, "    ", None, 1)
+
+        if not schema.variants:
+            lines.append(self._return(schema, schema.record, schema.record, schema.fields, values, request_id,
+                                      namespace, "    "))
+        else:
+            named       = [field for field in schema.fields if not isinstance(field, Group)
+                           and field.name not in (None, REQUEST_ID) and field.present(self.server_version)]
+            for (index, value) in enumerate(values):
+                # Common values are used by every variant, convert them once
+                lines.append("    common{0} = {1}".format(index, value))
+                values[index] = "common{0}".format(index)
+            selector    = values[[field.name for field in named].index(schema.selector)]
+            if request_id is not None:
+                lines.append("    request_id = {0}".format(request_id))
+                request_id = "request_id"
+            for (selector_values, record_name, fields) in schema.variants:
+                lines.append("    if {0} in {1!r}:".format(selector, tuple(selector_values)))
+                (variant_values, _, _, _) = self._fields(fields, namespace, lines, "        ", base, offset)
+                lines.append(self._return(schema, record_name, record_name, schema.fields + fields,
+                                          values + variant_values, request_id, namespace, "        "))
+            lines.append("    return {0}, {1}, None".format(schema.message_id, request_id or None))
+
+        source = "def {0}(f):\n{1}\n".format(schema.message_name, "\n".join(lines))
+        exec(compile(source, "<schema {0}>".format(schema.message_name), 'exec'), namespace)
+        parser          = namespace[schema.message_name]
+        parser.source   = source
+        return parser
+
+
+SCHEMAS = [
+    Schema('tick_price', TickPrice, [
+        Field(None),                                    # Version
+        Field(REQUEST_ID,           int),
+        Field('tick_type_id',       int),
+        Field('price',              float),
+        Field('size',               int),
+        Field('attr_mask',          int)]),
+
+    Schema('tick_size', TickSize, [
+        Field(None),                                    # Version
+        Field(REQUEST_ID,           int),
+        Field('tick_type_id',       int),
+        Field('size',               int)]),
+
+    Schema('tick_string', TickString, [
+        Field(None),                                    # Version
+        Field(REQUEST_ID,           int),
+        Field('tick_type_id',       int),
+        Field('value')]),
+
+    Schema('tick_option_computation', 'OptionComputation', [
+        Field(None, until=MIN_SERVER_VER_PRICE_BASED_VOLATILITY),  # Version
+        Field(REQUEST_ID,           int),
+        Field('tick_type_id',       int),
+        Field('tick_attrib',        int, since=MIN_SERVER_VER_PRICE_BASED_VOLATILITY),
+        Field('implied_volatility', float, none_if=-1),
+        Field('delta',              float, none_if=-2),
+        Field('option_price',       float, none_if=-1),
+        Field('pv_dividend',        float, none_if=-1),
+        Field('gamma',              float, none_if=-2),
+        Field('vega',               float, none_if=-2),
+        Field('theta',              float, none_if=-2),
+        Field('underlying_price',   float, none_if=-1)]),
+
+    Schema('tick_request_params', 'TickRequestParams', [
+        Field(REQUEST_ID,           int),
+        Field('min_tick',           float),
+        Field('bbo_exchange'),
+        Field('snapshot_permissions', int)]),
+
+    Schema('tick_news', 'TickNews', [
+        Field(REQUEST_ID,           int),
+        Field('time_stamp',         int),
+        Field('provider_code'),
+        Field('article_id'),
+        Field('headline'),
+        Field('extra_data')]),
+
+    Schema('tick_by_tick', None, [
+        Field(REQUEST_ID,           int),
+        Field('tick_type',          int),
+        Field('time',               int)],
+        selector='tick_type',
+        variants=[
+            ((1, 2), 'TickByTickLast', [                # Last, AllLast
+                Field('price',              float),
+                Field('size',               int),
+                Field('mask',               int, flags=('past_limit', 'unreported')),
+                Field('exchange'),
+                Field('special_conditions')]),
+            ((3,), 'TickByTickBidAsk', [
+                Field('bid_price',          float),
+                Field('ask_price',          float),
+                Field('bid_size',           int),
+                Field('ask_size',           int),
+                Field('mask',               int, flags=('bid_past_low', 'ask_past_high'))]),
+            ((4,), 'TickByTickMidPoint', [
+                Field('mid_point',          float)])]),
+
+    Schema('market_depth', 'MarketDepth', [
+        Field(None),                                    # Version
+        Field(REQUEST_ID,           int),
+        Field('position',           int),
+        Field('operation',          int),
+        Field('side',               int),
+        Field('price',              float),
+        Field('size',               int)]),
+
+    Schema('market_depth_l2', 'MarketDepthL2', [
+        Field(None),                                    # Version
+        Field(REQUEST_ID,           int),
+        Field('position',           int),
+        Field('market_maker'),
+        Field('operation',          int),
+        Field('side',               int),
+        Field('price',              float),
+        Field('size',               int),
+        Field('is_smart_depth',     bool, since=MIN_SERVER_VER_SMART_DEPTH)]),
+
+    Schema('mkt_depth_exchanges', None, [
+        Group('descriptions', 'DepthMarketDataDescription', [
+            Field('exchange'),
+            Field('security_type'),
+            Field('listing_exchange',   since=MIN_SERVER_VER_SERVICE_DATA_TYPE),
+            Field('service_data_type',  since=MIN_SERVER_VER_SERVICE_DATA_TYPE),
+            Field('aggregate_group',    int, empty=UNSET_INTEGER, since=MIN_SERVER_VER_AGG_GROUP),
+            Field('is_l2',              bool, until=MIN_SERVER_VER_SERVICE_DATA_TYPE)])]),
+
+    Schema('market_rule', None, [
+        Field(REQUEST_ID,           int),               # Market rule id
+        Group('price_increments', 'PriceIncrement', [
+            Field('low_edge',           float),
+            Field('increment',          float)])]),
+
+    Schema('news_providers', None, [
+        Group('providers', 'NewsProvider', [
+            Field('code'),
+            Field('name')])]),
+
+    Schema('news_article', 'NewsArticle', [
+        Field(REQUEST_ID,           int),
+        Field('article_type',       int),
+        Field('article_text')]),
+
+    Schema('historical_news', 'HistoricalNews', [
+        Field(REQUEST_ID,           int),
+        Field('time'),
+        Field('provider_code'),
+        Field('article_id'),
+        Field('headline')]),
+
+    Schema('histogram_data', None, [
+        Field(REQUEST_ID,           int),
+        Group('histogram', 'HistogramEntry', [
+            Field('price',              float),
+            Field('count',              int)])]),
+
+    Schema('pnl', 'PnL', [
+        Field(REQUEST_ID,           int),
+        Field('daily',              float),
+        Field('unrealized',         float, since=MIN_SERVER_VER_UNREALIZED_PNL),
+        Field('realized',           float, since=MIN_SERVER_VER_REALIZED_PNL)]),
+
+    Schema('pnl_single', 'PnLSingle', [
+        Field(REQUEST_ID,           int),
+        Field('position',           int),
+        Field('daily',              float),
+        Field('unrealized',         float, since=MIN_SERVER_VER_UNREALIZED_PNL),
+        Field('realized',           float, since=MIN_SERVER_VER_REALIZED_PNL),
+        Field('value',              float)]),
+
+    Schema('historical_ticks', 'HistoricalTicks', [
+        Field(REQUEST_ID,           int),
+        Group('ticks', 'HistoricalTick', [
+            Field('time',               int),
+            Field(None),                                # Unused
+            Field('price',              float),
+            Field('size',               int)]),
+        Field('done',               bool)]),
+
+    Schema('historical_ticks_bid_ask', 'HistoricalTicks', [
+        Field(REQUEST_ID,           int),
+        Group('ticks', 'HistoricalTickBidAsk', [
+            Field('time',               int),
+            Field('mask',               int, flags=('ask_past_high', 'bid_past_low')),
+            Field('price_bid',          float),
+            Field('price_ask',          float),
+            Field('size_bid',           int),
+            Field('size_ask',           int)]),
+        Field('done',               bool)]),
+
+    Schema('historical_ticks_last', 'HistoricalTicks', [
+        Field(REQUEST_ID,           int),
+        Group('ticks', 'HistoricalTickLast', [
+            Field('time',               int),
+            Field('mask',               int, flags=('past_limit', 'unreported')),
+            Field('price',              float),
+            Field('size',               int),
+            Field('exchange'),
+            Field('special_conditions')]),
+        Field('done',               bool)]),
+]
+
+
+def generate_parsers(schemas=SCHEMAS, server_version=SERVER_VERSION):
+    """
+    :param schemas: Schemas of the inbound messages
+    :param server_version: Server version the parsers handle
+    :return: (inbound message name -> parser function, record class name -> record class)
+    """
+    generator   = ParserGenerator(server_version)
+    parsers     = {schema.message_name: generator.generate(schema) for schema in schemas}
+    return parsers, generator.records
+
+
+# Generated once at import, records are module attributes so they can be pickled
+(PARSERS, RECORDS) = generate_parsers()
+globals().update(RECORDS)
+
+_parsers = {SERVER_VERSION: PARSERS}    # Server version -> parsers
+
+
+def parsers_for(server_version):
+    """
+    Parsers of the messages as a given server version sends them (generated on first use, sharing RECORDS)
+
+    :param server_version: Server version negotiated by the version handshake
+    :return: inbound message name -> parser function
+    """
+    parsers = _parsers.get(server_version)
+    if parsers is None:
+        generator   = ParserGenerator(server_version, RECORDS)
+        parsers     = _parsers[server_version] = {schema.message_name: generator.generate(schema)
+                                                  for schema in SCHEMAS}
+    return parsers
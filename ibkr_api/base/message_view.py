@@ -0,0 +1,94 @@
+"""
+Lazily decoded view of a message received from the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Holding the raw bytes of a message without decoding or splitting them up front
+2. Reading the message id, and any single field, by splitting only up to that field
+3. Decoding all the fields once, and only when a consumer asks for them
+4. Mapping malformed frames to an unknown message id rather than raising on the hot path
+5. Behaving like the message dictionaries used so far (message['id'], message['fields'], etc.)
+"""
+
+from ibkr_api.base.messages import Messages
+
+KEYS = ('size', 'text', 'fields', 'id', 'action', 'received', 'request_id')
+
+UNKNOWN_MESSAGE_ID = -1     # Id of a malformed frame (empty or not starting with a number), which no handler matches
+
+
+class MessageView(object):
+    __slots__ = ('text', 'received', 'id', '_fields')
+
+    def __init__(self, text, received=None):
+        """
+        :param text: Payload of the frame (fields separated by NUL characters, size prefix removed)
+        :param received: time.monotonic() value of the read that completed the message
+        """
+        self.text       = text
+        self.received   = received
+        end             = text.find(b"\0")
+        try:
+            self.id     = int(text[:end] if end >= 0 else text)
+        except ValueError:
+            self.id     = UNKNOWN_MESSAGE_ID
+        self._fields    = None      # All fields, once decoded
+
+    @property
+    def size(self):
+        return len(self.text)
+
+    @property
+    def action(self):
+        return Messages.get_inbound_action(self.id)
+
+    @property
+    def request_id(self):
+        """ Request id the message carries (None if it has none, see Messages.request_id_field) """
+        index = Messages.request_id_field.get(self.action)
+        if index is None:
+            return None
+        try:
+            return int(self.field(index))
+        except (IndexError, ValueError):
+            return None
+
+    @property
+    def fields(self):
+        """ All fields decoded (the message id as an int), same as Messages.parse_message """
+        if self._fields is None:
+            self._fields = Messages.parse_message(self.text)
+        return self._fields
+
+    def field(self, index):
+        """
+        Decode a single field (only the separators before it are located)
+
+        :param index: Index of the field (0 is the message id)
+        :return: str
+        :raise IndexError: The message has fewer fields
+        """
+        if self._fields is not None:
+            return str(self._fields[index])
+
+        parts = self.text.split(b"\0", index + 1)
+        if len(parts) <= index + 1:
+            # The last part follows the last separator, it is not a field
+            raise IndexError(index)
+        return parts[index].decode('utf-8')
+
+    def __getitem__(self, key):
+        if key in KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in KEYS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in KEYS else default
+
+    def keys(self):
+        return KEYS
+
+    def __repr__(self):
+        return "MessageView(id={0}, action={1!r}, text={2!r})".format(self.id, self.action, self.text)
@@ -161,13 +161,136 @@ class Messages(object):
             'cancel_tick_by_tick_data'                          : 98
         }
 
+        # Inbound message names indexed by message id (constant time lookup of a message's action)
+        inbound_actions = [None] * (max(inbound.values()) + 1)
+        for _action, _action_id in inbound.items():
+            inbound_actions[_action_id] = _action
+        del _action, _action_id
+
+        # Position of the request id (ticker id, order id, market rule id) within an inbound message's fields.
+        # Messages not listed here can not be associated with a specific request.
+        request_id_field = {
+            'tick_price'                                    : 2,
+            'tick_size'                                     : 2,
+            'order_status'                                  : 1,
+            'info_message'                                  : 2,
+            'open_orders'                                   : 1,
+            'contract_data'                                 : 2,
+            'execution_data'                                : 1,
+            'market_depth'                                  : 2,
+            'market_depth_l2'                               : 2,
+            'historical_data'                               : 1,
+            'bond_contract_data'                            : 2,
+            'scanner_data'                                  : 2,
+            'tick_option_computation'                       : 2,
+            'tick_generic'                                  : 2,
+            'tick_string'                                   : 2,
+            'tick_efp'                                      : 2,
+            'real_time_bars'                                : 2,
+            'fundamental_data'                              : 2,
+            'contract_data_end'                             : 2,
+            'execution_data_end'                            : 2,
+            'delta_neutral_validation'                      : 2,
+            'tick_snapshot_end'                             : 2,
+            'market_data_type'                              : 2,
+            'account_summary'                               : 2,
+            'account_summary_end'                           : 2,
+            'display_group_list'                            : 2,
+            'display_group_updated'                         : 2,
+            'position_multi'                                : 2,
+            'position_multi_end'                            : 2,
+            'account_update_multi'                          : 2,
+            'account_update_multi_end'                      : 2,
+            'security_definition_option_parameter'          : 1,
+            'security_definition_option_parameter_end'      : 1,
+            'soft_dollar_tiers'                             : 1,
+            'symbol_samples'                                : 1,
+            'tick_request_params'                           : 1,
+            'smart_components'                              : 1,
+            'news_article'                                  : 1,
+            'tick_news'                                     : 1,
+            'historical_news'                               : 1,
+            'historical_news_end'                           : 1,
+            'head_time_stamp'                               : 1,
+            'histogram_data'                                : 1,
+            'historical_data_update'                        : 1,
+            'reroute_market_data_req'                       : 1,
+            'reroute_market_depth_req'                      : 1,
+            'market_rule'                                   : 1,
+            'pnl'                                           : 1,
+            'pnl_single'                                    : 1,
+            'historical_ticks'                              : 1,
+            'historical_ticks_bid_ask'                      : 1,
+            'historical_ticks_last'                         : 1,
+            'tick_by_tick'                                  : 1}
+
+        # Messages of an order's life cycle, the order id is in a different field of each (or missing, commission_report)
+        order_messages = ('order_status', 'open_orders', 'open_orders_end', 'execution_data', 'execution_data_end',
+                          'commission_report', 'order_bound')
+
+        # Inbound messages produced by each request in ApiCalls: (data messages, terminating message)
+        # A terminating message of None means the request is answered by the first data message.
+        # Requests not listed here do not produce a response.
+        responses = {
+            'calculate_implied_volatility'                  : (['tick_option_computation'], None),
+            'calculate_option_price'                        : (['tick_option_computation'], None),
+            'place_order'                                   : (['order_status'], None),
+            'query_display_groups'                          : (['display_group_list'], None),
+            'request_account_summary'                       : (['account_summary'], 'account_summary_end'),
+            'request_account_updates'                       : (['account_value', 'portfolio_value',
+                                                                'account_update_time'], 'account_download_end'),
+            'request_account_updates_multi'                 : (['account_update_multi'], 'account_update_multi_end'),
+            'request_all_open_orders'                       : (['open_orders', 'order_status'], 'open_orders_end'),
+            'request_contract_data'                         : (['contract_data', 'bond_contract_data'],
+                                                               'contract_data_end'),
+            'request_current_time'                          : (['current_time'], None),
+            'request_executions'                            : (['execution_data'], 'execution_data_end'),
+            'request_family_codes'                          : (['family_codes'], None),
+            'request_financial_advisor'                     : (['receive_fa'], None),
+            'request_fundamental_data'                      : (['fundamental_data'], None),
+            'request_head_time_stamp'                       : (['head_time_stamp'], None),
+            'request_histogram_data'                        : (['histogram_data'], None),
+            'request_historical_data'                       : (['historical_data'], None),
+            'request_historical_news'                       : (['historical_news'], 'historical_news_end'),
+            'request_historical_ticks'                      : (['historical_ticks', 'historical_ticks_bid_ask',
+                                                                'historical_ticks_last'], None),
+            'request_managed_accounts'                      : (['managed_accounts'], None),
+            'request_market_data'                           : (['tick_price', 'tick_size', 'tick_string',
+                                                                'tick_generic', 'tick_efp',
+                                                                'tick_option_computation'], 'tick_snapshot_end'),
+            'request_market_depth'                          : (['market_depth', 'market_depth_l2'], None),
+            'request_market_depth_exchanges'                : (['mkt_depth_exchanges'], None),
+            'request_market_rule'                           : (['market_rule'], None),
+            'request_matching_symbols'                      : (['symbol_samples'], None),
+            'request_news_article'                          : (['news_article'], None),
+            'request_news_bulletins'                        : (['news_bulletins'], None),
+            'request_news_providers'                        : (['news_providers'], None),
+            'request_open_orders'                           : (['open_orders', 'order_status'], 'open_orders_end'),
+            'request_order_ids'                             : (['next_valid_id'], None),
+            'request_pnl'                                   : (['pnl'], None),
+            'request_pnl_single'                            : (['pnl_single'], None),
+            'request_positions'                             : (['position_data'], 'position_end'),
+            'request_positions_multi'                       : (['position_multi'], 'position_multi_end'),
+            'request_real_time_bars'                        : (['real_time_bars'], None),
+            'request_scanner_parameters'                    : (['scanner_parameters'], None),
+            'request_scanner_subscription'                  : (['scanner_data'], None),
+            'request_security_definition_option_parameters' : (['security_definition_option_parameter'],
+                                                               'security_definition_option_parameter_end'),
+            'request_smart_components'                      : (['smart_components'], None),
+            'request_soft_dollar_tiers'                     : (['soft_dollar_tiers'], None),
+            'request_tick_by_tick_data'                     : (['tick_by_tick'], None),
+            'subscribe_to_group_events'                     : (['display_group_updated'], None),
+            'verify_and_auth_request'                       : (['verify_and_auth_message_api'], None),
+            'verify_request'                                : (['verify_message_api'], None)}
+
 
 
         @staticmethod
         def parse_message(raw_message: bytes):
             """ Parse message into a list of fields.
-            The message is made of fields separated by NULL character"""
-            message = bytearray(raw_message).decode()
+            The message is made of fields separated by NULL character
+            raw_message can be any bytes like object (bytes, bytearray, memoryview)"""
+            message = str(raw_message, 'utf-8')
             fields = message.split("\0")
 
             # First field is always message id and as such can be converted to int here
@@ -177,6 +300,22 @@ class Messages(object):
 
         @staticmethod
         def get_inbound_action(message_id):
-            for action, action_id in Messages.inbound.items():
-                if action_id == message_id:
-                    return action
\ No newline at end of file
+            if 0 <= message_id < len(Messages.inbound_actions):
+                return Messages.inbound_actions[message_id]
+            return None
+
+        @staticmethod
+        def dispatch_table(message_parser, application):
+            """
+            Bind every inbound message id to its parser function and to the application's handler.
+            Built once so the event loop does not look functions up by name for every message.
+
+            :param message_parser: Object providing a parsing function per inbound message (MessageParser)
+            :param application: Object providing the handler functions (None where it has no handler)
+            :return: list indexed by message id of (parser function, handler) tuples (None for unknown ids)
+            """
+            table = [None] * len(Messages.inbound_actions)
+            for message_id, action in enumerate(Messages.inbound_actions):
+                if action is not None:
+                    table[message_id] = (getattr(message_parser, action, None), getattr(application, action, None))
+            return table
\ No newline at end of file
@@ -0,0 +1,314 @@
+"""
+Instrumentation of the hot path between the bridge (TWS/IBGW) and the application's handlers
+
+:Responsible For:
+1. Counting the messages received per inbound message type, and those coalesced by conflation
+2. Timing the parsing and the handler of every message handled, per message type (histograms)
+3. Measuring the age of messages when their handler is invoked, and the depth of the queues, to spot lagging handlers
+4. Deriving the bytes and frames received per second from the connection's counters
+5. Reporting all of it as a dictionary, or in the Prometheus text format, optionally over a local HTTP endpoint
+"""
+
+from bisect         import bisect_left
+from http.server    import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import logging
+import threading
+import time
+
+from ibkr_api.base.messages import Messages
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets, from a microsecond to a few seconds
+LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX          = "ibkr_"
+CONTENT_TYPE    = "text/plain; version=0.0.4; charset=utf-8"
+RATE_INTERVAL   = 1.0   # Seconds between the samples the rates are computed from (see sample)
+
+
+class Histogram(object):
+    __slots__ = ('buckets', 'counts', 'count', 'sum', 'max')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Sorted upper bounds of the buckets (values above the last one are counted in an extra bucket)
+        """
+        self.buckets    = buckets
+        self.counts     = [0] * (len(buckets) + 1)
+        self.count      = 0
+        self.sum        = 0.0
+        self.max        = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count  += 1
+        self.sum    += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        :param percent: Percentile (0 to 100)
+        :return: Upper bound of the bucket holding the percentile (the maximum if it is above the last bucket)
+        """
+        if not self.count:
+            return 0.0
+        rank        = percent / 100.0 * self.count
+        cumulative  = 0
+        for (bound, count) in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        :return: Dictionary of the count, mean, max and approximate p50/p90/p99 (seconds)
+        """
+        return {'count' : self.count,
+                'mean'  : self.sum / self.count if self.count else 0.0,
+                'max'   : self.max,
+                'p50'   : self.percentile(50),
+                'p90'   : self.percentile(90),
+                'p99'   : self.percentile(99)}
+
+
+class Metrics(object):
+    def __init__(self, connection=None, conflator=None, executor=None, buckets=LATENCY_BUCKETS):
+        """
+        Created by the client applications when metrics are enabled (see their metrics and metrics_port),
+        or directly around any connection, e.g. Metrics(api.conn).serve(9100)
+
+        :param connection: BridgeConnection whose counters are reported
+        :param conflator: Conflator whose coalesced messages are reported
+        :param executor: ShardedExecutor whose queues are reported
+        :param buckets: Upper bounds (seconds) of the histogram buckets
+        """
+        self.connection     = connection
+        self.conflator      = conflator
+        self.executor       = executor
+        self.buckets        = buckets
+        self.lock           = threading.Lock()      # Handlers may run on several worker threads
+        self.started        = time.monotonic()
+
+        # Per message id (see Messages.inbound)
+        self.received       = [0] * len(Messages.inbound_actions)
+        self.parse_time     = {}    # Message id -> Histogram of the seconds spent decoding and parsing
+        self.handler_time   = {}    # Message id -> Histogram of the seconds spent in the handler
+        self.age            = Histogram(buckets)    # Seconds between a frame's arrival and its handler's invocation
+
+        # Rates, derived from the connection's counters by sample()
+        self.last_sample    = None  # (time.monotonic(), bytes received, frames received)
+        self.bytes_rate     = 0.0
+        self.frames_rate    = 0.0
+
+        # Local HTTP endpoint (see serve)
+        self.server         = None
+        self.server_thread  = None
+
+        self.sample()
+
+    def count(self, messages):
+        """
+        Count a batch of messages received, before conflation drops any of them
+
+        :param messages: MessageViews
+        """
+        received = self.received
+        with self.lock:
+            for message in messages:
+                if 0 <= message.id < len(received):
+                    received[message.id] += 1
+
+    def record(self, message_id, age, parse_seconds, handler_seconds):
+        """
+        Record the handling of a message
+
+        :param message_id: Inbound message id
+        :param age: Seconds between the frame's arrival and the start of its handling
+        :param parse_seconds: Seconds spent decoding and parsing its fields
+        :param handler_seconds: Seconds spent in the application's handler
+        """
+        with self.lock:
+            parse_time = self.parse_time.get(message_id)
+            if parse_time is None:
+                parse_time = self.parse_time[message_id] = Histogram(self.buckets)
+                self.handler_time[message_id] = Histogram(self.buckets)
+            parse_time.observe(parse_seconds)
+            self.handler_time[message_id].observe(handler_seconds)
+            self.age.observe(age)
+
+    def sample(self, min_interval=0.0):
+        """
+        Update the bytes and frames received per second, meant to be called every RATE_INTERVAL seconds
+        (snapshot() and prometheus() also update them when nothing else has for RATE_INTERVAL seconds)
+
+        :param min_interval: Seconds that must have passed since the previous sample, or nothing is updated
+        """
+        if self.connection is None:
+            return
+
+        now = time.monotonic()
+        if self.last_sample is not None and now - self.last_sample[0] < min_interval:
+            return
+        current = (now, self.connection.bytes_received, self.connection.frames_received)
+        if self.last_sample is not None:
+            (then, bytes_received, frames_received) = self.last_sample
+            if now > then:
+                self.bytes_rate     = (current[1] - bytes_received) / (now - then)
+                self.frames_rate    = (current[2] - frames_received) / (now - then)
+        self.last_sample = current
+
+    def snapshot(self):
+        """
+        :return: Dictionary of every metric (durations in seconds)
+        """
+        self.sample(RATE_INTERVAL)
+        with self.lock:
+            messages = {}
+            for (message_id, action) in enumerate(Messages.inbound_actions):
+                if action is None or (not self.received[message_id] and message_id not in self.parse_time):
+                    continue
+                parse_time      = self.parse_time.get(message_id)
+                handler_time    = self.handler_time.get(message_id)
+                messages[action] = {'received'  : self.received[message_id],
+                                    'handled'   : parse_time.count if parse_time else 0,
+                                    'parse'     : parse_time.snapshot() if parse_time else None,
+                                    'handler'   : handler_time.snapshot() if handler_time else None}
+            age = self.age.snapshot()
+
+        snapshot = {'uptime'                    : time.monotonic() - self.started,
+                    'bytes_received_per_second' : self.bytes_rate,
+                    'frames_received_per_second': self.frames_rate,
+                    'messages'                  : messages,
+                    'age'                       : age,
+                    'conflated'                 : self.conflator.coalesced if self.conflator is not None else 0,
+                    'worker_queued'             : self.executor.queued() if self.executor is not None else []}
+        if self.connection is not None:
+            snapshot['connection'] = self.connection.metrics()
+        return snapshot
+
+    ######################################
+    # Prometheus Text Format             #
+    ######################################
+    def prometheus(self):
+        """
+        :return: Every metric in the Prometheus text exposition format (version 0.0.4)
+        """
+        self.sample(RATE_INTERVAL)
+        lines = []
+
+        def family(name, kind, description):
+            lines.append("# HELP {0}{1} {2}".format(PREFIX, name, description))
+            lines.append("# TYPE {0}{1} {2}".format(PREFIX, name, kind))
+
+        def sample(name, value, labels=""):
+            lines.append("{0}{1}{2} {3}".format(PREFIX, name, "{" + labels + "}" if labels else "", repr(value)))
+
+        def histogram(name, histogram, labels=""):
+            separator   = "," if labels else ""
+            cumulative  = 0
+            for (bound, count) in zip(self.buckets, histogram.counts):
+                cumulative += count
+                sample(name + "_bucket", cumulative, '{0}{1}le="{2!r}"'.format(labels, separator, bound))
+            sample(name + "_bucket", histogram.count, '{0}{1}le="+Inf"'.format(labels, separator))
+            sample(name + "_sum", histogram.sum, labels)
+            sample(name + "_count", histogram.count, labels)
+
+        connection = self.connection.metrics() if self.connection is not None else None
+        if connection is not None:
+            family("bytes_received_total", "counter", "Bytes received from the bridge.")
+            sample("bytes_received_total", connection['bytes_received'])
+            family("frames_received_total", "counter", "Frames received from the bridge.")
+            sample("frames_received_total", connection['frames_received'])
+            family("bytes_sent_total", "counter", "Bytes sent to the bridge.")
+            sample("bytes_sent_total", connection['bytes_sent'])
+            family("bytes_received_per_second", "gauge", "Bytes received per second over the last sample interval.")
+            sample("bytes_received_per_second", self.bytes_rate)
+            family("frames_received_per_second", "gauge", "Frames received per second over the last sample interval.")
+            sample("frames_received_per_second", self.frames_rate)
+            family("inbound_queue_depth", "gauge", "Messages queued by the reader thread, waiting to be handled.")
+            sample("inbound_queue_depth", connection['queued'])
+            family("inbound_queue_full_total", "counter", "Times the reader thread waited for room in a full queue.")
+            sample("inbound_queue_full_total", connection['queue_full_waits'])
+
+        if self.executor is not None:
+            family("worker_queue_depth", "gauge", "Messages queued per handler worker thread.")
+            for (worker, queued) in enumerate(self.executor.queued()):
+                sample("worker_queue_depth", queued, 'worker="{0}"'.format(worker))
+
+        if self.conflator is not None:
+            family("messages_conflated_total", "counter", "Market data messages dropped because a later one replaced them.")
+            sample("messages_conflated_total", self.conflator.coalesced)
+
+        with self.lock:
+            family("messages_received_total", "counter", "Messages received per inbound message type.")
+            for (message_id, action) in enumerate(Messages.inbound_actions):
+                if action is not None and self.received[message_id]:
+                    sample("messages_received_total", self.received[message_id], 'message="{0}"'.format(action))
+
+            family("parse_seconds", "histogram", "Seconds spent decoding and parsing a message, per message type.")
+            for message_id in sorted(self.parse_time):
+                labels = 'message="{0}"'.format(Messages.get_inbound_action(message_id))
+                histogram("parse_seconds", self.parse_time[message_id], labels)
+
+            family("handler_seconds", "histogram", "Seconds spent in the application's handler, per message type.")
+            for message_id in sorted(self.handler_time):
+                labels = 'message="{0}"'.format(Messages.get_inbound_action(message_id))
+                histogram("handler_seconds", self.handler_time[message_id], labels)
+
+            family("message_age_seconds", "histogram", "Seconds between a frame's arrival and its handler's invocation.")
+            histogram("message_age_seconds", self.age)
+
+        return "\n".join(lines) + "\n"
+
+    ######################################
+    # Local HTTP Endpoint (opt-in)       #
+    ######################################
+    def serve(self, port=0, host="127.0.0.1"):
+        """
+        Serve prometheus() on http://host:port/metrics from a background thread
+
+        :param port: Port to listen on (0 -> any free port)
+        :param host: Interface to listen on (only the local host by default)
+        :return: Port listened on
+        """
+        if self.server is not None:
+            return self.server.server_address[1]
+
+        metrics = self
+
+        class MetricsRequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format % args)
+
+        self.server         = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server_thread  = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+        self.server_thread.start()
+        logger.info("Serving metrics on http://{0}:{1}/metrics".format(host, self.server.server_address[1]))
+        return self.server.server_address[1]
+
+    def stop_serving(self):
+        if self.server is None:
+            return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        self.server         = None
+        self.server_thread  = None
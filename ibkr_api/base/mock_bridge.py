@@ -0,0 +1,517 @@
+"""
+Local stand-in for the bridge (TWS/IBGW), to benchmark and load test client applications without an IB account
+
+:Responsible For:
+1. Accepting client connections, performing the API version handshake and answering start_api
+2. Answering requests (current time, order ids, contract data, historical data, orders) with well formed messages
+3. Streaming ticks and market depth for every subscription at a configurable rate, with optional bursts
+4. Letting tests replace the replies and push their own messages to the connected clients
+"""
+
+from datetime   import datetime, timedelta
+
+import logging
+import random
+import socket
+import threading
+import time
+
+from ibkr_api.base.constants        import MAX_CLIENT_VER
+from ibkr_api.base.frame_decoder    import FrameDecoder
+from ibkr_api.base.messages         import Messages
+from ibkr_api.base.message_encoder  import encode_message
+
+logger = logging.getLogger(__name__)
+
+HANDSHAKE_PREFIX    = b"API\0"
+OUTBOUND_ACTIONS    = {message_id: action for (action, message_id) in Messages.outbound.items()}
+
+# Tick types cycled through by the market data streams (the last timestamp carries the time it was sent)
+BID, ASK, LAST, BID_SIZE, ASK_SIZE, LAST_SIZE, LAST_TIMESTAMP = 1, 2, 4, 0, 3, 5, 45
+
+
+class MockClient(object):
+    def __init__(self, sock, address):
+        """
+        Connection of a client application to the MockBridge
+
+        :param sock: Accepted socket
+        :param address: Client's address
+        """
+        self.socket         = sock
+        self.address        = address
+        self.decoder        = FrameDecoder()
+        self.send_lock      = threading.Lock()  # Replies and streams are sent from different threads
+        self.streams        = {}                # (request action, request id) -> MessageStream
+        self.client_id      = None
+        self.connected      = True
+
+        # Metrics
+        self.messages_sent  = 0
+        self.bytes_sent     = 0
+        self.requests       = 0
+
+    def send(self, *messages):
+        """
+        Send messages to the client
+
+        :param messages: Lists of fields, or frames already encoded (see encode_message)
+        """
+        data = b"".join(message if isinstance(message, bytes) else encode_message(message) for message in messages)
+        self.write(data, len(messages))
+
+    def write(self, data, count=1):
+        """
+        :param data: Encoded frames
+        :param count: Number of frames in data
+        """
+        try:
+            with self.send_lock:
+                self.socket.sendall(data)
+        except (socket.error, AttributeError):
+            self.connected = False
+            return
+        self.messages_sent  += count
+        self.bytes_sent     += len(data)
+
+    def stop_streams(self):
+        for stream in list(self.streams.values()):
+            stream.stop()
+        self.streams.clear()
+
+    def close(self):
+        self.connected = False
+        self.stop_streams()
+        try:
+            self.socket.close()
+        except socket.error:
+            pass
+
+
+class MessageStream(object):
+    def __init__(self, client, make_message, rate, count=None, burst_size=0, burst_interval=1.0, name="Stream"):
+        """
+        Thread sending generated messages to a client at a steady rate, plus periodic bursts.
+        Messages that are due are sent together, so rates far above the sleep resolution are kept up.
+
+        :param client: MockClient
+        :param make_message: Function returning the fields of the next message (called with the message's index)
+        :param rate: Messages per second
+        :param count: Number of messages to send (None -> until stopped)
+        :param burst_size: Number of extra messages sent back to back every burst_interval (0 -> no bursts)
+        :param burst_interval: Seconds between bursts
+        :param name: Name of the thread
+        """
+        self.client         = client
+        self.make_message   = make_message
+        self.rate           = rate
+        self.count          = count
+        self.burst_size     = burst_size
+        self.burst_interval = burst_interval
+        self.sent           = 0
+        self.stopped        = threading.Event()
+        self.thread         = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def burst(self, size):
+        """
+        Send size messages back to back (from the calling thread)
+        """
+        self._send(size)
+
+    def _send(self, size):
+        if self.count is not None:
+            size = min(size, self.count - self.sent)
+        if size <= 0:
+            return
+
+        frames = [encode_message(self.make_message(self.sent + index)) for index in range(size)]
+        self.sent += size
+        self.client.write(b"".join(frames), size)
+
+    def _run(self):
+        started     = time.monotonic()
+        next_burst  = started + self.burst_interval
+        while not self.stopped.is_set() and self.client.connected:
+            if self.count is not None and self.sent >= self.count:
+                break
+
+            now = time.monotonic()
+            due = int((now - started) * self.rate) - self.sent
+            if self.burst_size and now >= next_burst:
+                due         += self.burst_size
+                started     -= self.burst_size / self.rate     # Bursts come on top of the steady rate
+                next_burst  += self.burst_interval
+            if due > 0:
+                self._send(due)
+                continue
+
+            # Sleep until the next message (or burst) is due
+            delay = started + (self.sent + 1) / self.rate - now
+            if self.burst_size:
+                delay = min(delay, next_burst - now)
+            self.stopped.wait(max(delay, 0.0005))
+
+
+class MockBridge(object):
+    def __init__(self, host='127.0.0.1', port=0, server_version=MAX_CLIENT_VER, tick_rate=100.0, depth_rate=100.0,
+                 burst_size=0, burst_interval=1.0, historical_bars=100, depth_rows=10, account='DU1234567',
+                 seed=None):
+        """
+        :param host: Interface to listen on
+        :param port: Port to listen on (0 -> any free port, see start())
+        :param server_version: Version sent in the handshake
+        :param tick_rate: Messages per second streamed for each market data subscription
+        :param depth_rate: Messages per second streamed for each market depth subscription
+        :param burst_size: Number of extra messages each stream sends back to back every burst_interval
+        :param burst_interval: Seconds between bursts
+        :param historical_bars: Number of bars returned for a historical data request
+        :param depth_rows: Number of rows of the simulated order books
+        :param account: Account returned in managed_accounts
+        :param seed: Seed of the simulated prices (None -> random)
+        """
+        self.host               = host
+        self.port               = port
+        self.server_version     = server_version
+        self.tick_rate          = tick_rate
+        self.depth_rate         = depth_rate
+        self.burst_size         = burst_size
+        self.burst_interval     = burst_interval
+        self.historical_bars    = historical_bars
+        self.depth_rows         = depth_rows
+        self.account            = account
+        self.random             = random.Random(seed)
+
+        self.server             = None
+        self.accept_thread      = None
+        self.clients            = []
+        self.next_order_id      = 1
+        self.next_perm_id       = 1000000
+        self.lock               = threading.Lock()
+
+        # Outbound message name -> function(client, fields) answering it
+        self.handlers = {
+            'start_api'                 : self.on_start_api,
+            'request_current_time'      : self.on_request_current_time,
+            'request_order_ids'         : self.on_request_order_ids,
+            'request_contract_data'     : self.on_request_contract_data,
+            'request_market_data'       : self.on_request_market_data,
+            'cancel_market_data'        : self.on_cancel_stream,
+            'request_market_depth'      : self.on_request_market_depth,
+            'cancel_market_depth'       : self.on_cancel_stream,
+            'request_historical_data'   : self.on_request_historical_data,
+            'place_order'               : self.on_place_order,
+            'cancel_order'              : self.on_cancel_order,
+        }
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Listen for client applications
+
+        :return: Port listened on
+        """
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(8)
+        self.port = self.server.getsockname()[1]
+
+        self.accept_thread = threading.Thread(target=self._accept_loop, name="MockBridge", daemon=True)
+        self.accept_thread.start()
+        logger.info("Mock bridge listening on %s:%d", self.host, self.port)
+        return self.port
+
+    def stop(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        for client in list(self.clients):
+            client.close()
+        self.clients = []
+        logger.info("Mock bridge stopped")
+
+    def on(self, action, handler):
+        """
+        Answer a request with handler instead of the default reply
+
+        :param action: Outbound message name (see Messages.outbound)
+        :param handler: Function called with the MockClient and the request's fields (None -> ignore the request)
+        """
+        if action not in Messages.outbound:
+            raise ValueError("Unknown outbound message '{0}'".format(action))
+        self.handlers[action] = handler
+
+    def send(self, *messages):
+        """
+        Send messages to every connected client
+
+        :param messages: Lists of fields, or encoded frames
+        """
+        for client in list(self.clients):
+            client.send(*messages)
+
+    def stream(self, client, key, make_message, rate, count=None, burst_size=None, burst_interval=None):
+        """
+        Start streaming generated messages to a client (replacing any stream with the same key)
+
+        :param client: MockClient
+        :param key: Identifies the stream, e.g. (request action, request id)
+        :param make_message: Function returning the fields of the next message (called with the message's index)
+        :param rate: Messages per second
+        :param count: Number of messages to send (None -> until stopped)
+        :param burst_size: See MessageStream (None -> the bridge's setting)
+        :param burst_interval: See MessageStream (None -> the bridge's setting)
+        :return: MessageStream
+        """
+        previous = client.streams.pop(key, None)
+        if previous is not None:
+            previous.stop()
+
+        stream = MessageStream(client, make_message, rate, count,
+                               self.burst_size if burst_size is None else burst_size,
+                               self.burst_interval if burst_interval is None else burst_interval,
+                               name="MockStream-{0}".format(key))
+        client.streams[key] = stream
+        return stream.start()
+
+    def burst(self, request_id, size):
+        """
+        Send size messages of a request's streams back to back, e.g. to reproduce the open or a news spike
+
+        :param request_id: Id of the market data or depth request
+        :param size: Number of messages
+        """
+        for client in list(self.clients):
+            for ((_, stream_request_id), stream) in list(client.streams.items()):
+                if stream_request_id == request_id:
+                    stream.burst(size)
+
+    def metrics(self):
+        """
+        :return: Dictionary of the clients connected, requests received and messages sent
+        """
+        clients = list(self.clients)
+        return {'clients'       : len(clients),
+                'requests'      : sum(client.requests for client in clients),
+                'streams'       : sum(len(client.streams) for client in clients),
+                'messages_sent' : sum(client.messages_sent for client in clients),
+                'bytes_sent'    : sum(client.bytes_sent for client in clients)}
+
+    #################################################################
+    # Connections                                                   #
+    #################################################################
+    def _accept_loop(self):
+        while self.server is not None:
+            try:
+                (sock, address) = self.server.accept()
+            except (socket.error, AttributeError):
+                break
+
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = MockClient(sock, address)
+            self.clients.append(client)
+            threading.Thread(target=self._client_loop, args=(client,), name="MockClient-{0}".format(address[1]),
+                             daemon=True).start()
+
+    def _client_loop(self, client):
+        try:
+            if self._handshake(client):
+                while client.connected:
+                    if client.decoder.recv_from(client.socket) == 0:
+                        break
+                    for frame in client.decoder.frames():
+                        self._handle(client, bytes(frame).split(b"\0")[:-1])
+                    if client.decoder.out_of_sync:
+                        break
+        except socket.error as e:
+            if client.connected:
+                logger.debug("Client %s disconnected: %s", client.address, e)
+        finally:
+            client.close()
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def _handshake(self, client):
+        """
+        Read the "API\\0" prefix and the client's version range, answer with the server version and time
+        """
+        prefix = b""
+        while len(prefix) < len(HANDSHAKE_PREFIX):
+            data = client.socket.recv(len(HANDSHAKE_PREFIX) - len(prefix))
+            if not data:
+                return False
+            prefix += data
+        if prefix != HANDSHAKE_PREFIX:
+            logger.error("Client %s sent an invalid handshake prefix: %r", client.address, prefix)
+            return False
+
+        # The version range ("v100..148") is the first frame
+        while True:
+            frames = list(client.decoder.frames())
+            if frames:
+                break
+            if client.decoder.recv_from(client.socket) == 0:
+                return False
+        logger.debug("Client %s versions: %s", client.address, bytes(frames[0]).decode())
+
+        client.send([self.server_version, datetime.now().strftime("%Y%m%d %H:%M:%S EST")])
+        return True
+
+    def _handle(self, client, fields):
+        client.requests += 1
+        fields  = [field.decode('utf-8', 'replace') for field in fields]
+        action  = OUTBOUND_ACTIONS.get(int(fields[0])) if fields and fields[0].isdigit() else None
+        handler = self.handlers.get(action)
+        if handler is None:
+            logger.debug("No reply to '%s' (%s)", action, fields)
+            return
+        try:
+            handler(client, fields)
+        except Exception:
+            logger.exception("Replying to '{0}' failed".format(action))
+
+    #################################################################
+    # Default replies (field positions are those sent by ApiCalls)   #
+    #################################################################
+    def on_start_api(self, client, fields):
+        client.client_id = int(fields[2])
+        client.send([Messages.inbound['next_valid_id'], 1, self.next_order_id],
+                    [Messages.inbound['managed_accounts'], 1, self.account])
+
+    def on_request_current_time(self, client, fields):
+        client.send([Messages.inbound['current_time'], 1, int(time.time())])
+
+    def on_request_order_ids(self, client, fields):
+        client.send([Messages.inbound['next_valid_id'], 1, self.next_order_id])
+
+    def on_request_contract_data(self, client, fields):
+        request_id  = int(fields[2])
+        contract_id = int(fields[3]) if fields[3].isdigit() and int(fields[3]) else 10000 + request_id
+        symbol      = fields[4] or "MOCK"
+        security    = fields[5] or "STK"
+        currency    = fields[12] or "USD"
+        today       = datetime.now().strftime("%Y%m%d")
+        hours       = "{0}:0930-{0}:1600".format(today)
+        client.send([Messages.inbound['contract_data'], 8, request_id, symbol, security, "", 0.0, "", "SMART",
+                     currency, symbol, "NMS", symbol, contract_id, 0.01, 1, "", "ACTIVETIM,LMT,MKT,STP",
+                     "SMART,ISLAND,ARCA", 1, 0, symbol + " INC", "NASDAQ", "", "Technology", "Computers",
+                     "Computers", "US/Eastern", hours, hours, "", "", 0, 1, "", "", "26,26", ""],
+                    [Messages.inbound['contract_data_end'], 1, request_id])
+
+    def on_request_market_data(self, client, fields):
+        request_id  = int(fields[2])
+        self.stream(client, ('request_market_data', request_id), self._tick_maker(request_id), self.tick_rate)
+
+    def on_request_market_depth(self, client, fields):
+        request_id  = int(fields[2])
+        self.stream(client, ('request_market_depth', request_id), self._depth_maker(request_id), self.depth_rate)
+
+    def on_cancel_stream(self, client, fields):
+        action      = OUTBOUND_ACTIONS[int(fields[0])].replace('cancel_', 'request_')
+        stream      = client.streams.pop((action, int(fields[2])), None)
+        if stream is not None:
+            stream.stop()
+
+    def on_request_historical_data(self, client, fields):
+        request_id  = int(fields[1])
+        count       = self.historical_bars
+        end         = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start       = end - timedelta(days=count)
+        price       = 100.0
+        bars        = []
+        for day in range(count):
+            open_price  = price
+            price       = max(0.01, price + self.random.gauss(0.0, 1.0))
+            high        = max(open_price, price) + abs(self.random.gauss(0.0, 0.5))
+            low         = min(open_price, price) - abs(self.random.gauss(0.0, 0.5))
+            volume      = self.random.randint(1000, 100000)
+            bars       += [(start + timedelta(days=day + 1)).strftime("%Y%m%d"), "%.2f" % open_price, "%.2f" % high,
+                           "%.2f" % low, "%.2f" % price, volume, "%.4f" % ((high + low + price) / 3),
+                           volume // 100]
+        client.send([Messages.inbound['historical_data'], request_id, start.strftime("%Y%m%d  %H:%M:%S"),
+                     end.strftime("%Y%m%d  %H:%M:%S"), count] + bars)
+
+    def on_place_order(self, client, fields):
+        """ Acknowledge the order, then fill it at its limit price (or 100 for orders without one) """
+        order_id    = int(fields[1])
+        quantity    = float(fields[17] or 0)
+        price       = float(fields[19] or 100.0)
+        with self.lock:
+            perm_id             = self.next_perm_id
+            self.next_perm_id   += 1
+            self.next_order_id  = max(self.next_order_id, order_id + 1)
+        client.send(self._order_status(client, order_id, perm_id, "Submitted", 0.0, quantity, 0.0),
+                    self._order_status(client, order_id, perm_id, "Filled", quantity, 0.0, price))
+
+    def on_cancel_order(self, client, fields):
+        order_id = int(fields[2])
+        client.send(self._order_status(client, order_id, 0, "Cancelled", 0.0, 0.0, 0.0))
+
+    @staticmethod
+    def _order_status(client, order_id, perm_id, status, filled, remaining, price):
+        return [Messages.inbound['order_status'], order_id, status, filled, remaining, price, perm_id, 0, price,
+                client.client_id or 0, "", 0.0]
+
+    #################################################################
+    # Simulated market data                                         #
+    #################################################################
+    def _tick_maker(self, request_id):
+        """
+        :return: Function generating the ticks of a market data subscription
+                 (bid, bid size, ask, ask size, last, last size and last timestamp, in turn)
+        """
+        tick_price  = Messages.inbound['tick_price']
+        tick_size   = Messages.inbound['tick_size']
+        tick_string = Messages.inbound['tick_string']
+        state       = {'price': 100.0}
+        rng         = random.Random(self.random.random())
+
+        def make_tick(index):
+            step = index % 7
+            if step == 0:
+                state['price'] = max(0.01, state['price'] + rng.choice((-0.01, 0.0, 0.01)))
+                return [tick_price, 6, request_id, BID, "%.2f" % state['price'], rng.randint(1, 50) * 100, 1]
+            if step == 1:
+                return [tick_size, 6, request_id, BID_SIZE, rng.randint(1, 50) * 100]
+            if step == 2:
+                return [tick_price, 6, request_id, ASK, "%.2f" % (state['price'] + 0.01), rng.randint(1, 50) * 100, 1]
+            if step == 3:
+                return [tick_size, 6, request_id, ASK_SIZE, rng.randint(1, 50) * 100]
+            if step == 4:
+                return [tick_price, 6, request_id, LAST, "%.2f" % state['price'], rng.randint(1, 10) * 100, 0]
+            if step == 5:
+                return [tick_size, 6, request_id, LAST_SIZE, rng.randint(1, 10) * 100]
+            # Sent with sub second precision so receivers can measure the delivery latency
+            return [tick_string, 6, request_id, LAST_TIMESTAMP, "%.6f" % time.time()]
+        return make_tick
+
+    def _depth_maker(self, request_id):
+        """
+        :return: Function generating the updates of a market depth subscription (rows updated in turn)
+        """
+        market_depth_l2 = Messages.inbound['market_depth_l2']
+        rows            = self.depth_rows
+        rng             = random.Random(self.random.random())
+
+        def make_update(index):
+            side        = index % 2                     # 0 ask, 1 bid
+            position    = (index // 2) % rows
+            operation   = 0 if index < 2 * rows else 1  # Insert the rows, then update them
+            offset      = (position + 1) * 0.01
+            price       = 100.0 + offset if side == 0 else 100.0 - offset
+            return [market_depth_l2, 1, request_id, position, "MOCK", operation, side, "%.2f" % price,
+                    rng.randint(1, 100) * 100, 1]
+        return make_update
@@ -0,0 +1,274 @@
+"""
+Paces the messages sent to the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Keeping the outbound message rate below the bridge's ceiling (token bucket)
+2. Keeping historical data requests within the bridge's pacing rules (sliding window)
+3. Sending urgent messages (cancels, orders) ahead of market data requests, and those ahead of historical requests
+4. Reporting queue depths and the time messages spent waiting
+"""
+
+from collections import deque
+
+import logging
+import threading
+import time
+
+from ibkr_api.base.constants    import HISTORICAL_REQUEST_LIMIT, HISTORICAL_REQUEST_PERIOD, MAX_MESSAGES_PER_SECOND
+from ibkr_api.base.messages     import Messages
+
+logger = logging.getLogger(__name__)
+
+# Priority classes (lower is sent first)
+PRIORITY_URGENT     = 0
+PRIORITY_NORMAL     = 1
+PRIORITY_HISTORICAL = 2
+
+URGENT_MESSAGES     = ('place_order', 'cancel_order', 'request_global_cancel', 'exercise_options')
+HISTORICAL_MESSAGES = ('request_historical_data', 'request_historical_ticks', 'request_head_time_stamp',
+                       'request_histogram_data')
+
+
+def message_priority(message_name):
+    """
+    :param message_name: Name of an outbound message (see Messages.outbound)
+    :return: Priority class of the message
+    """
+    if message_name.startswith('cancel_') or message_name in URGENT_MESSAGES:
+        return PRIORITY_URGENT
+    if message_name in HISTORICAL_MESSAGES:
+        return PRIORITY_HISTORICAL
+    return PRIORITY_NORMAL
+
+
+# Outbound message id -> priority class
+PRIORITIES = {message_id: message_priority(name) for name, message_id in Messages.outbound.items()}
+
+
+class TokenBucket(object):
+    def __init__(self, rate, capacity=None):
+        """
+        :param rate: Tokens added per second
+        :param capacity: Maximum number of tokens held (defaults to one second's worth)
+        """
+        self.rate       = rate
+        self.capacity   = rate if capacity is None else capacity
+        self.tokens     = self.capacity
+        self.updated    = time.monotonic()
+
+    def delay(self, now):
+        """
+        :param now: time.monotonic()
+        :return: Seconds until a token is available (0 if one is available now)
+        """
+        self.tokens     = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated    = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def acquire(self, now):
+        self.tokens -= 1
+
+
+class SlidingWindow(object):
+    def __init__(self, limit, period):
+        """
+        :param limit: Number of events allowed ...
+        :param period: ... within this many seconds
+        """
+        self.limit  = limit
+        self.period = period
+        self.times  = deque()
+
+    def delay(self, now):
+        """
+        :param now: time.monotonic()
+        :return: Seconds until another event is allowed (0 if allowed now)
+        """
+        while self.times and self.times[0] <= now - self.period:
+            self.times.popleft()
+        return 0 if len(self.times) < self.limit else self.times[0] + self.period - now
+
+    def acquire(self, now):
+        self.times.append(now)
+
+
+class OutboundScheduler(object):
+    def __init__(self, send, rate=MAX_MESSAGES_PER_SECOND, burst=None,
+                 historical_limit=HISTORICAL_REQUEST_LIMIT, historical_period=HISTORICAL_REQUEST_PERIOD):
+        """
+        :param send: Function writing an encoded message to the bridge
+        :param rate: Maximum number of messages sent per second
+        :param burst: Maximum number of messages sent back to back (defaults to rate)
+        :param historical_limit: Maximum number of historical requests sent ...
+        :param historical_period: ... within this many seconds
+        """
+        self.send           = send
+        self.rate_limiter   = TokenBucket(rate, burst)
+        self.limiters       = {PRIORITY_HISTORICAL: SlidingWindow(historical_limit, historical_period)}
+        self.queues         = (deque(), deque(), deque())   # One per priority class: (time queued, message)
+        self.condition      = threading.Condition()
+        self.sender         = None
+        self.running        = False
+        self.local          = threading.local()     # Ticket of the last message each thread submitted
+
+        # Metrics
+        self.submitted      = [0, 0, 0]     # Messages queued per priority class
+        self.sent           = [0, 0, 0]     # Messages sent per priority class
+        self.max_queued     = 0             # Largest number of messages queued at once
+        self.total_wait     = 0.0           # Seconds spent queued by all messages sent
+        self.max_wait       = 0.0           # Longest time a message spent queued
+
+    def start(self):
+        if self.sender is not None:
+            return
+
+        self.running    = True
+        self.sender     = threading.Thread(target=self._sender_loop, name="BridgeSender", daemon=True)
+        self.sender.start()
+        logger.debug("Sender thread started")
+
+    def stop(self, drain_timeout=None):
+        """
+        Stop the sender thread, messages still queued are discarded
+
+        :param drain_timeout: If given, first wait up to this many seconds for the queued messages to be sent
+        """
+        if self.sender is None:
+            return
+
+        with self.condition:
+            if drain_timeout is not None:
+                deadline = time.monotonic() + drain_timeout
+                while self.queued() and self.running and time.monotonic() < deadline:
+                    self.condition.wait(min(0.1, max(0, deadline - time.monotonic())))
+            self.running = False
+            self.condition.notify()
+        if self.sender is not threading.current_thread():
+            self.sender.join()
+        self.sender = None
+
+        discarded = self.queued()
+        for messages in self.queues:
+            messages.clear()
+        if discarded:
+            logger.warning("{0} queued messages were not sent to the bridge".format(discarded))
+        logger.debug("Sender thread stopped")
+
+    def submit(self, message, priority=None):
+        """
+        Queue an encoded message
+
+        :param message: Encoded message (see BridgeConnection.make_message)
+        :param priority: Priority class (None -> derived from the message id)
+        :return: (priority class, position in the class) ticket, see is_sent
+        """
+        if priority is None:
+            priority = PRIORITIES.get(self.message_id(message), PRIORITY_NORMAL)
+
+        with self.condition:
+            self.queues[priority].append((time.monotonic(), message))
+            self.submitted[priority] += 1
+            queued = self.queued()
+            if queued > self.max_queued:
+                self.max_queued = queued
+            self.condition.notify()
+            ticket = (priority, self.submitted[priority])
+        self.local.ticket = ticket
+        return ticket
+
+    def take_ticket(self):
+        """
+        Ticket of the last message the calling thread submitted, for callers that do not see submit's return value
+        (e.g. an ApiCalls request sending through BridgeConnection.send_message), other threads' messages aside
+
+        :return: Ticket of that message, None if the thread submitted nothing since its previous take_ticket
+        """
+        ticket = getattr(self.local, 'ticket', None)
+        self.local.ticket = None
+        return ticket
+
+    def is_sent(self, ticket):
+        """
+        :param ticket: Returned by submit
+        :return: True once the message has been handed to the bridge (a class is sent in the order it was queued)
+        """
+        (priority, position) = ticket
+        return self.sent[priority] >= position
+
+    @staticmethod
+    def message_id(message):
+        """
+        :param message: Encoded message (length prefix followed by the fields)
+        :return: Message id or None if it can not be read
+        """
+        try:
+            return int(message[4:message.index(b"\0", 4)])
+        except ValueError:
+            return None
+
+    def queued(self):
+        return sum(len(messages) for messages in self.queues)
+
+    def metrics(self):
+        """
+        :return: Dictionary of the queue depths and sending statistics
+        """
+        with self.condition:
+            sent = sum(self.sent)
+            return {'queued'        : [len(messages) for messages in self.queues],
+                    'max_queued'    : self.max_queued,
+                    'sent'          : list(self.sent),
+                    'average_wait'  : self.total_wait / sent if sent else 0.0,
+                    'max_wait'      : self.max_wait}
+
+    def _next(self, now):
+        """
+        Take the next message allowed to be sent (must hold the condition's lock)
+
+        :param now: time.monotonic()
+        :return: (message, None) or (None, seconds to wait before trying again, None -> until a message is queued)
+        """
+        rate_delay = self.rate_limiter.delay(now)
+        wait = None
+        for priority, messages in enumerate(self.queues):
+            if not messages:
+                continue
+
+            limiter = self.limiters.get(priority)
+            delay   = max(rate_delay, limiter.delay(now) if limiter is not None else 0)
+            if delay > 0:
+                # A class held by its own limiter must not hold back the classes after it
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            self.rate_limiter.acquire(now)
+            if limiter is not None:
+                limiter.acquire(now)
+
+            (queued_time, message) = messages.popleft()
+            waited = now - queued_time
+            self.sent[priority] += 1
+            self.total_wait     += waited
+            self.max_wait       = max(self.max_wait, waited)
+            return message, None
+
+        return None, wait
+
+    def _sender_loop(self):
+        """
+        Sender thread body: send queued messages as fast as the limits allow until stopped
+        """
+        while True:
+            with self.condition:
+                while True:
+                    if not self.running:
+                        return
+                    (message, wait) = self._next(time.monotonic())
+                    if message is not None:
+                        break
+                    self.condition.wait(wait)
+
+            try:
+                self.send(message)
+            except OSError:
+                logger.exception("Failed to send a queued message to the bridge")
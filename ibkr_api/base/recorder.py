@@ -0,0 +1,128 @@
+"""
+Journal of the raw traffic between a client application and the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Appending every frame sent or received, with a nanosecond timestamp and its direction, to a compact binary file
+2. Reading a journal back record by record (a journal cut short by a crash is read up to its last complete record)
+"""
+
+import logging
+import struct
+import threading
+import time
+
+from ibkr_api.base.frame_decoder    import FRAME_HEADER
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_MAGIC   = b"IBKRJNL\0"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER  = struct.Struct("!8sH")     # Magic, version
+RECORD_HEADER   = struct.Struct("!qBI")     # time.time_ns(), direction, payload size
+
+INBOUND         = 0     # Bridge -> client
+OUTBOUND        = 1     # Client -> bridge
+
+HANDSHAKE_PREFIX = b"API\0"
+
+
+class Recorder(object):
+    def __init__(self, path, buffer_size=1 << 20):
+        """
+        Journal writer, frames are recorded without their size prefix (the record header holds the size)
+
+        :param path: File the journal is written to (truncated if it exists)
+        :param buffer_size: Bytes buffered before they are written to the file
+        """
+        self.path       = path
+        self.file       = open(path, 'wb', buffering=buffer_size)
+        self.lock       = threading.Lock()      # Inbound and outbound frames are recorded from different threads
+        self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION))
+
+        # Metrics
+        self.records    = 0
+        self.bytes      = 0
+
+    def record(self, direction, payload, timestamp=None):
+        """
+        :param direction: INBOUND or OUTBOUND
+        :param payload: Frame payload (bytes or memoryview, NUL separated fields)
+        :param timestamp: time.time_ns() value (None -> now)
+        """
+        if timestamp is None:
+            timestamp = time.time_ns()
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(timestamp, direction, len(payload)))
+            self.file.write(payload)
+            self.records    += 1
+            self.bytes      += RECORD_HEADER.size + len(payload)
+
+    def record_outbound(self, data):
+        """
+        Record the frame(s) written to the socket
+
+        :param data: Bytes sent, one size prefixed frame (preceded by "API\\0" for the version handshake)
+        """
+        view = memoryview(data)
+        if data[:len(HANDSHAKE_PREFIX)] == HANDSHAKE_PREFIX:
+            view = view[len(HANDSHAKE_PREFIX):]
+
+        timestamp = time.time_ns()
+        while len(view) >= FRAME_HEADER.size:
+            size = FRAME_HEADER.unpack_from(view)[0]
+            self.record(OUTBOUND, view[FRAME_HEADER.size:FRAME_HEADER.size + size], timestamp)
+            view = view[FRAME_HEADER.size + size:]
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.close()
+            self.file = None
+        logger.info("Journal {0} closed ({1} records, {2} bytes)".format(self.path, self.records, self.bytes))
+
+    def metrics(self):
+        return {'records'   : self.records,
+                'bytes'     : self.bytes}
+
+
+def read_journal(path, directions=(INBOUND, OUTBOUND)):
+    """
+    Read the records of a journal written by Recorder
+
+    :param path: Journal file
+    :param directions: Directions of the records returned
+    :return: Generator of (time.time_ns() value, direction, payload:bytes)
+    """
+    with open(path, 'rb') as journal:
+        header = journal.read(JOURNAL_HEADER.size)
+        if len(header) < JOURNAL_HEADER.size:
+            logger.error("{0} is not a journal (too short)".format(path))
+            return
+        (magic, version) = JOURNAL_HEADER.unpack(header)
+        if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+            logger.error("{0} is not a journal, or was written by an unsupported version".format(path))
+            return
+
+        while True:
+            header = journal.read(RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) < RECORD_HEADER.size:
+                logger.warning("{0} ends with a partial record".format(path))
+                return
+
+            (timestamp, direction, size) = RECORD_HEADER.unpack(header)
+            payload = journal.read(size)
+            if len(payload) < size:
+                logger.warning("{0} ends with a partial record".format(path))
+                return
+            if direction in directions:
+                yield timestamp, direction, payload
@@ -0,0 +1,220 @@
+"""
+Cache for reference data returned by the bridge (TWS/IBGW)
+
+:Responsible For:
+1. Holding responses that rarely change (contract details, market rules, etc.) for a configurable time per type
+2. Bounding memory use by evicting the least recently used entries
+3. Optionally persisting entries in a sqlite database so restarts come up warm
+4. Providing the decorator placing the cache in front of IBKR_API requests
+5. Keying requests by what identifies their arguments, and handing out copies so callers can not alter each other's data
+"""
+
+from collections    import OrderedDict
+from functools      import wraps
+
+import copy
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+
+from ibkr_api.classes.contracts.contract import Contract
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60 * 60
+
+# Seconds each type of reference data is kept
+DEFAULT_TTLS = {
+    'contract_data'                                 : DAY,
+    'market_depth_exchanges'                        : DAY,
+    'market_rule'                                   : 7 * DAY,
+    'matching_symbols'                              : DAY,
+    'scanner_parameters'                            : 7 * DAY,
+    'security_definition_option_parameters'         : DAY,
+    'smart_components'                              : DAY,
+}
+
+# Contract attributes identifying a contract that has no contract id
+CONTRACT_KEY_FIELDS = ('symbol', 'security_type', 'last_trade_date_or_contract_month', 'strike', 'right', 'multiplier',
+                       'exchange', 'primary_exchange', 'currency', 'local_symbol', 'trading_class', 'include_expired',
+                       'security_id_type', 'security_id')
+
+
+def make_key(args, kwargs):
+    """
+    Build the cache key of a request from its arguments (contracts are keyed by contract id when they have one)
+
+    :param args: Positional arguments of the request
+    :param kwargs: Keyword arguments of the request
+    :return: str
+    """
+    parts = [key_part(value) for value in list(args) + [kwargs[name] for name in sorted(kwargs)]]
+    return repr(tuple(parts))
+
+
+def key_part(value):
+    """
+    Stand-in for an argument in a cache key, built from the fields identifying it rather than from its repr
+    (object.__repr__ holds the object's address, so equal arguments would never share an entry)
+
+    :param value: Argument of a request
+    :return: Value whose repr only depends on the argument's identifying fields
+    """
+    if isinstance(value, Contract):
+        if value.id:
+            return ('contract_id', value.id)
+        return tuple(key_part(getattr(value, name, None)) for name in CONTRACT_KEY_FIELDS)
+    if isinstance(value, (list, tuple)):
+        return tuple(key_part(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(name), key_part(item)) for (name, item) in value.items()))
+    if type(value).__repr__ is object.__repr__:
+        if hasattr(value, '__dict__'):
+            return (type(value).__name__, key_part(vars(value)))
+        slots = getattr(type(value), '__slots__', ())
+        return (type(value).__name__, tuple(key_part(getattr(value, name, None)) for name in slots))
+    return value
+
+
+def cached_reference_data(kind):
+    """
+    Serve an IBKR_API request from its reference_data_cache (when it has one), making the request on a miss.
+    Responses of None (nothing received) are not cached.
+
+    Every caller gets an object of its own that it may change freely, on a hit as on a miss: a hit returns a copy of
+    the cached response, a miss returns the response while the cache keeps a copy (and calls coalesced behind the
+    request get copies, see SingleFlight.call).
+
+    :param kind: Type of reference data (see DEFAULT_TTLS)
+    :return: Decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        def new_func(self, *func_args, **func_kwargs):
+            cache = getattr(self, 'reference_data_cache', None)
+            if cache is None:
+                return func(self, *func_args, **func_kwargs)
+
+            key     = make_key(func_args, func_kwargs)
+            value   = cache.get(kind, key)
+            if value is None:
+                value = func(self, *func_args, **func_kwargs)
+                if value is not None:
+                    # Stores a copy, the response stays the caller's own
+                    cache.put(kind, key, value)
+            return value
+        return new_func
+    return decorator
+
+
+class ReferenceDataCache(object):
+    def __init__(self, max_entries=10000, ttls=None, path=None):
+        """
+        :param max_entries: Number of entries kept in memory (least recently used are evicted)
+        :param ttls: Seconds each type of data is kept, overrides DEFAULT_TTLS (types not listed are kept a day)
+        :param path: Path of a sqlite database persisting the entries (None -> memory only)
+        """
+        self.max_entries    = max_entries
+        self.ttls           = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.entries        = OrderedDict()     # (kind, key) -> (expiry time, value)
+        self.lock           = threading.Lock()
+        self.hits           = 0
+        self.misses         = 0
+        self.db             = None
+
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS reference_data "
+                            "(kind TEXT, key TEXT, expires REAL, value BLOB, PRIMARY KEY (kind, key))")
+            self.db.commit()
+
+    def get(self, kind, key):
+        """
+        :param kind: Type of reference data
+        :param key: Key of the entry (see make_key)
+        :return: A copy of the cached value or None if it is missing or expired
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry is None and self.db is not None:
+                entry = self._load(kind, key)
+
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._delete(kind, key)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end((kind, key))
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, kind, key, value):
+        """
+        :param kind: Type of reference data
+        :param key: Key of the entry (see make_key)
+        :param value: Value to cache (a copy is kept, so the caller may go on changing it)
+        """
+        expires = time.time() + self.ttls.get(kind, DAY)
+        value   = copy.deepcopy(value)
+        with self.lock:
+            self._store(kind, key, (expires, value))
+            if self.db is not None:
+                try:
+                    self.db.execute("INSERT OR REPLACE INTO reference_data VALUES (?, ?, ?, ?)",
+                                    (kind, key, expires, pickle.dumps(value)))
+                    self.db.commit()
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    logger.warning("'{0}' data can not be persisted: {1}".format(kind, e))
+
+    def invalidate(self, kind=None):
+        """
+        Drop cached entries
+
+        :param kind: Type of reference data to drop (None -> everything)
+        """
+        with self.lock:
+            for entry_key in [k for k in self.entries if kind is None or k[0] == kind]:
+                del self.entries[entry_key]
+            if self.db is not None:
+                if kind is None:
+                    self.db.execute("DELETE FROM reference_data")
+                else:
+                    self.db.execute("DELETE FROM reference_data WHERE kind = ?", (kind,))
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _store(self, kind, key, entry):
+        self.entries[(kind, key)] = entry
+        self.entries.move_to_end((kind, key))
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self, kind, key):
+        row = self.db.execute("SELECT expires, value FROM reference_data WHERE kind = ? AND key = ?",
+                              (kind, key)).fetchone()
+        if row is None:
+            return None
+
+        try:
+            entry = (row[0], pickle.loads(row[1]))
+        except Exception as e:
+            logger.warning("Dropping unreadable cached '{0}' data: {1}".format(kind, e))
+            self._delete(kind, key)
+            return None
+
+        self._store(kind, key, entry)
+        return entry
+
+    def _delete(self, kind, key):
+        self.entries.pop((kind, key), None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM reference_data WHERE kind = ? AND key = ?", (kind, key))
+            self.db.commit()
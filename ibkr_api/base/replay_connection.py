@@ -0,0 +1,169 @@
+"""
+Stand-in for the BridgeConnection that plays back a journal recorded with BridgeConnection.start_recording
+
+:Responsible For:
+1. Handing the recorded inbound frames to the application, in order, at real, accelerated or maximum speed
+2. Going through the regular connect sequence (the recorded handshake answers ApiCalls.connect)
+3. Discarding the messages the application sends, while counting them
+4. Telling the application when the journal has been played back entirely
+"""
+
+import logging
+import threading
+import time
+
+from ibkr_api.base.bridge_connection    import BridgeConnection
+from ibkr_api.base.constants            import CONNECTED, DISCONNECTED
+from ibkr_api.base.message_view         import MessageView
+from ibkr_api.base.recorder             import INBOUND, read_journal
+
+logger = logging.getLogger(__name__)
+
+RECEIVE_TIMEOUT = 1.0   # Longest wait of receive_messages() for the next frame (the socket timeout of a live connection)
+
+
+class ReplayConnection(BridgeConnection):
+    def __init__(self, path, speed=1.0, batch_size=1000, on_end=None):
+        """
+        Pass as the connection of IBKR_API or a client application (host and port are then ignored), e.g.
+        ReplayConnection("session.ibj", speed=10.0)
+
+        :param path: Journal file
+        :param speed: Playback speed relative to the recorded timing (2.0 -> twice as fast, None -> as fast as possible)
+        :param batch_size: Maximum number of messages returned by a single read
+        :param on_end: Function called (without arguments) once every frame has been handed out, e.g. app.stop
+        """
+        super().__init__(None, None)
+        self.path           = path
+        self.speed          = speed
+        self.batch_size     = batch_size
+        self.on_end         = on_end
+        self.records        = None      # Inbound records of the journal still to play
+        self.next_record    = None      # (time.time_ns() value, direction, payload) of the next frame
+        self.first_time     = None      # Recorded time of the first frame
+        self.started        = None      # time.monotonic() value the first frame was played at
+        self.finished       = threading.Event()
+
+        # Metrics
+        self.replayed       = 0         # Frames handed to the application
+        self.sent           = 0         # Messages sent by the application (discarded)
+        self.max_behind     = 0.0       # Seconds the playback fell behind the recorded timing at worst
+
+    def connect(self):
+        self.records        = read_journal(self.path, directions=(INBOUND,))
+        self.next_record    = next(self.records, None)
+        self.status         = CONNECTED
+        if self.next_record is None:
+            logger.error("The journal {0} holds no inbound frames".format(self.path))
+            self._end()
+
+    def disconnect(self):
+        logger.debug("Closing the replay of {0}".format(self.path))
+        self.stop_reader()
+        self.stop_scheduler()
+        self.stop_recording()
+        if self.records is not None:
+            self.records.close()
+        self.status = DISCONNECTED
+
+    def is_connected(self):
+        return self.status == CONNECTED
+
+    def poll(self, timeout):
+        if self.inbound is not None and (self.reader is not None or not self.inbound.empty()):
+            return self._drain_inbound(timeout)
+
+        if not self.is_connected():
+            logger.debug("poll attempted while not connected.")
+            time.sleep(timeout)
+            return []
+        return self._play(timeout)
+
+    def _drain_inbound(self, timeout=None):
+        return super()._drain_inbound(RECEIVE_TIMEOUT if timeout is None else timeout)
+
+    def _read_socket(self, parse_message=True):
+        return self._play(RECEIVE_TIMEOUT, parse_message)
+
+    def _write(self, msg):
+        with self.send_lock:
+            self.sent += 1
+            self.bytes_sent += len(msg)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record_outbound(msg)
+        return len(msg)
+
+    def _due(self, timestamp):
+        """
+        :return: time.monotonic() value a frame recorded at timestamp is played at
+        """
+        if not self.speed:
+            return self.started
+        return self.started + (timestamp - self.first_time) / 1e9 / self.speed
+
+    def _play(self, timeout, parse_message=True):
+        """
+        Wait up to timeout seconds for the next frame to be due, then hand out every frame that is due
+
+        :param timeout: Maximum number of seconds to wait
+        :param parse_message: False -> un-formatted data True -> MessageViews
+        :return: messages:list
+        """
+        if self.next_record is None:
+            return []
+        if self.started is None:
+            self.first_time = self.next_record[0]
+            self.started    = time.monotonic()
+
+        delay = self._due(self.next_record[0]) - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        if delay > 0:
+            time.sleep(delay)
+
+        # The version handshake is read on its own by ApiCalls.connect
+        limit       = self.batch_size if self.replayed else 1
+        messages    = []
+        now         = time.monotonic()
+        recorder    = self.recorder
+        while self.next_record is not None and len(messages) < limit:
+            (timestamp, _, payload) = self.next_record
+            due = self._due(timestamp)
+            if due > now:
+                break
+
+            if self.speed:
+                self.max_behind = max(self.max_behind, now - due)
+            if recorder is not None:
+                recorder.record(INBOUND, payload)
+            message = MessageView(payload, now)
+            self.bytes_received += len(payload)
+            messages.append(message if parse_message else message.fields)
+            self.next_record = next(self.records, None)
+
+        self.replayed           += len(messages)
+        self.frames_received    += len(messages)
+        if self.next_record is None:
+            self._end()
+        return messages
+
+    def _end(self):
+        logger.info("Replay of {0} complete ({1} frames)".format(self.path, self.replayed))
+        self.status = DISCONNECTED
+        self.finished.set()
+        if self.on_end is not None:
+            self.on_end()
+
+    def metrics(self):
+        """
+        :return: Dictionary of the frames replayed, the messages sent, how far the playback fell behind
+                 and the counters of BridgeConnection.metrics()
+        """
+        metrics = super().metrics()
+        metrics.update({'replayed'      : self.replayed,
+                        'sent'          : self.sent,
+                        'max_behind'    : self.max_behind,
+                        'finished'      : self.finished.is_set()})
+        return metrics
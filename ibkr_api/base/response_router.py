@@ -0,0 +1,218 @@
+"""
+Routes inbound messages to the requests waiting on them
+
+:Responsible For:
+1. Tracking pending requests by request id and by the messages expected in response
+2. Parsing the messages that belong to a pending request
+3. Completing the request's future as soon as its terminating message arrives
+4. Queuing the messages of streaming subscriptions (market data) until they are consumed
+"""
+
+from collections import deque
+
+import logging
+import threading
+
+from ibkr_api.base.messages import Messages
+
+logger = logging.getLogger(__name__)
+
+INFO_MESSAGE_ID = Messages.inbound['info_message']
+
+
+def is_warning(code):
+    """
+    Informational codes that do not end a request (2100-2199 are warnings, 10167 is delayed market data)
+
+    :param code: Code of an info_message
+    :return: True if the code is only a warning
+    """
+    return 2100 <= code < 2200 or code == 10167
+
+
+def routing_request_id(data_messages, end_message, request_id):
+    """
+    Request id a response can be routed by: only if every message of the response carries it, otherwise the messages
+    without one would never match the request and it would wait until its timeout
+
+    :param data_messages: Names of the inbound messages carrying the response's data
+    :param end_message: Name of the message terminating the response (None -> the first data message does)
+    :param request_id: Request ID of the request
+    :return: request_id, or None to route by message type only
+    """
+    names = list(data_messages) + ([end_message] if end_message else [])
+    if not all(name in Messages.request_id_field for name in names):
+        return None
+    return request_id
+
+
+class PendingRequest(object):
+    def __init__(self, future, data_messages, end_message=None, request_id=None, end_on_codes=()):
+        """
+        A request waiting for the bridge's response
+
+        :param future: asyncio.Future or concurrent.futures.Future completed with the parsed response
+        :param data_messages: Names of the inbound messages carrying the response's data
+        :param end_message: Name of the message terminating the response (None -> the first data message does)
+        :param request_id: Request id the response carries (None for requests the bridge answers without one)
+        :param end_on_codes: Info message codes that also terminate the response
+        """
+        self.future             = future
+        self.request_id         = request_id
+        self.message_ids        = set(Messages.inbound[name] for name in data_messages)
+        self.end_message_id     = Messages.inbound[end_message] if end_message else None
+        self.end_on_codes       = end_on_codes
+        self.data               = []
+
+        if self.end_message_id is not None:
+            self.message_ids.add(self.end_message_id)
+
+    def add(self, message_id, data):
+        """
+        Add a parsed message to the response
+
+        :return: True if the response is complete
+        """
+        self.data.append(data)
+        return self.end_message_id is None or message_id == self.end_message_id
+
+    def result(self):
+        """
+        :return: None if no data was received, the data itself for a single message, otherwise a list
+        """
+        if len(self.data) == 0:
+            return None
+        elif len(self.data) == 1:
+            return self.data[0]
+        return list(self.data)
+
+    def complete(self):
+        if not self.future.done():
+            self.future.set_result(self.result())
+
+
+class Subscription(object):
+    def __init__(self, data_messages, request_id, end_message=None):
+        """
+        A streaming request, its messages are queued until consumed instead of completing a future
+
+        :param data_messages: Names of the inbound messages carrying the stream's data
+        :param request_id: Request id the stream's messages carry
+        :param end_message: Name of the message terminating the stream (None -> it ends when cancelled)
+        """
+        self.request_id         = request_id
+        self.message_ids        = set(Messages.inbound[name] for name in data_messages)
+        self.end_message_id     = Messages.inbound[end_message] if end_message else None
+        self.end_on_codes       = ()
+        self.events             = deque()   # Parsed messages not consumed yet
+        self.done               = False     # True once the stream ended (end message or error from the bridge)
+        self.waiter             = None      # Optional future completed when an event arrives or the stream ends
+
+        if self.end_message_id is not None:
+            self.message_ids.add(self.end_message_id)
+
+    def add(self, message_id, data):
+        """
+        Queue a parsed message
+
+        :return: True if the stream ended
+        """
+        if message_id == self.end_message_id:
+            return True
+
+        self.events.append(data)
+        self._wake()
+        return False
+
+    def complete(self):
+        self.done = True
+        self._wake()
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+class ResponseRouter(object):
+    def __init__(self, message_parser):
+        """
+        :param message_parser: Converts message fields into objects (MessageParser)
+        """
+        self.message_parser = message_parser
+        self.pending        = {}    # Request ID (None for requests without one) -> list of PendingRequest or Subscription
+        self.lock           = threading.RLock()     # Requests may be registered from several threads
+
+    def register(self, request):
+        """
+        Start routing responses to the given request
+
+        :param request: PendingRequest or Subscription
+        :return: The request
+        """
+        with self.lock:
+            self.pending.setdefault(request.request_id, []).append(request)
+        return request
+
+    def remove(self, request):
+        """
+        Stop routing responses to the given request (it is removed automatically once complete)
+
+        :param request: PendingRequest or Subscription
+        """
+        with self.lock:
+            requests = self.pending.get(request.request_id)
+            if requests and request in requests:
+                requests.remove(request)
+                if not requests:
+                    del self.pending[request.request_id]
+
+    def _find(self, request_id, message_id):
+        for key in (request_id, None):
+            for request in self.pending.get(key, ()):
+                if message_id in request.message_ids:
+                    return request
+            if request_id is None:
+                break
+        return None
+
+    def _parse(self, message):
+        func = getattr(self.message_parser, message['action'], None)
+        if func is None:
+            logger.debug("No parser available for '{0}', returning the raw fields".format(message['action']))
+            return message['fields']
+        return func(message['fields'])
+
+    def _dispatch_info(self, message):
+        request_id  = int(message.field(2))
+        requests    = self.pending.get(request_id)
+        if not requests:
+            return False
+
+        code        = int(message.field(3))
+        logger.info("Request {0} - {1}:{2}".format(request_id, code, message.field(4)))
+        for request in list(requests):
+            if code in request.end_on_codes or not is_warning(code):
+                self.remove(request)
+                request.complete()
+        return True
+
+    def dispatch(self, message):
+        """
+        Hand a message to the request waiting on it
+
+        :param message: MessageView from BridgeConnection.receive_messages() (only decoded if a request consumes it)
+        :return: True if a pending request consumed the message
+        """
+        message_id  = message.id
+        with self.lock:
+            if message_id == INFO_MESSAGE_ID:
+                return self._dispatch_info(message)
+
+            request = self._find(message.request_id, message_id)
+            if request is None:
+                return False
+
+            if request.add(message_id, self._parse(message)):
+                self.remove(request)
+                request.complete()
+            return True
@@ -0,0 +1,205 @@
+"""
+Parallel execution of work sharded by key (request id, contract id, symbol, etc.)
+
+:Responsible For:
+1. Running the work of different keys in parallel on a pool of worker threads or processes
+2. Preserving the order of the work submitted for the same key (a key always goes to the same worker)
+3. Bounding the work queued per worker so a lagging worker slows the producer instead of exhausting memory
+4. Optionally keeping only the latest queued call per key (conflation of the updates a worker lags behind)
+5. Reporting the work submitted, completed and failed per worker
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+STOP = object()     # Queued to tell a worker thread to exit
+
+
+def shard(key, workers):
+    """
+    :param key: Hashable identifying the work's instrument (None is allowed)
+    :param workers: Number of workers
+    :return: Index of the worker handling the key
+    """
+    return hash(key) % workers
+
+
+class ShardedExecutor(object):
+    def __init__(self, workers=4, queue_size=10000, name="ShardedWorker"):
+        """
+        Worker threads, for handlers that release the GIL (I/O, NumPy, etc.) or to keep a slow instrument from
+        delaying the others
+
+        :param workers: Number of worker threads
+        :param queue_size: Maximum number of calls queued per worker (submit blocks while a worker's queue is full)
+        :param name: Prefix of the worker threads' names
+        """
+        self.queues     = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self.threads    = []
+        self.name       = name
+        self.latest     = {}    # (worker index, key) -> [func, args, key] of a submit_latest call not started yet
+        self.lock       = threading.Lock()
+
+        # Metrics (per worker)
+        self.submitted  = [0] * workers
+        self.completed  = [0] * workers
+        self.failed     = [0] * workers
+
+    def start(self):
+        if self.threads:
+            return
+
+        for index, calls in enumerate(self.queues):
+            thread = threading.Thread(target=self._worker_loop, args=(index, calls),
+                                      name="{0}-{1}".format(self.name, index), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.debug("{0} worker threads started".format(len(self.threads)))
+
+    def stop(self, wait=True):
+        """
+        Stop the worker threads once they have run the calls already submitted
+
+        :param wait: If True, wait for the workers to finish
+        """
+        for calls in self.queues:
+            calls.put(STOP)
+        if wait:
+            for thread in self.threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+        self.threads = []
+        logger.debug("Worker threads stopped")
+
+    def submit(self, key, func, *args):
+        """
+        Queue func(*args) on the worker handling key, after the calls submitted earlier for the same key
+
+        :param key: Hashable identifying the work's instrument
+        :param func: Function to call
+        """
+        index = shard(key, len(self.queues))
+        self.submitted[index] += 1
+        self.queues[index].put((func, args))
+
+    def submit_latest(self, shard_key, key, func, *args):
+        """
+        Queue func(*args) like submit, unless a call submitted with the same key is still queued: that call then runs
+        with these arguments instead, at its place in the queue (only the latest value of key is handled)
+
+        :param shard_key: Hashable identifying the work's instrument
+        :param key: Hashable identifying the value, e.g. (request id, tick type)
+        :param func: Function to call
+        :return: True if a queued call was replaced
+        """
+        index = shard(shard_key, len(self.queues))
+        with self.lock:
+            call = self.latest.get((index, key))
+            if call is not None:
+                call[1] = args
+                return True
+            call = self.latest[(index, key)] = [func, args, key]
+
+        self.submitted[index] += 1
+        self.queues[index].put(call)
+        return False
+
+    def queued(self):
+        return [calls.qsize() for calls in self.queues]
+
+    def metrics(self):
+        """
+        :return: Dictionary of the calls queued, submitted, completed and failed per worker
+        """
+        return {'queued'    : self.queued(),
+                'submitted' : list(self.submitted),
+                'completed' : list(self.completed),
+                'failed'    : list(self.failed)}
+
+    def _worker_loop(self, index, calls):
+        """
+        Worker thread body: run the calls of one shard in order until stopped
+        """
+        while True:
+            call = calls.get()
+            if call is STOP:
+                return
+
+            (func, args) = call[:2]
+            if len(call) == 3:
+                # A submit_latest call, its arguments may be replaced until it leaves latest
+                with self.lock:
+                    del self.latest[(index, call[2])]
+                    args = call[1]
+            try:
+                func(*args)
+            except Exception:
+                self.failed[index] += 1
+                logger.exception("Call of {0} failed on worker {1}".format(getattr(func, '__name__', func), index))
+            self.completed[index] += 1
+
+
+class ProcessShardedExecutor(object):
+    def __init__(self, workers=4):
+        """
+        Worker processes, for CPU heavy strategy code (signal computations per symbol, etc.).
+        Functions and arguments must be picklable, so they are module level functions rather than handlers.
+
+        :param workers: Number of worker processes
+        """
+        # A single process pool per shard runs its calls in the order they were submitted
+        self.pools      = [ProcessPoolExecutor(max_workers=1) for _ in range(workers)]
+
+        # Metrics (per worker)
+        self.submitted  = [0] * workers
+        self.completed  = [0] * workers
+        self.failed     = [0] * workers
+
+    def submit(self, key, func, *args, callback=None):
+        """
+        Run func(*args) in the process handling key, after the calls submitted earlier for the same key
+
+        :param key: Hashable identifying the work's instrument
+        :param func: Picklable function to call
+        :param callback: Function called with func's result once it is available (from a background thread)
+        :return: concurrent.futures.Future of func's result
+        """
+        index   = shard(key, len(self.pools))
+        future  = self.pools[index].submit(func, *args)
+        self.submitted[index] += 1
+
+        def done(finished):
+            self.completed[index] += 1
+            if finished.exception() is not None:
+                self.failed[index] += 1
+                logger.error("Call of {0} failed in worker process {1}: {2}".format(
+                    getattr(func, '__name__', func), index, finished.exception()))
+            elif callback is not None:
+                try:
+                    callback(finished.result())
+                except Exception:
+                    logger.exception("Callback of {0} failed".format(getattr(func, '__name__', func)))
+        future.add_done_callback(done)
+        return future
+
+    def stop(self, wait=True):
+        """
+        Shut the worker processes down once they have run the calls already submitted
+
+        :param wait: If True, wait for the workers to finish
+        """
+        for pool in self.pools:
+            pool.shutdown(wait=wait)
+
+    def metrics(self):
+        """
+        :return: Dictionary of the calls submitted, completed and failed per worker
+        """
+        return {'submitted' : list(self.submitted),
+                'completed' : list(self.completed),
+                'failed'    : list(self.failed)}
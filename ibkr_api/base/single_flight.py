@@ -0,0 +1,80 @@
+"""
+Coalesces identical requests made at the same time
+
+:Responsible For:
+1. Letting only the first of several identical concurrent calls reach the bridge
+2. Handing that call's result (or exception) to every caller waiting on it, each caller getting its own copy
+3. Providing the decorator applying this to IBKR_API requests
+"""
+
+from concurrent.futures import Future
+from functools          import wraps
+
+import copy
+import logging
+import threading
+
+from ibkr_api.base.reference_data_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+
+def coalesced(kind):
+    """
+    Share a single bridge request between identical concurrent calls of an IBKR_API request (see SingleFlight)
+
+    :param kind: Type of request, combined with the arguments to identify identical calls
+    :return: Decorator
+    """
+    def decorator(func):
+        @wraps(func)
+        def new_func(self, *func_args, **func_kwargs):
+            key = (kind, make_key(func_args, func_kwargs))
+            return self.single_flight.call(key, func, self, *func_args, **func_kwargs)
+        return new_func
+    return decorator
+
+
+class SingleFlight(object):
+    def __init__(self):
+        self.lock       = threading.Lock()
+        self.calls      = {}    # Key -> Future of the call in flight
+        self.shared     = 0     # Number of calls served by another call's result
+
+    def call(self, key, func, *args, **kwargs):
+        """
+        Call func unless an identical call (same key) is in flight, in which case wait for its result.
+        Callers sharing a result each get a deep copy of it (like cached_reference_data hits), so none of them can
+        change what the others get.
+
+        :param key: Hashable identifying identical calls
+        :param func: Function to call
+        :return: func's result
+        """
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+                future.followers = 0
+            else:
+                future.followers += 1
+                self.shared += 1
+
+        if not leader:
+            logger.debug("Waiting on the identical call in flight for {0}".format(key))
+            return copy.deepcopy(future.result())
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+                followers = future.followers
+
+        future.set_result(result)
+        # The followers copy the result the future holds, which nobody else may change while they do
+        return copy.deepcopy(result) if followers else result
@@ -0,0 +1,229 @@
+"""
+Timers and scheduled tasks for the client applications' event loops
+
+:Responsible For:
+1. Running one shot, repeating and daily (wall clock, e.g. 15:59:50 US/Eastern) tasks from a single timer heap
+2. Telling the event loop how long it may wait for messages before the next task is due
+3. Cancelling tasks through the handles returned when they are scheduled
+4. Reporting how late tasks ran compared to when they were due
+"""
+
+from datetime   import datetime, time as time_of_day, timedelta
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:     # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTask(object):
+    def __init__(self, callback, args, when, interval=None, at=None, tz=None, days=None, name=None):
+        """
+        Handle of a task scheduled with TaskScheduler
+
+        :param callback: Function called when the task is due
+        :param args: Positional arguments of the callback
+        :param when: time.monotonic() value the task is due at
+        :param interval: Seconds between runs of a repeating task (None -> not repeating)
+        :param at: Time of day of a daily task (None -> not daily)
+        :param tz: Time zone of at (None -> local time)
+        :param days: Week days a daily task runs on (0 is Monday, None -> every day)
+        :param name: Name used in log messages (defaults to the callback's name)
+        """
+        self.callback       = callback
+        self.args           = args
+        self.when           = when
+        self.interval       = interval
+        self.at             = at
+        self.tz             = tz
+        self.days           = days
+        self.name           = name or getattr(callback, '__name__', repr(callback))
+        self.cancelled      = False
+        self.runs           = 0
+        self.last_lateness  = 0.0   # Seconds the last run started after it was due
+        self.max_lateness   = 0.0
+
+    def cancel(self):
+        """
+        Stop the task from running (again)
+        """
+        self.cancelled = True
+
+    def repeats(self):
+        return self.interval is not None or self.at is not None
+
+    def __repr__(self):
+        return "ScheduledTask({0!r}, runs={1}, cancelled={2})".format(self.name, self.runs, self.cancelled)
+
+
+class TaskScheduler(object):
+    def __init__(self):
+        self.heap           = []    # (due time, sequence, ScheduledTask)
+        self.sequence       = itertools.count()     # Keeps tasks due at the same time in the order they were scheduled
+        self.lock           = threading.Lock()      # Tasks may be scheduled from other threads
+
+        # Metrics
+        self.ran            = 0     # Number of task runs
+        self.failed         = 0     # Number of runs that raised an exception
+        self.total_lateness = 0.0   # Seconds all runs started after they were due
+        self.max_lateness   = 0.0
+
+    def call_later(self, delay, callback, *args, name=None):
+        """
+        Run callback(*args) once, delay seconds from now
+
+        :return: ScheduledTask
+        """
+        return self._schedule(ScheduledTask(callback, args, time.monotonic() + delay, name=name))
+
+    def call_at(self, when, callback, *args, name=None):
+        """
+        Run callback(*args) once, at a wall clock time
+
+        :param when: datetime (naive -> local time)
+        :return: ScheduledTask
+        """
+        delay = when.timestamp() - time.time()
+        return self._schedule(ScheduledTask(callback, args, time.monotonic() + delay, name=name))
+
+    def call_every(self, interval, callback, *args, first_delay=None, name=None):
+        """
+        Run callback(*args) every interval seconds (runs missed while the loop was busy are skipped, not bunched)
+
+        :param interval: Seconds between runs
+        :param first_delay: Seconds before the first run (None -> interval)
+        :return: ScheduledTask
+        """
+        if interval <= 0:
+            raise ValueError("The interval of a repeating task must be positive")
+
+        first_delay = interval if first_delay is None else first_delay
+        return self._schedule(ScheduledTask(callback, args, time.monotonic() + first_delay, interval=interval,
+                                            name=name))
+
+    def call_daily(self, at, callback, *args, tz=None, days=None, name=None):
+        """
+        Run callback(*args) every day at a wall clock time, e.g. call_daily("15:59:50", flatten, tz="US/Eastern")
+
+        :param at: datetime.time or 'HH:MM[:SS]'
+        :param tz: Time zone name or tzinfo of at (None -> local time)
+        :param days: Week days to run on, e.g. range(5) for Monday to Friday (None -> every day)
+        :return: ScheduledTask
+        """
+        if isinstance(at, str):
+            at = time_of_day(*(int(part) for part in at.split(":")))
+        if days is not None and not days:
+            raise ValueError("A daily task needs at least one week day to run on")
+        if isinstance(tz, str):
+            if ZoneInfo is None:
+                raise ValueError("Time zone names require the zoneinfo module (Python 3.9+)")
+            tz = ZoneInfo(tz)
+
+        task        = ScheduledTask(callback, args, 0.0, at=at, tz=tz, days=set(days) if days is not None else None,
+                                    name=name)
+        task.when   = self._next_daily(task)
+        return self._schedule(task)
+
+    def cancel(self, task):
+        task.cancel()
+
+    def next_delay(self, maximum=None):
+        """
+        :param maximum: Largest value returned
+        :return: Seconds until the next task is due (0 if one is due, maximum if none is scheduled)
+        """
+        with self.lock:
+            while self.heap and self.heap[0][2].cancelled:
+                heapq.heappop(self.heap)
+            if not self.heap:
+                return maximum
+            delay = max(0.0, self.heap[0][0] - time.monotonic())
+        return delay if maximum is None else min(delay, maximum)
+
+    def run_due(self):
+        """
+        Run every task that is due, rescheduling the repeating ones
+
+        :return: Number of tasks run
+        """
+        count = 0
+        now   = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.heap or self.heap[0][0] > now:
+                    break
+                (when, _, task) = heapq.heappop(self.heap)
+            if task.cancelled:
+                continue
+
+            started             = time.monotonic()
+            lateness            = started - when
+            task.runs           += 1
+            task.last_lateness  = lateness
+            task.max_lateness   = max(task.max_lateness, lateness)
+            self.ran            += 1
+            self.total_lateness += lateness
+            self.max_lateness   = max(self.max_lateness, lateness)
+            count               += 1
+
+            try:
+                task.callback(*task.args)
+            except Exception:
+                self.failed += 1
+                logger.exception("Scheduled task '{0}' failed".format(task.name))
+
+            if task.repeats() and not task.cancelled:
+                if task.interval is not None:
+                    task.when = when + task.interval
+                    if task.when <= started:
+                        task.when = started + task.interval
+                else:
+                    task.when = self._next_daily(task)
+                self._schedule(task)
+        return count
+
+    def pending(self):
+        """
+        :return: Number of tasks scheduled and not cancelled
+        """
+        with self.lock:
+            return sum(1 for (_, _, task) in self.heap if not task.cancelled)
+
+    def metrics(self):
+        """
+        :return: Dictionary of the task counts and how late tasks ran
+        """
+        return {'pending'           : self.pending(),
+                'ran'               : self.ran,
+                'failed'            : self.failed,
+                'average_lateness'  : self.total_lateness / self.ran if self.ran else 0.0,
+                'max_lateness'      : self.max_lateness}
+
+    def _schedule(self, task):
+        with self.lock:
+            heapq.heappush(self.heap, (task.when, next(self.sequence), task))
+        return task
+
+    @staticmethod
+    def _next_daily(task):
+        """
+        :return: time.monotonic() value of the next occurrence of a daily task
+        """
+        now     = datetime.now(task.tz)
+        day     = now.date()
+        while True:
+            candidate = datetime.combine(day, task.at, tzinfo=task.tz)
+            if candidate > now and (task.days is None or candidate.weekday() in task.days):
+                break
+            day += timedelta(days=1)
+
+        # timestamp() accounts for the UTC offset of each datetime (daylight saving changes)
+        return time.monotonic() + candidate.timestamp() - now.timestamp()
@@ -95,4 +95,17 @@ class TickType(IntEnum):
     AVG_OPT_VOLUME            = 87,
     DELAYED_LAST_TIMESTAMP    = 88,
     SHORTABLE_SHARES          = 89,
-    NOT_SET                   = 90
\ No newline at end of file
+    NOT_SET                   = 90
+
+# Tick type id -> TickType, avoids constructing the enum for every tick (None for unassigned ids)
+TICK_TYPES = tuple(TickType._value2member_map_.get(tick_type_id) for tick_type_id in range(max(TickType) + 1))
+
+
+def tick_type(tick_type_id):
+    """
+    :param tick_type_id: Tick type id sent by the bridge
+    :return: TickType, or the id itself if it is not a known tick type
+    """
+    if 0 <= tick_type_id < len(TICK_TYPES) and TICK_TYPES[tick_type_id] is not None:
+        return TICK_TYPES[tick_type_id]
+    return tick_type_id
@@ -0,0 +1,113 @@
+from ibkr_api.base.ib_datetime   import parse_ib_datetimes
+from ibkr_api.classes.bar       import Bar
+
+import numpy    as np
+import pandas   as pd
+
+
+def to_array(values, dtype):
+    """
+    Convert a column of strings, falling back to floats for integer columns holding decimals
+    """
+    try:
+        return np.array(values, dtype=dtype)
+    except ValueError:
+        return np.array(values, dtype=np.float64)
+
+
+class HistoricalData(object):
+    """
+    Bars of a historical_data response stored as NumPy columns.
+    Bar objects and the pandas DataFrame are only built when first used.
+    Indexing by name (data['bars'], data['data_frame'], data['start_date'], ...) is also supported.
+    """
+    def __init__(self, start_date="", end_date="", date=None, open=None, high=None, low=None, close=None,
+                 volume=None, average=None, count=None):
+        self.start_date = start_date
+        self.end_date   = end_date
+        self.date       = date      if date     is not None else np.array([], dtype='datetime64[s]')
+        self.open       = open      if open     is not None else np.array([], dtype=np.float64)
+        self.high       = high      if high     is not None else np.array([], dtype=np.float64)
+        self.low        = low       if low      is not None else np.array([], dtype=np.float64)
+        self.close      = close     if close    is not None else np.array([], dtype=np.float64)
+        self.volume     = volume    if volume   is not None else np.array([], dtype=np.int64)
+        self.average    = average   if average  is not None else np.array([], dtype=np.float64)
+        self.count      = count     if count    is not None else np.array([], dtype=np.int64)
+        self._bars      = None
+        self._data_frame= None
+
+    @classmethod
+    def from_fields(cls, fields, start_date, end_date, bar_count):
+        """
+        :param fields: Message fields of the bars (8 per bar: date, open, high, low, close, volume, average, count)
+        :param start_date: Start of the requested period
+        :param end_date: End of the requested period
+        :param bar_count: Number of bars in the fields
+        :return: HistoricalData
+        """
+        fields = fields[:bar_count * 8]
+        return cls(start_date   = start_date                            ,
+                   end_date     = end_date                              ,
+                   date         = parse_ib_datetimes(fields[0::8])      ,
+                   open         = np.array(fields[1::8], dtype=np.float64),
+                   high         = np.array(fields[2::8], dtype=np.float64),
+                   low          = np.array(fields[3::8], dtype=np.float64),
+                   close        = np.array(fields[4::8], dtype=np.float64),
+                   volume       = to_array(fields[5::8], np.int64)      ,
+                   average      = np.array(fields[6::8], dtype=np.float64),
+                   count        = to_array(fields[7::8], np.int64))
+
+    @property
+    def bar_count(self):
+        return len(self.date)
+
+    @property
+    def bars(self):
+        """ List of Bar objects (built on first use) """
+        if self._bars is None:
+            bars    = []
+            columns = zip(self.date.astype(object), self.open.tolist(), self.high.tolist(), self.low.tolist(),
+                          self.close.tolist(), self.volume.tolist(), self.average.tolist(), self.count.tolist())
+            for (bar_date, bar_open, bar_high, bar_low, bar_close, volume, average, count) in columns:
+                bar             = Bar()
+                bar.date        = bar_date
+                bar.open        = bar_open
+                bar.high        = bar_high
+                bar.low         = bar_low
+                bar.close       = bar_close
+                bar.volume      = volume
+                bar.average     = average
+                bar.bar_count   = count
+                bars.append(bar)
+            self._bars = bars
+        return self._bars
+
+    @property
+    def data_frame(self):
+        """ pandas DataFrame of the bars (built on first use, shares the columns' memory where possible) """
+        if self._data_frame is None:
+            self._data_frame = pd.DataFrame({'date'     : self.date     ,
+                                             'open'     : self.open     ,
+                                             'high'     : self.high     ,
+                                             'low'      : self.low      ,
+                                             'close'    : self.close    ,
+                                             'volume'   : self.volume   ,
+                                             'average'  : self.average  ,
+                                             'count'    : self.count    }, copy=False)
+        return self._data_frame
+
+    def __len__(self):
+        return self.bar_count
+
+    def __getitem__(self, key):
+        if key in ('start_date', 'end_date', 'bar_count', 'bars', 'data_frame', 'date', 'open', 'high', 'low',
+                   'close', 'volume', 'average', 'count'):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
@@ -0,0 +1,68 @@
+from ibkr_api.classes.enum.tick_type import tick_type
+
+
+class Record(object):
+    """
+    Base of the compact records parsed from inbound messages (see also base.message_schema).
+    Attributes are held in __slots__ (no per instance dictionary); reading them by name (tick['price'])
+    is still supported so code written against the former dictionaries keeps working.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.items() == other.items()
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__,
+                                 ", ".join("{0}={1!r}".format(key, value) for key, value in self.items()))
+
+
+class TickPrice(Record):
+    __slots__ = ('tick_type_id', 'tick_type', 'price', 'size', 'can_auto_execute', 'past_limit', 'pre_open')
+
+    def __init__(self, tick_type_id, price, size, attr_mask):
+        self.tick_type_id       = tick_type_id
+        self.tick_type          = tick_type(tick_type_id)
+        self.price              = price
+        self.size               = size
+        self.can_auto_execute   = attr_mask & 1 != 0
+        self.past_limit         = attr_mask & 2 != 0
+        self.pre_open           = attr_mask & 4 != 0
+
+
+class TickSize(Record):
+    __slots__ = ('tick_type_id', 'tick_type', 'size')
+
+    def __init__(self, tick_type_id, size):
+        self.tick_type_id       = tick_type_id
+        self.tick_type          = tick_type(tick_type_id)
+        self.size               = size
+
+
+class TickString(Record):
+    __slots__ = ('tick_type_id', 'tick_type', 'value')
+
+    def __init__(self, tick_type_id, value):
+        self.tick_type_id       = tick_type_id
+        self.tick_type          = tick_type(tick_type_id)
+        self.value              = value
@@ -5,16 +5,28 @@ import logging
 
 logger = logging.getLogger(__name__)
 class ClientApplication(MinimalClientApplication):
-    def __init__(self, host, port, debug_mode=False):
+    def __init__(self, host, port, debug_mode=False, reader_thread=False, act_interval=1.0, conflate=False,
+                 workers=0, journal_path=None, connection=None, metrics=False, metrics_port=None):
         """
         Base class for users to extend in the creation of asynchronous event driven applications
 
         :param host: Host of the Bridge Connection
         :param port: Port of the Bridge Connection
         :param debug_mode: If True, warnings will be generated for non existing functions
+        :param reader_thread: If True, a dedicated thread drains the socket while handlers run
+        :param act_interval: Seconds between calls of act() (other periodic work can use self.task_scheduler)
+        :param conflate: If True, only the latest market data update per request and tick type is handled when
+                         updates arrive faster than the handlers process them
+        :param workers: Number of worker threads running the handlers, those of a request, and those of the orders,
+                        run in order (0 -> none). act() and timer tasks run concurrently with the handlers.
+        :param journal_path: If given, every frame sent and received is recorded to this file
+        :param connection: Used instead of a connection to host:port (e.g. a ReplayConnection)
+        :param metrics: If True, the messages are counted and timed per message type (see self.metrics.snapshot())
+        :param metrics_port: If given, the metrics are also served for Prometheus on http://127.0.0.1:metrics_port/metrics
 
         """
-        super().__init__(host, port)
+        super().__init__(host, port, debug_mode, reader_thread, act_interval, conflate, workers, journal_path,
+                         connection, metrics, metrics_port)
 
 
     #################################################################################
@@ -1,29 +1,50 @@
 from ibkr_api.base.api_calls import ApiCalls
+from ibkr_api.base.event_loop import EventLoop
 from ibkr_api.base.message_parser import MessageParser
 
 import logging
-import time
 
 
 logger = logging.getLogger(__name__)
-class MultipleClientApplication(ApiCalls):
-    def __init__(self, host, port):
+
+
+class MultipleClientApplication(EventLoop, ApiCalls):
+    def __init__(self, host, port, reader_thread=False, act_interval=1.0, conflate=False,
+                 workers=0, journal_path=None, connection=None, metrics=False, metrics_port=None):
         """
 
         :param host: Host of the Bridge Connection
         :param port: Port of the Bridge Connection
+        :param reader_thread: If True, a dedicated thread drains the socket while handlers run
         :param response_handler: User Supplied Response Handler
         :param request_handler:
+        :param act_interval: Seconds between calls of act(), messages are handled as soon as they arrive in between
+        :param conflate: If True, only the latest market data update per request and tick type is handled when
+                         updates arrive faster than the handlers process them (see Conflator), with workers the
+                         latest update replaces the one still queued on its worker
+        :param workers: Number of worker threads running the handlers, messages are sharded by shard_key() so those
+                        of a request, and all order status/open order/execution/commission messages, are handled in
+                        order (0 -> handlers run on the event loop's thread). act() and the task_scheduler's tasks
+                        keep running on the event loop's thread, concurrently with the handlers.
+        :param journal_path: If given, every frame sent and received is recorded to this file
+        :param connection: Used instead of a connection to host:port, e.g. a ReplayConnection playing back a journal
+        :param metrics: If True, the messages received, parsed and handled are counted and timed per message type
+                        (see Metrics, self.metrics.snapshot() returns them)
+        :param metrics_port: If given, the metrics are also served in the Prometheus text format on
+                             http://127.0.0.1:metrics_port/metrics while run() is running (implies metrics)
         """
-        self.still_running      = True  # Controls when the event loop
         self.messages_received  = []    # List of all messages received (not sure if needed)
         self.keyboard_input     = []    # Keyboard Input
         self.message_parser     = MessageParser()
         self.client_id          = 0
         self.debug_mode         = True
+        self.init_event_loop(act_interval, conflate, workers, metrics_port)
 
         super().__init__()
-        super().connect(host, port, self.client_id)
+        super().connect(host, port, self.client_id, reader_thread, journal_path=journal_path, connection=connection)
+
+        # Built once the parsers for the negotiated server version are selected
+        self.init_handlers(metrics)
 
     def register(self):
         """
@@ -46,48 +67,3 @@ class MultipleClientApplication(ApiCalls):
     def managed_accounts(self,message_id, request_id, account):
         print(request_id)
         print(account)
-
-    # TODO: Handle keyboard input in a non blocking manner
-    def run(self):
-        """
-        Primary event loop of the application
-        :return:
-        """
-        #timeStart = time.time()
-        #timeOut = 20
-
-        # keyboard_reader = KeyboardReader()
-        # keyboard_reader.start()
-
-        self.initialize()
-
-        while self.still_running:
-            messages = self.conn.receive_messages()
-            for message in messages:
-                    # Call the correct function in the message parser to parse and return the data
-                    logging.debug("{0} message received".format(message['action']))
-                    func = getattr(self.message_parser, message['action'])
-                    data = func(message['fields'])
-
-                    # Call the response handler as needed
-                    # If we are in development also send a warning that a handler doesnt exist
-                    if hasattr(self, message['action']):
-                        func = getattr(self, message['action'])
-                        func(*data)
-                    elif self.debug_mode:
-                        logger.warning("The function '{0}' does not exist.".format(message['action']))
-
-            # Invoke any user defined behaviour at this point.
-            self.act()
-            time.sleep(1)
-
-        logger.info("Application has been shut down.")
-        return 0
-
-    def stop(self):
-        """
-        Stops the primary event loop, allowing the application to
-        :return:
-        """
-        logger.info("Shutdown requested")
-        self.still_running = False
\ No newline at end of file